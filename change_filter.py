@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+폴링 결과 변화 감지 필터.
+
+ModbusPoller와 소비자(UI, 기록기, API) 사이에서 "바뀐 샘플만" 통과시킵니다.
+  - 레지스터별 데드밴드: |새 값 - 마지막 보고 값| > 데드밴드 일 때만 변화로 판단
+  - 상태 워드 비트마스크: (새 값 ^ 마지막 보고 값) & 마스크 != 0 일 때만 변화로 판단
+  - 하트비트: 변화가 없어도 heartbeat초마다 한 번은 통과 (생존 확인용)
+  - 상태 문자열(정상/예외 등)이 바뀌면 항상 통과
+따라서 하위 이벤트 수는 폴링 주기 × 장비 수가 아니라 실제 변화량에 비례합니다.
+"""
+import threading
+import time
+
+BASE_REG = 40001
+
+
+class ChangeFilter:
+    def __init__(self, deadbands=None, bitmasks=None, heartbeat=10.0, clock=time.monotonic):
+        """
+        deadbands: {레지스터(40005 등): 허용 오차}
+        bitmasks:  {레지스터: 비교할 비트 마스크} (상태 워드용, 데드밴드보다 우선)
+        heartbeat: 변화가 없을 때 강제로 통과시키는 간격(초), 0이면 사용 안 함
+        """
+        self.deadbands = {int(reg) - BASE_REG: float(db) for reg, db in (deadbands or {}).items()}
+        self.bitmasks = {int(reg) - BASE_REG: int(mask) for reg, mask in (bitmasks or {}).items()}
+        self.heartbeat = heartbeat
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last = {}     # key: 장치 키, value: (마지막 보고 regs, 상태, 보고 시각)
+        self.offered = 0
+        self.emitted = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        설정 파일 형식 예)
+          "CHANGE_FILTER": {"heartbeat": 10, "deadband": {"40005": 2}, "bitmask": {"40011": 65280}}
+        """
+        return cls(
+            deadbands=config.get('deadband'),
+            bitmasks=config.get('bitmask'),
+            heartbeat=float(config.get('heartbeat', 10.0)),
+        )
+
+    def _register_changed(self, i, new, old):
+        if new == old:
+            return False
+        if not isinstance(new, int) or not isinstance(old, int):
+            return True     # "err" / "timeout" 등 오류 표시로 바뀌거나 회복된 경우
+        mask = self.bitmasks.get(i)
+        if mask is not None:
+            return bool((new ^ old) & mask)
+        return abs(new - old) > self.deadbands.get(i, 0)
+
+    def accept(self, key, regs, status):
+        """이 샘플을 하위로 전달해야 하면 True를 반환하고 마지막 보고 값으로 기록합니다."""
+        now = self.clock()
+        with self._lock:
+            self.offered += 1
+            last = self._last.get(key)
+            if last is not None:
+                last_regs, last_status, last_time = last
+                changed = (
+                    status != last_status
+                    or (regs is None) != (last_regs is None)
+                    or (self.heartbeat and now - last_time >= self.heartbeat)
+                    or (regs is not None and regs != last_regs and (
+                        len(regs) != len(last_regs)
+                        or any(self._register_changed(i, new, old)
+                               for i, (new, old) in enumerate(zip(regs, last_regs)))))
+                )
+                if not changed:
+                    return False
+            self._last[key] = (list(regs) if regs is not None else None, status, now)
+            self.emitted += 1
+            return True
+
+    def forget(self, ip):
+        """장치 폴링을 중지할 때 호출: 해당 IP(및 IP@Unit 키)의 다음 샘플은 무조건 통과"""
+        with self._lock:
+            for key in [k for k in self._last if k == ip or k.startswith(ip + "@")]:
+                del self._last[key]
+
+    def stats(self):
+        with self._lock:
+            return {"offered": self.offered, "emitted": self.emitted, "keys": len(self._last)}
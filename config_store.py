@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+설정 파일 저장소 (main.py / serve.py 공용).
+
+- 읽은 내용은 메모리에 두고, 파일이 바뀌었는지(mtime/크기/inode)는 check_interval초에 한 번만 확인합니다.
+  (load_config()를 자주 불러도 JSON을 매번 다시 읽지 않음, 외부에서 파일을 고치면 자동 반영)
+- 저장은 임시 파일에 쓰고 fsync 후 os.replace로 바꿔, 저장 중 종료되어도 파일이 깨지지 않습니다.
+- 프로필: 두 프로그램이 함께 쓰는 프로필 파일(PROFILES_FILE)에 이름별 설정 묶음을 두고,
+  각 프로그램 설정의 "ACTIVE_PROFILE"로 고른 프로필 값을 기본 설정 위에 덮어씁니다.
+  프로필 예)
+    {"line1": {"SITE": "1공장", "DEVICES": "192.168.0.10-40", "TFTP_ROOT_DIR": "/srv/tftp",
+               "GROUP_WORKERS": 32, "FIRMWARE": ["/home/pi/fw/ASGD3000E_V364_H.bin"]}}
+  합쳐진 결과는 프로필마다 캐시하므로 프로필 전환은 파일을 다시 읽지 않습니다.
+
+load()가 돌려주는 dict는 공유 캐시입니다. 수정하지 말고 update()/save()를 사용하세요.
+"""
+import json
+import os
+import threading
+import time
+
+PROFILES_FILE = os.path.expanduser("~/.gds_profiles.json")
+
+
+def atomic_write_json(path, data):
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)    # 기존 파일 권한 유지
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class _CachedFile:
+    def __init__(self, path):
+        self.path = path
+        self.signature = False      # 아직 읽지 않음 (None = 파일 없음)
+        self.data = {}
+
+
+def entry_text(value):
+    """프로필 값(문자열 또는 목록)을 UI 입력란용 쉼표 구분 문자열로"""
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return str(value)
+
+
+class ConfigStore:
+    def __init__(self, path, profiles_path=PROFILES_FILE, check_interval=1.0, on_error=None,
+                 clock=time.monotonic):
+        self.check_interval = check_interval
+        self.on_error = on_error or (lambda msg: None)
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._base = _CachedFile(path)
+        self._profiles = _CachedFile(profiles_path)
+        self._merged = {}           # key: 프로필 이름(None 포함), value: 합쳐진 설정
+        self._checked_at = None
+
+    @property
+    def path(self):
+        return self._base.path
+
+    # --------------------- 읽기 --------------------- #
+    def _reload(self, cached):
+        sig = _signature(cached.path)
+        if sig == cached.signature:
+            return False
+        data = {}
+        if sig is not None:
+            try:
+                with open(cached.path, "r") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict):
+                    raise ValueError("최상위가 객체(dict)가 아닙니다")
+            except (OSError, ValueError) as e:
+                self.on_error(f"[오류] 설정 파일을 로드할 수 없습니다: {cached.path}: {e}")
+                data = cached.data if cached.signature not in (False, None) else {}
+        cached.signature = sig
+        cached.data = data
+        return True
+
+    def _refresh(self, force=False):
+        now = self.clock()
+        if not force and self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        changed = self._reload(self._base)
+        changed = self._reload(self._profiles) or changed
+        if changed:
+            self._merged = {}
+
+    def raw(self):
+        """프로필을 적용하지 않은 이 프로그램의 설정"""
+        with self._lock:
+            self._refresh()
+            return self._base.data
+
+    def profiles(self):
+        with self._lock:
+            self._refresh()
+            return self._profiles.data
+
+    def active_profile(self):
+        name = self.raw().get("ACTIVE_PROFILE")
+        return name if name in self.profiles() else None
+
+    def load(self):
+        """기본 설정 + 선택된 프로필 (dict 값은 한 단계까지 합침)"""
+        with self._lock:
+            self._refresh()
+            name = self._base.data.get("ACTIVE_PROFILE")
+            merged = self._merged.get(name)
+            if merged is None:
+                merged = dict(self._base.data)
+                for key, value in self._profiles.data.get(name, {}).items():
+                    if isinstance(value, dict) and isinstance(merged.get(key), dict):
+                        merged[key] = {**merged[key], **value}
+                    else:
+                        merged[key] = value
+                self._merged[name] = merged
+            return merged
+
+    def get(self, key, default=None):
+        return self.load().get(key, default)
+
+    # --------------------- 쓰기 --------------------- #
+    def save(self, config):
+        with self._lock:
+            try:
+                atomic_write_json(self._base.path, config)
+            except OSError as e:
+                self.on_error(f"[오류] 설정 파일을 저장할 수 없습니다: {e}")
+                return False
+            self._refresh(force=True)
+            return True
+
+    def update(self, **values):
+        """기본 설정의 일부 키만 바꿔 저장 (None이면 키 삭제)"""
+        with self._lock:
+            config = dict(self.raw())
+            for key, value in values.items():
+                if value is None:
+                    config.pop(key, None)
+                else:
+                    config[key] = value
+            return self.save(config)
+
+    def use_profile(self, name):
+        """프로필 전환 (None이면 프로필 없이 기본 설정만 사용)"""
+        if name is not None and name not in self.profiles():
+            raise KeyError(f"Unknown profile: {name}")
+        return self.update(ACTIVE_PROFILE=name)
+
+    def save_profile(self, name, values):
+        with self._lock:
+            profiles = dict(self.profiles())
+            profiles[name] = values
+            try:
+                atomic_write_json(self._profiles.path, profiles)
+            except OSError as e:
+                self.on_error(f"[오류] 프로필 파일을 저장할 수 없습니다: {e}")
+                return False
+            self._refresh(force=True)
+            return True
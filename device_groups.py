@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+장비 그룹 지정 문자열 해석 & 서브넷 검색.
+
+Detector IP 입력란에 다음을 쉼표/공백으로 섞어 쓸 수 있습니다.
+  192.168.0.15              단일 IP
+  192.168.0.10-40           마지막 옥텟 범위
+  192.168.0.0/26            서브넷의 모든 호스트 주소
+  @line1                    설정 파일 "DEVICE_GROUPS"에 저장한 그룹
+순서를 유지하고 중복은 한 번만 넣습니다.
+"""
+import ipaddress
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_TARGETS = 1024      # 실수로 /16 등을 넣었을 때 수만 대에 명령을 보내지 않도록
+
+
+def _expand_one(token, groups, seen_groups):
+    if token.startswith("@"):
+        name = token[1:]
+        if name not in groups:
+            raise ValueError(f"저장된 그룹이 없습니다: {name}")
+        if name in seen_groups:
+            raise ValueError(f"그룹이 자기 자신을 포함합니다: {name}")
+        members = groups[name]
+        if isinstance(members, str):
+            members = [members]
+        result = []
+        for member in members:
+            result.extend(expand_targets(member, groups, seen_groups | {name}))
+        return result
+    if "/" in token:
+        net = ipaddress.IPv4Network(token, strict=False)
+        if net.num_addresses > MAX_TARGETS + 2:
+            raise ValueError(f"서브넷이 너무 큽니다 (최대 {MAX_TARGETS}대): {token}")
+        hosts = list(net.hosts()) or [net.network_address]
+        return [str(ip) for ip in hosts]
+    if "-" in token:
+        start, end = token.rsplit("-", 1)
+        first = ipaddress.IPv4Address(start)
+        if "." in end:
+            last = ipaddress.IPv4Address(end)
+        else:
+            last = ipaddress.IPv4Address(f"{start.rsplit('.', 1)[0]}.{int(end)}")
+        if last < first:
+            raise ValueError(f"범위가 잘못되었습니다: {token}")
+        if int(last) - int(first) + 1 > MAX_TARGETS:
+            raise ValueError(f"범위가 너무 큽니다 (최대 {MAX_TARGETS}대): {token}")
+        return [str(ipaddress.IPv4Address(i)) for i in range(int(first), int(last) + 1)]
+    return [str(ipaddress.IPv4Address(token))]
+
+
+def expand_targets(spec, groups=None, _seen_groups=frozenset()):
+    """
+    그룹 지정 문자열 -> IP 목록. 형식이 잘못되었으면 ValueError.
+    groups: {"그룹 이름": ["IP/범위/서브넷/@그룹", ...]}
+    """
+    groups = groups or {}
+    targets = []
+    seen = set()
+    for token in spec.replace(",", " ").split():
+        try:
+            ips = _expand_one(token, groups, _seen_groups)
+        except ipaddress.AddressValueError:
+            raise ValueError(f"IP 주소 형식이 잘못되었습니다: {token}")
+        for ip in ips:
+            if ip not in seen:
+                seen.add(ip)
+                targets.append(ip)
+    if len(targets) > MAX_TARGETS:
+        raise ValueError(f"대상 장비가 너무 많습니다: {len(targets)}대 (최대 {MAX_TARGETS}대)")
+    return targets
+
+
+def probe(ip, port=502, timeout=0.3):
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def discover(spec, port=502, timeout=0.3, workers=64, groups=None):
+    """spec(서브넷 등)의 주소 중 Modbus TCP 포트가 열려 있는 장비 목록 (입력 순서 유지)"""
+    targets = expand_targets(spec, groups)
+    with ThreadPoolExecutor(max_workers=min(workers, max(1, len(targets)))) as pool:
+        alive = list(pool.map(lambda ip: probe(ip, port, timeout), targets))
+    return [ip for ip, ok in zip(targets, alive) if ok]
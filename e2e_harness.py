@@ -0,0 +1,704 @@
+#!/usr/bin/env python3
+"""
+오프라인 업그레이드 종단 간(end-to-end) 하네스.
+
+실제 장비, root 권한, /srv/tftp 없이 한 대의 Linux 머신에서 업그레이드 경로 전체를 돌려 보고
+단계별 소요 시간을 보고합니다. 업그레이드 경로를 고친 뒤 커밋마다 실행해 성능 변화를 확인합니다.
+
+구성
+  - 임시 디렉토리의 설정 파일/TFTP 루트/저널 (serve.py의 config_store 등을 임시 것으로 바꿔 사용)
+  - 내장 TFTP 서버 (tftp_server.py, 127.0.0.1의 임의 포트), serve.tftp_server로 미리 넣어 sudo 없이 사용
+  - 가짜 장비 FakeDevice: 127.0.0.N(루프백)마다 하나씩, 모두 같은 Modbus TCP 포트(설정 MODBUS_PORT)에서
+    명령 레지스터를 받고, 업그레이드 시작(40091=1)이 오면 40088–40089의 TFTP 서버에서
+    40101–40132(하네스 전용)에 적힌 파일을 받아 헤더 MD5를 확인한 뒤
+    재부팅(포트를 잠시 닫음)하고 새 버전을 40022에 보고합니다.
+  - GDSClientLinux 대역: 실제 GDSClientLinux(cmd 4/5)는 포트 3000의 별도 바이너리 프로토콜을 쓰므로
+    같은 명령줄을 받아 Modbus 명령 레지스터로 대신 보내는 스크립트(이 파일의 client 모드)를
+    serve.GDSCLIENT_PATH로 지정합니다.
+  - 실제 Program/*.bin 이미지
+
+단계 (이미지마다 한 라운드, 장비는 동시에 진행)
+  prepare   serve.upgrade_task(): TFTP 루트에 배치 + cmd 4(모드 변경) + 대기
+  transfer  serve.upgrade_task(): cmd 5 (대역 클라이언트가 다운로드 완료까지 기다림)
+  verify    serve의 검증 파이프라인 (재부팅 대기 -> 버전 확인, 불일치 시 롤백)
+  poll      serve.ModbusPoller(파이프라인 + PollScheduler)의 첫 샘플까지 시간, 최소 POLL_MIN_CYCLES 주기 확인
+마지막 stay-up 라운드는 cmd 5가 바로 반환되고 다운로드가 재부팅 대기 한도보다 길게 걸리도록 해서,
+장비가 내려가지 않은 채 다운로드 중일 때 검증이 시작되어도 롤백하지 않는지 확인합니다.
+각 라운드 뒤에는 메모리/스레드/FD를 기록해 누수를 확인합니다 (soak_telemetry).
+
+사용 예)
+  python3 e2e_harness.py
+  python3 e2e_harness.py --devices 8 --loss 0.02 --json result.json
+  python3 e2e_harness.py --compare result.json --tolerance 0.3      (느려지면 종료 코드 1)
+  python3 e2e_harness.py --rounds 20                                (소크: 누수 의심이면 종료 코드 1)
+"""
+import argparse
+import gc
+import glob
+import hashlib
+import json
+import os
+import random
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import serve
+from config_store import ConfigStore
+from fw_image import parse_image, version_from_filename
+from main1 import GDSClient
+from poll_scheduler import PollScheduler
+from rollout_planner import RolloutStats
+from soak_telemetry import SoakMonitor, sample
+from tftp_server import TftpServer, OP_RRQ, OP_DATA, OP_ACK, OP_ERROR, OP_OACK
+from upgrade_journal import rollout_id
+from upgrade_verify import STATUS_IDLE, STATUS_DOWNLOADING, STATUS_DOWNLOADED, STATUS_ROLLED_BACK, STATUS_ERROR
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+IMAGE_NAME = "ASGD3000E_H.bin"      # 파일명 레지스터가 비어 있을 때 장비가 요청하는 고정 이름
+PHASES = ("prepare", "transfer", "verify", "poll")
+POLL_MIN_CYCLES = 2
+
+# 40023 오류 값 중 하네스 가짜 장비가 구분해서 쓰는 것 (나머지 상태 값은 upgrade_verify 참고)
+STATUS_TFTP_ERROR = STATUS_ERROR
+STATUS_IMAGE_ERROR = 0x20
+
+# 하네스 전용 레지스터: 40101–40132 업그레이드 파일명 (레지스터당 2글자, 남는 곳은 0)
+FILENAME_REG = 40101
+FILENAME_REGS = 32
+
+# GDSClientLinux 대역 (client 모드)에 넘기는 환경 변수
+CLIENT_PORT_ENV = "GDS_E2E_MODBUS_PORT"     # 가짜 장비 Modbus 포트
+CLIENT_WAIT_ENV = "GDS_E2E_CLIENT_WAIT"     # "download": cmd 5가 다운로드 완료까지 대기, "none": 바로 반환
+
+_MBAP = struct.Struct('>HHHB')
+
+# 비교 시 이보다 작은 차이(초)는 측정 잡음으로 보고 무시 (수 ms 단계의 비율 변화가 큼)
+COMPARE_MIN_SECONDS = 0.05
+
+
+def log(msg):
+    print(f"[e2e] {msg}", flush=True)
+
+
+# ============================================================
+# 가짜 장비의 TFTP 클라이언트
+# ============================================================
+def tftp_fetch(server, filename, bind_ip, blksize=None, timeout=0.5, retries=10, loss=0.0,
+               progress=None, rng=random):
+    """
+    server(ip, port)에서 filename을 받아 bytes로 반환합니다. 실패하면 IOError.
+    loss: 받은 DATA를 이 확률로 버려(응답하지 않음) 서버 재전송을 일으킴
+    progress(received, total): 블록마다 호출 (total은 tsize를 모르면 None)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.bind((bind_ip, 0))
+        sock.settimeout(timeout)
+        request = struct.pack('>H', OP_RRQ) + filename.encode() + b"\0octet\0tsize\x000\0"
+        if blksize:
+            request += b"blksize\0" + str(blksize).encode() + b"\0"
+        sock.sendto(request, server)
+        size = 512
+        total = None
+        data = bytearray()
+        expect = 1
+        peer = None
+        last_ack = None
+        attempts = 0
+        while True:
+            try:
+                packet, addr = sock.recvfrom(65536)
+            except socket.timeout:
+                attempts += 1
+                if attempts > retries:
+                    raise IOError("TFTP timeout")
+                sock.sendto(last_ack or request, peer or server)
+                continue
+            if peer is None:
+                peer = addr         # 서버가 전송용으로 연 포트(TID)
+            elif addr != peer:
+                continue
+            opcode, block = struct.unpack_from('>HH', packet)
+            if opcode == OP_ERROR:
+                message = packet[4:].split(b"\0", 1)[0].decode(errors="replace")
+                raise IOError(f"TFTP error {block}: {message}")
+            if opcode == OP_OACK:
+                fields = packet[2:].split(b"\0")
+                options = dict(zip(fields[0::2], fields[1::2]))
+                size = int(options.get(b"blksize", size))
+                total = int(options[b"tsize"]) if b"tsize" in options else None
+                last_ack = struct.pack('>HH', OP_ACK, 0)
+                sock.sendto(last_ack, peer)
+                continue
+            if opcode != OP_DATA:
+                continue
+            if loss and rng.random() < loss:
+                continue
+            attempts = 0
+            if block == expect & 0xFFFF:
+                data += packet[4:]
+                expect += 1
+                if progress is not None:
+                    progress(len(data), total)
+            last_ack = struct.pack('>HH', OP_ACK, block)
+            sock.sendto(last_ack, peer)
+            if block == (expect - 1) & 0xFFFF and len(packet) - 4 < size:
+                return bytes(data)
+    finally:
+        sock.close()
+
+
+# ============================================================
+# 가짜 장비 (Modbus TCP 명령 레지스터 + TFTP 다운로드 + 재부팅)
+# ============================================================
+class FakeDevice:
+    REGS = 200      # 40001–40200 (40101~는 하네스 전용)
+
+    def __init__(self, ip, version, versions, tftp_port, port=0, reboot_seconds=1.0, apply_seconds=0.2,
+                 loss=0.0, blksize=None, seed=None, block_delay=0.0):
+        self.ip = ip
+        self.port = port
+        self.versions = versions            # {이미지 SHA-256: 버전}
+        self.tftp_port = tftp_port
+        self.reboot_seconds = reboot_seconds
+        self.apply_seconds = apply_seconds  # 다운로드 후 플래시 기록 시간
+        self.loss = loss
+        self.blksize = blksize
+        self.block_delay = block_delay      # DATA 블록마다 지연 (느린 다운로드)
+        self.rng = random.Random(seed)
+        self.regs = [0] * self.REGS
+        self.regs[21] = version
+        self.previous_version = version
+        self.lock = threading.Lock()
+        self.listener = None
+        self.conns = set()
+        self.online = threading.Event()
+        self.closed = False
+        self.upgrades = 0
+        self.rollbacks = 0
+
+    # ---- 레지스터 ----
+    def _tick(self):
+        # 40001–40011: 측정값이 조금씩 바뀌는 것처럼
+        for i in range(11):
+            self.regs[i] = max(0, min(0xFFFF, self.regs[i] + self.rng.randint(-2, 2)))
+
+    def read(self, addr, count):
+        with self.lock:
+            self._tick()
+            return self.regs[addr:addr + count]
+
+    def write(self, addr, values):
+        with self.lock:
+            self.regs[addr:addr + len(values)] = values
+        for offset, value in enumerate(values):
+            reg = 40001 + addr + offset
+            if reg == 40091 and value == 1:
+                threading.Thread(target=self._upgrade, daemon=True).start()
+            elif reg == 40091 and value == 2:
+                self._rollback()
+            elif reg == 40093 and value == 1:
+                threading.Thread(target=self._reboot, daemon=True).start()
+
+    def set_status(self, status, progress=None, remain=None):
+        with self.lock:
+            self.regs[22] = status
+            if progress is not None:
+                self.regs[23] = (min(remain or 0, 255) << 8) | min(progress, 100)
+
+    # ---- 동작 ----
+    def filename(self):
+        base = FILENAME_REG - 40001
+        with self.lock:
+            raw = struct.pack(f'>{FILENAME_REGS}H', *self.regs[base:base + FILENAME_REGS])
+        return raw.split(b"\0", 1)[0].decode(errors="replace") or IMAGE_NAME
+
+    def _upgrade(self):
+        with self.lock:
+            tftp_ip = socket.inet_ntoa(struct.pack('>HH', self.regs[87], self.regs[88]))
+        filename = self.filename()
+        self.set_status(STATUS_DOWNLOADING, 0, 0)
+        started = time.monotonic()
+
+        def progress(received, total):
+            if self.block_delay:
+                time.sleep(self.block_delay)
+            if not total:
+                return
+            elapsed = time.monotonic() - started
+            remain = int(elapsed * (total - received) / received) if received else 0
+            self.set_status(STATUS_DOWNLOADING, received * 100 // total, remain)
+
+        try:
+            data = tftp_fetch((tftp_ip, self.tftp_port), filename, self.ip, self.blksize,
+                              loss=self.loss, progress=progress, rng=self.rng)
+        except IOError:
+            self.set_status(STATUS_TFTP_ERROR)
+            return
+        info = parse_image(data)
+        version = self.versions.get(hashlib.sha256(data).hexdigest())
+        if (info.has_header and not info.md5_ok) or version is None:
+            self.set_status(STATUS_IMAGE_ERROR)
+            return
+        self.set_status(STATUS_DOWNLOADED, 100, 0)
+        time.sleep(self.apply_seconds)
+        self.upgrades += 1
+        self._reboot(version)
+
+    def _rollback(self):
+        self.rollbacks += 1
+        if self.previous_version is not None:
+            threading.Thread(target=self._reboot, args=(self.previous_version, STATUS_ROLLED_BACK),
+                             daemon=True).start()
+
+    def _reboot(self, new_version=None, status=STATUS_IDLE):
+        self._go_offline()
+        time.sleep(self.reboot_seconds)
+        with self.lock:
+            if new_version is not None:
+                self.previous_version = self.regs[21]
+                self.regs[21] = new_version
+            self.regs[22] = status
+            self.regs[23] = 0
+            self.regs[90] = 0
+        if not self.closed:
+            self._go_online()
+
+    # ---- Modbus TCP 서버 ----
+    def start(self):
+        self._go_online()
+        return self
+
+    def stop(self):
+        self.closed = True
+        self._go_offline()
+
+    def _go_online(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.ip, self.port))
+        listener.listen(16)
+        listener.settimeout(0.2)
+        self.port = listener.getsockname()[1]
+        self.listener = listener
+        self.online.set()
+        threading.Thread(target=self._accept_loop, args=(listener,), daemon=True).start()
+
+    def _go_offline(self):
+        self.online.clear()
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.close()
+        with self.lock:
+            conns, self.conns = self.conns, set()
+        for conn in conns:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def _accept_loop(self, listener):
+        while self.listener is listener:
+            try:
+                conn, _ = listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                self.conns.add(conn)
+            threading.Thread(target=self._serve_conn, args=(conn,), daemon=True).start()
+
+    def _serve_conn(self, conn):
+        buf = b""
+        try:
+            while True:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                buf += chunk
+                while len(buf) >= _MBAP.size:
+                    tid, _, length, unit = _MBAP.unpack_from(buf)
+                    if len(buf) < 6 + length:
+                        break
+                    pdu, buf = buf[7:6 + length], buf[6 + length:]
+                    reply = self._handle_pdu(pdu)
+                    conn.sendall(_MBAP.pack(tid, 0, len(reply) + 1, unit) + reply)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.conns.discard(conn)
+            conn.close()
+
+    def _handle_pdu(self, pdu):
+        fc = pdu[0]
+        try:
+            if fc == 0x03:
+                addr, count = struct.unpack_from('>HH', pdu, 1)
+                if addr + count > self.REGS or not 1 <= count <= 125:
+                    return bytes([fc | 0x80, 2])
+                values = self.read(addr, count)
+                return struct.pack(f'>BB{count}H', fc, count * 2, *values)
+            if fc == 0x06:
+                addr, value = struct.unpack_from('>HH', pdu, 1)
+                if addr >= self.REGS:
+                    return bytes([fc | 0x80, 2])
+                self.write(addr, [value])
+                return pdu[:5]
+            if fc == 0x10:
+                addr, count, _ = struct.unpack_from('>HHB', pdu, 1)
+                if addr + count > self.REGS:
+                    return bytes([fc | 0x80, 2])
+                self.write(addr, list(struct.unpack_from(f'>{count}H', pdu, 6)))
+                return pdu[:5]
+        except struct.error:
+            return bytes([fc | 0x80, 3])
+        return bytes([fc | 0x80, 1])
+
+
+# ============================================================
+# GDSClientLinux 대역 (serve.GDSCLIENT_PATH)
+# ============================================================
+def filename_registers(name):
+    raw = name.encode()[:FILENAME_REGS * 2].ljust(FILENAME_REGS * 2, b"\0")
+    return list(struct.unpack(f'>{FILENAME_REGS}H', raw))
+
+
+def client_main(argv):
+    """
+    GDSClientLinux와 같은 명령줄을 받습니다.
+      <장비 IP> 4 <모드>                   모드 변경 (가짜 장비는 따로 할 일이 없어 성공만 반환)
+      <장비 IP> 5 <TFTP IP> <파일명>       파일명(40101~) + TFTP IP(40088–40089) + 시작(40091)
+    CLIENT_WAIT_ENV가 "download"(기본)이면 다운로드가 끝나거나(재부팅으로 연결이 끊겨도 성공) 오류 상태가 될 때까지 기다립니다.
+    """
+    if len(argv) < 2:
+        print("사용법: e2e_harness.py client <장비 IP> <명령> [인자...]")
+        return 2
+    ip, cmd, args = argv[0], argv[1], argv[2:]
+    if cmd == "4":
+        print(f"{ip}: 모드 변경 {' '.join(args)}")
+        return 0
+    if cmd != "5" or len(args) != 2:
+        print(f"{ip}: 지원하지 않는 명령 {cmd}")
+        return 2
+    tftp_ip, filename = args
+    client = GDSClient(ip, port=int(os.environ[CLIENT_PORT_ENV]), shared=True)
+    try:
+        client.write_registers(FILENAME_REG, filename_registers(filename))
+        client.begin_upgrade(tftp_ip)
+        print(f"{ip}: 업그레이드 시작 ({tftp_ip}/{filename})")
+        if os.environ.get(CLIENT_WAIT_ENV, "download") != "download":
+            return 0
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                status = client.read_status()
+            except (IOError, OSError):
+                print(f"{ip}: 재부팅")
+                return 0
+            if status["status"] >= STATUS_ERROR:
+                print(f"{ip}: 장비 상태 0x{status['status']:02x}")
+                return 1
+            if status["status"] == STATUS_DOWNLOADED:
+                print(f"{ip}: 다운로드 완료")
+                return 0
+            time.sleep(0.01)
+        print(f"{ip}: 다운로드 시간 초과")
+        return 1
+    finally:
+        client.close()
+
+
+def write_client_script(directory):
+    """serve.GDSCLIENT_PATH로 쓸 실행 파일 (이 파일을 client 모드로 실행)"""
+    path = os.path.join(directory, "GDSClientLinux")
+    with open(path, "w") as f:
+        f.write(f"#!/bin/sh\nexec '{sys.executable}' '{os.path.abspath(__file__)}' client \"$@\"\n")
+    os.chmod(path, 0o755)
+    return path
+
+
+# ============================================================
+# 하네스
+# ============================================================
+def upgrade_device(device, image, tftp_server, rollout, scheduler, poll_seconds):
+    """장비 한 대: serve.upgrade_task(배치 -> cmd 4/5 -> 검증) -> 파이프라인 폴링, 단계 시간 측정"""
+    phases = {}
+    result = {"ip": device.ip, "ok": False, "message": "", "phases": phases, "tftp": None, "rolled_back": False}
+    since = time.monotonic()
+    rollbacks = device.rollbacks
+    timings = {}
+    verify = serve.upgrade_task(device.ip, "127.0.0.1", image, rollout, timings)
+    if verify is None:
+        result["message"] = "업그레이드 명령 실패"
+        return result
+    phases["prepare"] = timings["overhead"]
+    phases["transfer"] = timings["transfer_end"] - timings["transfer_start"]
+    res = verify.result()
+    phases["verify"] = time.monotonic() - timings["transfer_end"]
+    tftp = tftp_server.wait_for(device.ip, since, timeout=10)
+    if tftp is not None:
+        result["tftp"] = tftp.to_dict()
+    result["rolled_back"] = res.rolled_back or device.rollbacks != rollbacks
+    result["message"] = res.message
+    if not res.ok:
+        return result
+    if result["rolled_back"]:
+        result["message"] = "검증은 성공했지만 롤백 명령을 받음"
+        return result
+
+    # 업그레이드 뒤 폴링: 파이프라인 폴러 + PollScheduler로 최소 POLL_MIN_CYCLES 주기
+    t0 = time.perf_counter()
+    samples = []
+    enough = threading.Event()
+
+    def on_sample(key, text, status):
+        if text is not None:
+            samples.append(time.perf_counter())
+            if len(samples) >= POLL_MIN_CYCLES:
+                enough.set()
+
+    poller = serve.ModbusPoller(device.ip, on_sample, pipeline_depth=4, scheduler=scheduler, port=device.port)
+    poller.start()
+    try:
+        if not poller.running:
+            result["message"] = "폴링 연결 실패"
+            return result
+        if not enough.wait(5):
+            result["message"] = f"폴링 샘플 {len(samples)}개 (최소 {POLL_MIN_CYCLES}주기)"
+            return result
+        phases["poll"] = samples[0] - t0
+        time.sleep(poll_seconds)
+        if not poller.thread.is_alive():
+            result["message"] = "폴링 스레드가 종료됨"
+            return result
+    finally:
+        poller.stop()
+    result["poll_rate"] = round(len(samples) / (time.perf_counter() - t0), 1)
+    result["ok"] = True
+    return result
+
+
+def run_round(pool, fleet, image, tftp_server, scheduler, poll_seconds, kind="upgrade"):
+    ips = [d.ip for d in fleet]
+    rollout = rollout_id([os.path.basename(image)], ips)
+    serve.get_journal().begin(rollout, ips)
+    t0 = time.perf_counter()
+    results = list(pool.map(lambda d: upgrade_device(d, image, tftp_server, rollout, scheduler, poll_seconds),
+                            fleet))
+    if serve.get_journal().is_complete(rollout):
+        serve.get_journal().end(rollout)
+    rnd = {"kind": kind, "image": os.path.basename(image), "version": version_from_filename(image),
+           "elapsed": time.perf_counter() - t0, "results": results}
+    ok = sum(1 for r in results if r["ok"])
+    log(f"{kind} {rnd['image']}: {ok}/{len(fleet)}대 성공, {rnd['elapsed']:.2f}초")
+    for r in results:
+        if not r["ok"]:
+            log(f"  실패 {r['ip']}: {r['message']}")
+    return rnd
+
+
+def run(images, devices=4, loss=0.0, blksize=1428, reboot_seconds=1.0, poll_seconds=0.5, keep=False, rounds=1,
+        stay_up=True):
+    tmp = tempfile.mkdtemp(prefix="gds-e2e-")
+    tftp_root = os.path.join(tmp, "tftp")
+    os.makedirs(tftp_root)
+
+    versions = {}
+    for path in images:
+        with open(path, "rb") as f:
+            versions[hashlib.sha256(f.read()).hexdigest()] = version_from_filename(path)
+    start_version = min(v for v in versions.values() if v is not None) - 1
+
+    tftp_server = TftpServer(tftp_root, host="127.0.0.1", port=0, timeout=0.2).start()
+    fleet = []
+    for i in range(devices):
+        # 장비마다 다른 루프백 IP, 같은 Modbus 포트 (첫 장비가 고른 임의 포트)
+        port = fleet[0].port if fleet else 0
+        fleet.append(FakeDevice(f"127.0.0.{10 + i}", start_version, versions, tftp_server.address[1], port=port,
+                                reboot_seconds=reboot_seconds, loss=loss, blksize=blksize, seed=i).start())
+    modbus_port = fleet[0].port
+    down_limit = reboot_seconds + 2
+
+    # serve.py를 임시 설정/TFTP 루트/저널/대역 클라이언트로 (홈 디렉토리의 실제 설정과 sudo는 건드리지 않음)
+    saved = (serve.config_store, serve.tftp_server, serve.JOURNAL_FILE, serve.upgrade_journal,
+             serve.rollout_stats, getattr(serve, "GDSCLIENT_PATH", None))
+    serve.config_store = ConfigStore(os.path.join(tmp, "config.json"),
+                                     profiles_path=os.path.join(tmp, "profiles.json"))
+    serve.config_store.save({"TFTP_ROOT_DIR": tftp_root, "TFTP_SERVER": "builtin", "MODBUS_PORT": modbus_port,
+                             "UPGRADE_WORKERS": devices, "VERIFY_WORKERS": devices,
+                             "VERIFY": {"settle": 0.1, "down_limit": down_limit,
+                                        "up_limit": reboot_seconds + 20, "poll_interval": 0.1}})
+    serve.tftp_server = tftp_server
+    serve.JOURNAL_FILE = os.path.join(tmp, "journal.log")
+    serve.upgrade_journal = None
+    serve.rollout_stats = RolloutStats(os.path.join(tmp, "rollout_stats.json"))
+    serve.GDSCLIENT_PATH = write_client_script(tmp)
+    os.environ[CLIENT_PORT_ENV] = str(modbus_port)
+    os.environ[CLIENT_WAIT_ENV] = "download"
+    scheduler = PollScheduler(base_interval=0.01, max_rps=0)
+
+    log(f"장비 {devices}대 (127.0.0.10~, Modbus 포트 {modbus_port}), "
+        f"TFTP {tftp_server.address[0]}:{tftp_server.address[1]}, 임시 디렉토리 {tmp}")
+    report = {"devices": devices, "loss": loss, "blksize": blksize, "reboot": reboot_seconds, "rounds": []}
+    # 라운드마다 메모리/스레드/FD를 기록해 첫 라운드 뒤의 값과 비교 (반복할수록 늘면 누수)
+    monitor = SoakMonitor(warmup=0, log=log)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=devices) as pool:
+            for image in images * rounds:
+                report["rounds"].append(run_round(pool, fleet, image, tftp_server, scheduler, poll_seconds))
+                gc.collect()
+                for problem in monitor.check(sample(), time.perf_counter() - started):
+                    log(f"  누수 의심: {problem}")
+            # stay-up: cmd 5가 바로 반환되고 다운로드가 down_limit보다 오래 걸려, 장비가 켜진 채 다운로드 중일 때
+            # 검증이 버전을 읽게 됨 -> 다운로드/재부팅이 끝날 때까지 기다려야 하고 롤백하면 안 됨
+            current = report["rounds"][-1]["version"] if report["rounds"] else None
+            others = [p for p in images if version_from_filename(p) != current]
+            if stay_up and others:
+                image = others[0]
+                blocks = os.path.getsize(image) / (blksize or 512)
+                for device in fleet:
+                    device.block_delay = (down_limit + 1) / blocks
+                os.environ[CLIENT_WAIT_ENV] = "none"
+                try:
+                    report["rounds"].append(run_round(pool, fleet, image, tftp_server, scheduler, poll_seconds,
+                                                      kind="stay-up"))
+                finally:
+                    os.environ[CLIENT_WAIT_ENV] = "download"
+                    for device in fleet:
+                        device.block_delay = 0.0
+    finally:
+        for device in fleet:
+            device.stop()
+        tftp_server.stop()
+        serve.get_journal().close()
+        (serve.config_store, serve.tftp_server, serve.JOURNAL_FILE, serve.upgrade_journal,
+         serve.rollout_stats, serve.GDSCLIENT_PATH) = saved
+        if not keep:
+            shutil.rmtree(tmp, ignore_errors=True)
+    report["elapsed"] = time.perf_counter() - started
+    report["summary"] = summarize(report)
+    try:
+        monitor.assert_no_leak()
+        report["summary"]["leaks"] = []
+    except AssertionError:
+        report["summary"]["leaks"] = [p for _, p in monitor.violations]
+    return report
+
+
+def summarize(report):
+    """단계별 (평균, 최소, 최대) 초 + TFTP 전송 통계 (stay-up 라운드는 시간 통계에서 제외)"""
+    summary = {}
+    timed = [rnd for rnd in report["rounds"] if rnd.get("kind", "upgrade") == "upgrade"]
+    for phase in PHASES:
+        values = [r["phases"][phase] for rnd in timed for r in rnd["results"] if phase in r["phases"]]
+        if values:
+            summary[phase] = _stats(values)
+    transfers = [r["tftp"] for rnd in timed for r in rnd["results"] if r["tftp"]]
+    if transfers:
+        summary["tftp_throughput"] = _stats([t["throughput"] for t in transfers])
+        summary["tftp_retransmits"] = sum(t["retransmits"] for t in transfers)
+        summary["tftp_timeouts"] = sum(t["timeouts"] for t in transfers)
+    rates = [r["poll_rate"] for rnd in timed for r in rnd["results"] if "poll_rate" in r]
+    if rates:
+        summary["poll_rate"] = _stats(rates)
+    results = [r for rnd in report["rounds"] for r in rnd["results"]]
+    summary["failed"] = sum(1 for r in results if not r["ok"])
+    summary["rolled_back"] = sum(1 for r in results if r["rolled_back"])
+    summary["total"] = len(results)
+    return summary
+
+
+def _stats(values):
+    return {"avg": sum(values) / len(values), "min": min(values), "max": max(values)}
+
+
+def print_summary(summary):
+    print(f"{'단계':<10}{'평균':>10}{'최소':>10}{'최대':>10}")
+    for phase in PHASES:
+        if phase in summary:
+            s = summary[phase]
+            print(f"{phase:<10}{s['avg']:>9.3f}s{s['min']:>9.3f}s{s['max']:>9.3f}s")
+    if "tftp_throughput" in summary:
+        s = summary["tftp_throughput"]
+        print(f"TFTP 전송 속도 평균 {s['avg'] / 1024:.0f}KB/s (최소 {s['min'] / 1024:.0f}, "
+              f"최대 {s['max'] / 1024:.0f}), 재전송 {summary['tftp_retransmits']}, "
+              f"타임아웃 {summary['tftp_timeouts']}")
+    if "poll_rate" in summary:
+        print(f"폴링 {summary['poll_rate']['avg']:.0f}회/초")
+    print(f"실패 {summary['failed']}/{summary['total']}, 롤백 {summary['rolled_back']}")
+    if summary.get("leaks"):
+        print(f"누수 의심: {'; '.join(summary['leaks'])}")
+
+
+def compare(summary, baseline, tolerance):
+    """baseline보다 tolerance(비율) 넘게, COMPARE_MIN_SECONDS 이상 느려진 단계 목록"""
+    regressions = []
+    for phase in PHASES:
+        if phase not in summary or phase not in baseline:
+            continue
+        old, new = baseline[phase]["avg"], summary[phase]["avg"]
+        change = (new - old) / old if old > 0 else 0.0
+        print(f"{phase:<10}{old:>9.3f}s -> {new:>7.3f}s ({change:+.0%})")
+        if change > tolerance and new - old > COMPARE_MIN_SECONDS:
+            regressions.append(phase)
+    return regressions
+
+
+def default_images():
+    # 버전 순으로 (오래된 것부터) 업그레이드
+    paths = [p for p in glob.glob(os.path.join(HERE, "Program", "*.bin")) if version_from_filename(p)]
+    return sorted(paths, key=lambda p: (version_from_filename(p), p))
+
+
+def main():
+    if sys.argv[1:2] == ["client"]:
+        sys.exit(client_main(sys.argv[2:]))
+    parser = argparse.ArgumentParser(description="오프라인 업그레이드 종단 간 하네스")
+    parser.add_argument("images", nargs="*", help="업그레이드할 이미지 (기본: Program/*.bin 버전 순)")
+    parser.add_argument("--devices", type=int, default=4, help="가짜 장비 수 (기본: 4)")
+    parser.add_argument("--loss", type=float, default=0.0, help="장비가 TFTP DATA를 버릴 확률 (재전송 유발)")
+    parser.add_argument("--blksize", type=int, default=1428, help="장비가 요청할 TFTP blksize (0이면 옵션 없이 512)")
+    parser.add_argument("--reboot", type=float, default=1.0, help="가짜 장비 재부팅 시간 (초)")
+    parser.add_argument("--poll-seconds", type=float, default=0.5, help="업그레이드 후 폴링 측정 시간 (초)")
+    parser.add_argument("--json", help="결과를 JSON 파일로 저장")
+    parser.add_argument("--compare", help="이전 결과 JSON과 단계별 평균 시간 비교")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="비교 시 허용 비율 (기본: 0.2 = 20%%)")
+    parser.add_argument("--keep", action="store_true", help="임시 디렉토리를 지우지 않음")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="이미지 목록을 반복할 횟수 (소크: 라운드마다 메모리/스레드/FD 누수 확인)")
+    parser.add_argument("--no-stay-up", action="store_true", help="다운로드 중 검증 시작(stay-up) 라운드를 건너뜀")
+    args = parser.parse_args()
+
+    images = args.images or default_images()
+    if not images:
+        parser.error("이미지가 없습니다")
+    report = run(images, args.devices, args.loss, args.blksize or None, args.reboot, args.poll_seconds, args.keep,
+                 args.rounds, not args.no_stay_up)
+    print_summary(report["summary"])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    exit_code = 1 if report["summary"]["failed"] or report["summary"]["leaks"] else 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+        regressions = compare(report["summary"], baseline, args.tolerance)
+        if regressions:
+            print(f"느려진 단계: {', '.join(regressions)}")
+            exit_code = 1
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+펌웨어 이미지 블록 유사도 측정 & TFTP 배포 캐시.
+
+1) 유사도 측정 (rsync 방식)
+   이전 이미지를 block_size 단위로 나눠 약한 체크섬(rolling) + MD5로 색인하고,
+   새 이미지를 한 바이트씩 밀면서 같은 블록이 어디에 있든 찾아냅니다.
+   일치하지 않는 바이트(리터럴)와 복사 명령 수로 "부트로더가 델타를 지원했다면"
+   전송했을 크기를 추정합니다.
+
+2) 배포 캐시 (FirmwareCache)
+   이미지 내용(SHA-256)이 이미 TFTP 루트에 같은 이름으로 있으면 다시 쓰지 않습니다.
+   장비마다 같은 파일을 반복해서 복사하던 것을 버전당 한 번으로 줄입니다.
+   복사가 필요하면 임시 파일에 쓴 뒤 os.replace로 바꿔, 전송 중인 장비가 반쯤 쓰인 파일을 읽지 않게 합니다.
+
+사용 예)
+  python3 fw_delta.py compare Program/ASGD3000E_V362_H.bin Program/ASGD3000E_V364_H.bin
+  python3 fw_delta.py matrix Program/*.bin --block 128
+"""
+import argparse
+import hashlib
+import os
+import shutil
+import threading
+
+from fw_image import payload
+
+DEFAULT_BLOCK = 256
+COPY_OP_BYTES = 8       # 델타 형식에서 복사 명령 하나의 예상 크기 (오프셋 4 + 길이 4)
+
+
+# --------------------- 유사도 측정 --------------------- #
+def _weak(block):
+    a = sum(block) & 0xFFFF
+    b = sum((len(block) - i) * x for i, x in enumerate(block)) & 0xFFFF
+    return a, b
+
+
+def block_similarity(old, new, block_size=DEFAULT_BLOCK):
+    """
+    new를 old로부터 만들 때 재사용 가능한 바이트 수를 계산합니다.
+    반환: dict (matched_bytes, literal_bytes, copy_ops, aligned_equal_blocks, est_delta_bytes, saving)
+    """
+    old = bytes(old)
+    new = bytes(new)
+    index = {}
+    for off in range(0, len(old) - block_size + 1, block_size):
+        blk = old[off:off + block_size]
+        a, b = _weak(blk)
+        index.setdefault((b << 16) | a, {}).setdefault(hashlib.md5(blk).digest(), off)
+
+    matched = copy_ops = 0
+    last_copy_end = None     # 연속된 복사는 명령 하나로 합침
+    i = 0
+    n = len(new)
+    a = b = None
+    while i + block_size <= n:
+        if a is None:
+            a, b = _weak(new[i:i + block_size])
+        hit = index.get((b << 16) | a)
+        if hit is not None:
+            off = hit.get(hashlib.md5(new[i:i + block_size]).digest())
+            if off is not None:
+                matched += block_size
+                if last_copy_end != off:
+                    copy_ops += 1
+                last_copy_end = off + block_size
+                i += block_size
+                a = None
+                continue
+        # 한 바이트 밀기
+        last_copy_end = None
+        if i + block_size < n:
+            out_b, in_b = new[i], new[i + block_size]
+            a = (a - out_b + in_b) & 0xFFFF
+            b = (b - block_size * out_b + a) & 0xFFFF
+        i += 1
+
+    aligned = sum(
+        1 for off in range(0, min(len(old), len(new)) - block_size + 1, block_size)
+        if old[off:off + block_size] == new[off:off + block_size]
+    )
+    literal = n - matched
+    est = literal + copy_ops * COPY_OP_BYTES
+    return {
+        "block_size": block_size,
+        "old_size": len(old),
+        "new_size": n,
+        "matched_bytes": matched,
+        "literal_bytes": literal,
+        "copy_ops": copy_ops,
+        "aligned_equal_blocks": aligned,
+        "est_delta_bytes": est,
+        "saving": round(1 - est / n, 4) if n else 0.0,
+    }
+
+
+def compare_files(old_path, new_path, block_size=DEFAULT_BLOCK):
+    """헤더를 제외한 본문끼리 비교합니다."""
+    with open(old_path, 'rb') as f:
+        old = payload(f.read())
+    with open(new_path, 'rb') as f:
+        new = payload(f.read())
+    return block_similarity(old, new, block_size)
+
+
+def format_report(old_path, new_path, r):
+    return (
+        f"{os.path.basename(old_path)} -> {os.path.basename(new_path)}: "
+        f"일치 {r['matched_bytes']}/{r['new_size']}B ({r['matched_bytes'] / max(r['new_size'], 1):.1%}), "
+        f"같은 위치 블록 {r['aligned_equal_blocks']}개, "
+        f"델타 예상 {r['est_delta_bytes']}B (절감 {r['saving']:.1%})"
+    )
+
+
+# --------------------- TFTP 배포 캐시 --------------------- #
+class FirmwareCache:
+    def __init__(self, tftp_root):
+        self.tftp_root = tftp_root
+        self._lock = threading.Lock()
+        self._digests = {}      # key: 절대 경로, value: ((size, mtime_ns), sha256 hex) - 경로마다 최신 것 하나만
+        self._staged = {}       # key: 배포 파일명, value: (sha256, 원본 경로)
+
+    def digest(self, path):
+        st = os.stat(path)
+        path = os.path.abspath(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        entry = self._digests.get(path)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                h.update(chunk)
+        d = h.hexdigest()
+        self._digests[path] = (stamp, d)
+        return d
+
+    def previous_source(self, dest_name):
+        """해당 배포 파일명으로 마지막에 올린 원본 경로 (없으면 None)"""
+        entry = self._staged.get(dest_name)
+        return entry[1] if entry else None
+
+    def stage(self, src, dest_name=None):
+        """
+        src를 TFTP 루트에 dest_name(기본: 원본 파일명)으로 배치합니다.
+        반환: (대상 경로, 실제로 복사했는지)
+        """
+        dest_name = dest_name or os.path.basename(src)
+        dest = os.path.join(self.tftp_root, dest_name)
+        with self._lock:
+            src_digest = self.digest(src)
+            if os.path.isfile(dest) and os.path.getsize(dest) == os.path.getsize(src) \
+                    and self.digest(dest) == src_digest:
+                self._staged.setdefault(dest_name, (src_digest, src))
+                return dest, False
+            tmp = f"{dest}.tmp-{os.getpid()}"
+            try:
+                shutil.copyfile(src, tmp)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, dest)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._staged[dest_name] = (src_digest, src)
+            return dest, True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="펌웨어 이미지 블록 유사도 측정")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--block", type=int, default=DEFAULT_BLOCK, help="블록 크기 (기본: 256)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    cmp_p = sub.add_parser("compare", parents=[common], help="두 이미지 비교 (old -> new)")
+    cmp_p.add_argument("old")
+    cmp_p.add_argument("new")
+    mat_p = sub.add_parser("matrix", parents=[common], help="여러 이미지를 이름순으로 모두 짝지어 비교")
+    mat_p.add_argument("images", nargs="+")
+    args = parser.parse_args()
+
+    if args.cmd == "compare":
+        r = compare_files(args.old, args.new, args.block)
+        print(format_report(args.old, args.new, r))
+    else:
+        images = sorted(args.images)
+        total_full = total_delta = 0
+        for i, old in enumerate(images):
+            for new in images[i + 1:]:
+                r = compare_files(old, new, args.block)
+                print(format_report(old, new, r))
+                total_full += r["new_size"]
+                total_delta += r["est_delta_bytes"]
+        if total_full:
+            print(f"전체: 원본 {total_full}B, 델타 예상 {total_delta}B "
+                  f"(절감 {1 - total_delta / total_full:.1%})")
+
+
+if __name__ == "__main__":
+    main()
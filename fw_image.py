@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+ASGD3000E 펌웨어 이미지 헤더 해석.
+
+_H 이미지는 24바이트 헤더 뒤에 STM32 펌웨어 본문이 붙어 있습니다.
+  0-3   빌드 날짜 (BCD, little-endian u32, 예: 0x20241226 -> 2024-12-26)
+  4-7   본문 길이 (little-endian u32)
+  8-23  본문 MD5
+헤더가 없는 이미지(예: ASGD3000E_V364.bin)는 첫 워드가 벡터 테이블의 초기 SP(0x2000xxxx)입니다.
+"""
+import hashlib
+import os
+import re
+import struct
+
+HEADER = struct.Struct('<II16s')
+
+_VERSION_RE = re.compile(r'_V(\d+)', re.IGNORECASE)
+
+
+class FirmwareInfo:
+    def __init__(self, path, size, has_header, build_date=None, payload_size=None,
+                 md5=None, md5_ok=None):
+        self.path = path
+        self.size = size
+        self.has_header = has_header
+        self.build_date = build_date        # "2024-12-26"
+        self.payload_size = payload_size
+        self.md5 = md5                      # 헤더에 기록된 본문 MD5 (hex)
+        self.md5_ok = md5_ok                # 본문 MD5가 헤더와 일치하는지
+        self.version = version_from_filename(path)
+
+    @property
+    def payload_offset(self):
+        return HEADER.size if self.has_header else 0
+
+    def to_dict(self):
+        return {
+            "path": self.path, "size": self.size, "has_header": self.has_header,
+            "build_date": self.build_date, "payload_size": self.payload_size,
+            "md5": self.md5, "md5_ok": self.md5_ok, "version": self.version,
+        }
+
+
+def version_from_filename(path):
+    """"ASGD3000E_V364_H.bin" -> 364, 버전 표기가 없으면 None"""
+    m = _VERSION_RE.search(os.path.basename(path))
+    return int(m.group(1)) if m else None
+
+
+def _bcd_date(value):
+    digits = f"{value:08x}"
+    if not digits.isdigit():
+        return None
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:]}"
+
+
+def parse_image(data, path=""):
+    """
+    이미지 바이트(bytes/mmap/memoryview)로부터 FirmwareInfo를 만듭니다.
+    헤더의 길이 필드가 실제 본문 길이와 맞을 때만 헤더가 있는 이미지로 봅니다.
+    """
+    size = len(data)
+    if size >= HEADER.size:
+        date, length, digest = HEADER.unpack_from(data, 0)
+        build_date = _bcd_date(date)
+        if build_date and length == size - HEADER.size:
+            payload = memoryview(data)[HEADER.size:]
+            try:
+                md5_ok = hashlib.md5(payload).digest() == digest
+            finally:
+                payload.release()
+            return FirmwareInfo(path, size, True, build_date, length, digest.hex(), md5_ok)
+    return FirmwareInfo(path, size, False, payload_size=size)
+
+
+def read_image_info(path):
+    with open(path, 'rb') as f:
+        return parse_image(f.read(), path)
+
+
+def payload(data):
+    """헤더를 제외한 본문 (헤더가 없으면 전체)"""
+    info = parse_image(data)
+    return data[info.payload_offset:]
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+펌웨어 이미지 라이브러리 색인 (여러 CPU 코어로 병렬 분석).
+
+라이브러리 디렉토리 아래의 *.bin 이미지마다
+  - SHA-256 (파일 전체), CRC32 (본문)
+  - 헤더 해석 (빌드 날짜, 본문 길이, 본문 MD5 일치 여부) -> fw_image.parse_image
+  - 파일명의 버전 (_V364 -> 364)
+  - 유사도 지문: 본문을 내용 기준(content-defined)으로 나눈 조각의 해시 중 가장 작은 FINGERPRINT_SIZE개
+    (bottom-k 스케치, 두 지문의 겹침 비율 ≈ 공유 조각 비율)
+    조각 경계는 특정 2바이트 패턴(_ANCHOR) 뒤로 정하므로, 앞에 코드가 추가/삭제되어 뒤쪽 내용이
+    밀려도 같은 내용은 같은 조각으로 잘립니다. (고정 위치 블록은 한 바이트만 밀려도 모두 달라짐)
+    경계 찾기는 정규식 엔진(C)으로 하므로 바이트마다 파이썬 반복을 돌지 않습니다.
+를 계산해 한 개의 JSON 색인 파일에 저장합니다.
+파일은 mmap으로 읽고, 크기·mtime이 색인과 같으면 다시 분석하지 않습니다.
+
+사용 예)
+  python3 fw_library.py scan Program
+  python3 fw_library.py scan /data/firmware --jobs 8 --full
+  python3 fw_library.py similar Program Program/ASGD3000E_V364_H.bin
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from fw_image import parse_image
+
+INDEX_NAME = ".fw_index.json"
+INDEX_VERSION = 2          # 2: 내용 기준 조각 지문 (1: 고정 위치 64바이트 블록)
+FINGERPRINT_SIZE = 64
+# 내용 기준 조각: 평균 100여 바이트, 최소/최대 길이로 너무 잘거나 긴 조각을 막음
+CHUNK_MIN = 16
+CHUNK_MAX = 256
+
+
+def _byte_class(values):
+    return b"[" + b"".join(re.escape(bytes([v])) for v in values) + b"]"
+
+
+# 경계 패턴: 첫 바이트가 집합 A, 둘째 바이트가 집합 B (각각 256개 중 약 1/8, 0x00/0xFF 채움 구간 제외)
+_RANK = [hashlib.sha256(bytes([v])).digest()[0] for v in range(256)]
+_ANCHOR = re.compile(_byte_class(v for v in range(1, 255) if _RANK[v] < 32)
+                     + _byte_class(v for v in range(1, 255) if 64 <= _RANK[v] < 96))
+
+
+def _chunks(body):
+    """body를 내용 기준 경계로 나눈 (시작, 끝) 목록"""
+    bounds = []
+    start = 0
+    for m in _ANCHOR.finditer(body):
+        end = m.end()
+        if end - start < CHUNK_MIN:
+            continue
+        while end - start > CHUNK_MAX:
+            bounds.append((start, start + CHUNK_MAX))
+            start += CHUNK_MAX
+        if end - start >= CHUNK_MIN:
+            bounds.append((start, end))
+            start = end
+    while len(body) - start > CHUNK_MAX:
+        bounds.append((start, start + CHUNK_MAX))
+        start += CHUNK_MAX
+    if start < len(body):
+        bounds.append((start, len(body)))
+    return bounds
+
+
+def _fingerprint(body):
+    hashes = {zlib.crc32(body[a:b]) for a, b in _chunks(body)}
+    return sorted(hashes)[:FINGERPRINT_SIZE]
+
+
+def analyze(path):
+    """이미지 하나 분석 (작업 프로세스에서 실행). 반환: 색인 항목 dict"""
+    st = os.stat(path)
+    entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    with open(path, 'rb') as f:
+        if st.st_size == 0:
+            data = b""
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            info = parse_image(data, path)
+            view = memoryview(data)
+            try:
+                body = view[info.payload_offset:]
+                entry.update({
+                    "sha256": hashlib.sha256(view).hexdigest(),
+                    "crc32": f"{zlib.crc32(body):08x}",
+                    "fingerprint": _fingerprint(body),
+                })
+                body.release()
+            finally:
+                view.release()
+        finally:
+            if st.st_size:
+                data.close()
+    meta = info.to_dict()
+    del meta["path"], meta["size"]
+    entry.update(meta)
+    return entry
+
+
+def similarity(fp_a, fp_b):
+    """두 지문으로 추정한 공유 조각 비율 (0~1)"""
+    if not fp_a or not fp_b:
+        return 0.0
+    a, b = set(fp_a), set(fp_b)
+    # 합집합의 bottom-k 중 양쪽에 모두 있는 비율
+    union_k = sorted(a | b)[:FINGERPRINT_SIZE]
+    return sum(1 for h in union_k if h in a and h in b) / len(union_k)
+
+
+def index_path_for(root):
+    return os.path.join(root, INDEX_NAME)
+
+
+def load_index(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get("version") != INDEX_VERSION:
+        return {}
+    return index.get("images", {})
+
+
+def save_index(path, images):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "images": images}, f, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, path)
+
+
+def find_images(root, pattern_ext=".bin"):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if name.lower().endswith(pattern_ext):
+                yield os.path.join(dirpath, name)
+
+
+def scan(root, index_path=None, jobs=None, full=False):
+    """
+    라이브러리를 스캔하고 색인을 갱신합니다.
+    반환: (images, stats) - images는 {상대 경로: 항목}, stats는 개수/소요 시간 dict
+    """
+    started = time.monotonic()
+    index_path = index_path or index_path_for(root)
+    old = {} if full else load_index(index_path)
+    images = {}
+    todo = []
+    for path in find_images(root):
+        rel = os.path.relpath(path, root)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        prev = old.get(rel)
+        if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+            images[rel] = prev
+        else:
+            todo.append((rel, path))
+
+    errors = {}
+    if len(todo) > 1 and jobs != 1:
+        # 이미지가 작아서 항목 단위로 넘기면 프로세스 간 통신 비용이 더 크므로 묶어서 전달
+        workers = jobs or os.cpu_count() or 1
+        chunksize = max(1, len(todo) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_analyze_safe, [p for _, p in todo], chunksize=chunksize)
+            for (rel, _), (entry, err) in zip(todo, results):
+                if err:
+                    errors[rel] = err
+                else:
+                    images[rel] = entry
+    else:
+        for rel, path in todo:
+            entry, err = _analyze_safe(path)
+            if err:
+                errors[rel] = err
+            else:
+                images[rel] = entry
+
+    if todo or set(old) != set(images) or not os.path.exists(index_path):
+        save_index(index_path, images)
+    stats = {
+        "total": len(images), "analyzed": len(todo) - len(errors), "reused": len(images) - len(todo) + len(errors),
+        "removed": len(set(old) - set(images)), "errors": errors,
+        "elapsed": round(time.monotonic() - started, 3),
+    }
+    return images, stats
+
+
+def _analyze_safe(path):
+    try:
+        return analyze(path), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+
+def format_entry(rel, e):
+    header = f"헤더 {e['build_date']} MD5 {'OK' if e['md5_ok'] else '불일치'}" if e["has_header"] else "헤더 없음"
+    return f"{rel}: V{e['version']} {e['size']}B CRC32 {e['crc32']} {header} SHA-256 {e['sha256'][:16]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="펌웨어 이미지 라이브러리 색인")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    scan_p = sub.add_parser("scan", help="라이브러리 스캔 및 색인 갱신")
+    scan_p.add_argument("root")
+    scan_p.add_argument("--index", help=f"색인 파일 경로 (기본: <root>/{INDEX_NAME})")
+    scan_p.add_argument("--jobs", type=int, help="작업 프로세스 수 (기본: CPU 코어 수)")
+    scan_p.add_argument("--full", action="store_true", help="색인을 무시하고 전부 다시 분석")
+    scan_p.add_argument("-v", "--verbose", action="store_true", help="이미지별 결과 출력")
+    sim_p = sub.add_parser("similar", help="색인 지문으로 비슷한 이미지 찾기")
+    sim_p.add_argument("root")
+    sim_p.add_argument("image")
+    sim_p.add_argument("--index")
+    sim_p.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    images, stats = scan(args.root, args.index, jobs=getattr(args, "jobs", None), full=getattr(args, "full", False))
+    if args.cmd == "scan":
+        if args.verbose:
+            for rel in sorted(images):
+                print(format_entry(rel, images[rel]))
+        bad = [rel for rel, e in images.items() if e["has_header"] and not e["md5_ok"]]
+        for rel in sorted(bad):
+            print(f"[경고] 본문 MD5 불일치: {rel}")
+        for rel, err in sorted(stats["errors"].items()):
+            print(f"[오류] {rel}: {err}")
+        print(f"이미지 {stats['total']}개 (분석 {stats['analyzed']}, 재사용 {stats['reused']}, "
+              f"삭제 {stats['removed']}) {stats['elapsed']}초")
+    else:
+        target = analyze(args.image)
+        ranked = sorted(((similarity(target["fingerprint"], e["fingerprint"]), rel)
+                         for rel, e in images.items() if e["sha256"] != target["sha256"]), reverse=True)
+        for score, rel in ranked[:args.top]:
+            print(f"{score:6.1%}  {rel}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,44 @@
 #!/usr/bin/env python3
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
 import subprocess
 import os
-import shutil
 import stat
 import time
 import threading
-import socket
-import json
-
-os.environ['DISPLAY'] = ':0'
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+
+import device_groups
+from config_store import ConfigStore, entry_text
+from fw_delta import FirmwareCache
+import netif
+from upgrade_journal import UpgradeJournal, rollout_id
+from upgrade_verify import VerificationPipeline
+from tftp_server import TftpServer, MAX_BLKSIZE
+
+# tkinter는 main()에서 임포트하고 UI 위젯은 build_ui()에서 생성합니다.
+# (모듈을 임포트하는 것만으로 창이 뜨지 않도록)
+tk = ttk = filedialog = messagebox = scrolledtext = simpledialog = None
+root = None
+detector_ip_entry = tftp_ip_entry = file_entry = log_text = results_tree = profile_var = None
+WINDOW_TITLE = "GDS 클라이언트 UI (실시간 로그 & IP 자동 설정)"
 
 # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 # 1) GDSClientLinux의 절대 경로 설정을 제거 (동적으로 설정)
 # 2) 설정 파일 경로 설정
 CONFIG_FILE = os.path.expanduser("~/gds_client_config.json")
+config_store = ConfigStore(CONFIG_FILE, on_error=lambda msg: async_log_print(msg))
 
-# 3) TFTP 서버 루트 디렉토리(예: /srv/tftp)
+# 3) TFTP 서버 루트 디렉토리(예: /srv/tftp), 프로필의 TFTP_ROOT_DIR이 있으면 그 값
 TFTP_ROOT_DIR = "/srv/tftp"
+firmware_caches = {}    # key: TFTP 루트, value: FirmwareCache
+
+# 4) 업그레이드 저널 (중단된 업그레이드 기록)
+JOURNAL_FILE = os.path.expanduser("~/.gds_upgrade_journal.log")
+
+# 5) 여러 장비에 명령을 보낼 때 동시에 실행할 최대 작업 수 (설정 파일 GROUP_WORKERS로 변경)
+GROUP_WORKERS = 16
+# 6) 재부팅 후 버전 검증을 동시에 진행할 최대 장비 수 (설정 파일 VERIFY_WORKERS로 변경)
+VERIFY_WORKERS = 4
 # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
 
 # --------------------- (A) 로그 업데이트를 안전하게 수행하는 함수 --------------------- #
@@ -26,17 +46,22 @@ def async_log_print(msg: str):
     """
     다른 스레드에서 호출하면,
     메인 스레드가 log_text에 안전하게 append하도록 해준다.
+    UI가 없으면 표준 출력으로 보낸다.
     """
+    if root is None:
+        print(msg.rstrip(), flush=True)
+        return
     def insert_log():
         log_text.insert(tk.END, msg.rstrip() + "\n")
         log_text.see(tk.END)  # 자동 스크롤
     root.after(0, insert_log)
 
 # --------------------- (B) 실시간 출력 받는 subprocess 실행 함수 --------------------- #
-def run_command_realtime(args):
+def run_command_realtime(args, collect=None):
     """
     subprocess.Popen으로 args를 실행하고,
     stdout을 한 줄씩 읽어 async_log_print로 실시간 표시한다.
+    collect(리스트)를 주면 출력 줄을 거기에도 모은다.
     결과 코드(0=성공, 그 외=에러)를 리턴.
     """
     try:
@@ -56,6 +81,8 @@ def run_command_realtime(args):
         if not line:
             break
         async_log_print(line)
+        if collect is not None:
+            collect.append(line)
 
     p.wait()  # 프로세스 종료 대기
     return p.returncode
@@ -63,27 +90,17 @@ def run_command_realtime(args):
 # --------------------- (C) 설정 파일 관리 함수 --------------------- #
 def load_config():
     """
-    설정 파일을 로드하여 딕셔너리로 반환합니다.
+    설정(선택된 프로필 적용)을 딕셔너리로 반환합니다. 파일은 바뀌었을 때만 다시 읽습니다.
     설정 파일이 없거나 읽을 수 없는 경우 빈 딕셔너리를 반환합니다.
+    반환된 딕셔너리는 공유 캐시이므로 수정하지 말고 save_config()/config_store.update()를 사용합니다.
     """
-    if not os.path.isfile(CONFIG_FILE):
-        return {}
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        async_log_print(f"[오류] 설정 파일을 로드할 수 없습니다: {e}")
-        return {}
+    return config_store.load()
 
 def save_config(config):
     """
-    딕셔너리를 설정 파일로 저장합니다.
+    딕셔너리를 설정 파일로 저장합니다. (임시 파일에 쓴 뒤 교체)
     """
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=4)
-    except Exception as e:
-        async_log_print(f"[오류] 설정 파일을 저장할 수 없습니다: {e}")
+    config_store.save(config)
 
 def select_gdsclientlinux():
     """
@@ -94,9 +111,7 @@ def select_gdsclientlinux():
         filetypes=[("Executable Files", "GDSClientLinux*"), ("All Files", "*.*")]
     )
     if filepath:
-        config = load_config()
-        config['GDSCLIENT_PATH'] = filepath
-        save_config(config)
+        config_store.update(GDSCLIENT_PATH=filepath)
         async_log_print(f"[설정] GDSClientLinux 경로가 설정되었습니다: {filepath}")
         return filepath
     else:
@@ -121,57 +136,193 @@ def get_gdsclient_path():
             root.quit()
             return None
 
-# --------------------- (D) 단일 명령(조회, 재부팅, 모드변경 등)을 실행하는 함수들 --------------------- #
-def get_chip_size():
-    ip = detector_ip_entry.get().strip()
-    if not ip:
+# --------------------- (D) 명령(조회, 재부팅, 모드변경 등)을 장비 그룹에 실행하는 함수들 --------------------- #
+# Detector IP 입력란은 단일 IP 외에 범위/서브넷/저장된 그룹(@이름)을 받습니다. (device_groups 참고)
+# 여러 대는 고정 크기 작업 풀에서 동시에 실행하고 결과를 표에 모읍니다.
+group_pool = None
+group_pool_workers = None
+pool_lock = threading.Lock()  # 작업 풀/검증 파이프라인/저널 지연 생성용
+
+def get_group_pool():
+    """작업 풀 (프로필 변경 등으로 GROUP_WORKERS가 바뀌면 새 크기로 다시 만듦, 진행 중인 작업은 기존 풀에서 마저 실행)"""
+    global group_pool, group_pool_workers
+    with pool_lock:
+        workers = int(load_config().get('GROUP_WORKERS', GROUP_WORKERS))
+        if group_pool is not None and group_pool_workers != workers:
+            group_pool.shutdown(wait=False)
+            group_pool = None
+        if group_pool is None:
+            group_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="group")
+            group_pool_workers = workers
+        return group_pool
+
+def log_task_error(future):
+    """작업 풀에 넣은 작업이 예외로 끝나면 로그에 남긴다 (future.add_done_callback 용)"""
+    if not future.cancelled() and future.exception() is not None:
+        async_log_print(f"[오류] 작업 실행 중 예외: {future.exception()!r}")
+
+def get_targets():
+    """
+    Detector IP 입력란을 IP 목록으로 바꿉니다. 비어 있거나 형식이 잘못되었으면 경고 후 None.
+    """
+    spec = detector_ip_entry.get().strip()
+    if not spec:
         messagebox.showwarning("경고", "Detector IP를 입력하세요")
-        return
+        return None
+    try:
+        targets = device_groups.expand_targets(spec, load_config().get('DEVICE_GROUPS', {}))
+    except ValueError as e:
+        messagebox.showwarning("경고", str(e))
+        return None
+    if not targets:
+        messagebox.showwarning("경고", "Detector IP를 입력하세요")
+        return None
+    return targets
 
-    def task():
-        run_command_realtime([GDSCLIENT_PATH, ip, "0"])
-    threading.Thread(target=task, daemon=True).start()
+def run_command_capture(args, timeout=60):
+    """
+    그룹 실행용: 출력을 로그에 바로 쓰지 않고 모아서 (결과 코드, 출력 줄 목록)을 리턴.
+    """
+    try:
+        p = subprocess.run(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            timeout=timeout
+        )
+    except FileNotFoundError:
+        return -1, [f"실행 파일을 찾을 수 없습니다: {args[0]}"]
+    except subprocess.TimeoutExpired:
+        return -1, [f"{timeout}초 안에 끝나지 않았습니다"]
+    return p.returncode, [line for line in p.stdout.splitlines() if line.strip()]
 
-def get_mode():
-    ip = detector_ip_entry.get().strip()
-    if not ip:
-        messagebox.showwarning("경고", "Detector IP를 입력하세요")
+def run_on_targets(label, cmd_args, confirm=False):
+    """
+    대상 장비마다 GDSClientLinux <ip> <cmd_args...>를 실행합니다.
+    한 대면 기존처럼 출력을 실시간으로 로그에 표시하고, 여러 대면 요약만 로그와 결과 표에 남깁니다.
+    """
+    targets = get_targets()
+    if not targets:
         return
+    if confirm and len(targets) > 1 and not messagebox.askyesno(
+            "확인", f"{len(targets)}대의 장비에 '{label}'을(를) 실행할까요?"):
+        return
+    clear_results()
+    started = time.monotonic()
+
+    def task(ip):
+        t0 = time.monotonic()
+        if len(targets) == 1:
+            lines = []
+            ret = run_command_realtime([GDSCLIENT_PATH, ip] + cmd_args, collect=lines)
+        else:
+            ret, lines = run_command_capture([GDSCLIENT_PATH, ip] + cmd_args)
+            async_log_print(f"[{ip}] {label}: {lines[-1] if lines else ret}")
+        output = lines[-1].strip() if lines else ""
+        elapsed = time.monotonic() - t0
+        root.after(0, lambda: add_result(ip, label, ret, output, elapsed))
+        return ret
+
+    pool = get_group_pool()
+    futures = [pool.submit(task, ip) for ip in targets]
+    for future in futures:
+        future.add_done_callback(log_task_error)
+    if len(targets) > 1:
+        async_log_print(f"[그룹] {label}: {len(targets)}대 실행 중...")
+
+        def summarize():
+            codes = [f.result() for f in futures]
+            ok = sum(1 for c in codes if c == 0)
+            async_log_print(f"[그룹] {label}: {len(codes)}대 중 성공 {ok}, 실패 {len(codes) - ok} "
+                            f"({time.monotonic() - started:.1f}초)")
+        threading.Thread(target=summarize, daemon=True).start()
 
-    def task():
-        run_command_realtime([GDSCLIENT_PATH, ip, "1"])
-    threading.Thread(target=task, daemon=True).start()
+def get_chip_size():
+    run_on_targets("칩 크기 조회", ["0"])
 
-def get_version():
-    ip = detector_ip_entry.get().strip()
-    if not ip:
-        messagebox.showwarning("경고", "Detector IP를 입력하세요")
-        return
+def get_mode():
+    run_on_targets("모드 조회", ["1"])
 
-    def task():
-        run_command_realtime([GDSCLIENT_PATH, ip, "2"])
-    threading.Thread(target=task, daemon=True).start()
+def get_version():
+    run_on_targets("버전 조회", ["2"])
 
 def reboot():
-    ip = detector_ip_entry.get().strip()
-    if not ip:
-        messagebox.showwarning("경고", "Detector IP를 입력하세요")
-        return
-
-    def task():
-        run_command_realtime([GDSCLIENT_PATH, ip, "3"])
-    threading.Thread(target=task, daemon=True).start()
+    run_on_targets("재부팅", ["3"], confirm=True)
 
 def change_mode():
-    ip = detector_ip_entry.get().strip()
-    if not ip:
-        messagebox.showwarning("경고", "Detector IP를 입력하세요")
+    run_on_targets("모드 변경", ["4", "1"], confirm=True)
+
+def save_group():
+    """현재 Detector IP 입력 내용을 이름을 붙여 설정 파일에 저장 (@이름으로 재사용)"""
+    spec = detector_ip_entry.get().strip()
+    if not spec:
+        messagebox.showwarning("경고", "저장할 Detector IP(들)를 입력하세요")
+        return
+    name = simpledialog.askstring("그룹 저장", "그룹 이름:")
+    if not name:
+        return
+    name = name.strip().lstrip("@")
+    groups = dict(config_store.raw().get('DEVICE_GROUPS', {}))
+    groups[name] = spec
+    config_store.update(DEVICE_GROUPS=groups)
+    async_log_print(f"[그룹] '{name}' 저장: {spec} (입력란에 @{name} 으로 사용)")
+
+def discover_devices():
+    """입력란의 서브넷(예: 192.168.0.0/24, '192.168.0.'이면 /24)에서 Modbus 포트가 열린 장비 검색"""
+    spec = detector_ip_entry.get().strip()
+    if spec.endswith("."):
+        spec += "0/24"
+    if not spec:
+        messagebox.showwarning("경고", "검색할 서브넷을 입력하세요 (예: 192.168.0.0/24)")
         return
 
     def task():
-        run_command_realtime([GDSCLIENT_PATH, ip, "4", "1"])
+        async_log_print(f"[검색] {spec} 검색 중...")
+        try:
+            found = device_groups.discover(spec, groups=load_config().get('DEVICE_GROUPS', {}))
+        except ValueError as e:
+            async_log_print(f"[검색] {e}")
+            return
+        async_log_print(f"[검색] {len(found)}대 발견: {', '.join(found)}")
+        if found:
+            def fill():
+                detector_ip_entry.delete(0, tk.END)
+                detector_ip_entry.insert(0, ",".join(found))
+            root.after(0, fill)
     threading.Thread(target=task, daemon=True).start()
 
+# ---- 결과 표 (열 제목을 누르면 정렬) ----
+RESULT_COLUMNS = (("ip", "장비 IP", 120), ("command", "명령", 90), ("result", "결과", 70),
+                  ("output", "출력", 300), ("elapsed", "소요(초)", 70), ("tftp", "TFTP 전송", 300))
+
+def clear_results():
+    results_tree.delete(*results_tree.get_children())
+
+def add_result(ip, label, ret, output, elapsed, tftp=""):
+    result = "성공" if ret == 0 else f"실패({ret})"
+    results_tree.insert("", tk.END, values=(ip, label, result, output, f"{elapsed:.1f}", tftp))
+
+def _sort_key(column, value):
+    if column == "ip":
+        try:
+            return (0, int(ipaddress.IPv4Address(value)))
+        except ValueError:
+            return (1, value)
+    if column == "elapsed":
+        try:
+            return (0, float(value))
+        except ValueError:
+            return (1, value)
+    return (0, value)
+
+def sort_results(column, descending=False):
+    rows = [(results_tree.set(item, column), item) for item in results_tree.get_children("")]
+    rows.sort(key=lambda r: _sort_key(column, r[0]), reverse=descending)
+    for index, (_, item) in enumerate(rows):
+        results_tree.move(item, "", index)
+    results_tree.heading(column, command=lambda: sort_results(column, not descending))
+
 def select_file():
     filepath = filedialog.askopenfilename(title="업그레이드 파일 선택")
     if filepath:
@@ -179,7 +330,32 @@ def select_file():
         file_entry.insert(0, filepath)
 
 # --------------------- (E) 업그레이드 전체 프로세스 (백그라운드 스레드) ---------------------- #
-def upgrade_task(detector_ip, tftp_ip, upgrade_file_path):
+upgrade_journal = None
+verifier = None
+verifier_settings = None
+
+def get_verifier():
+    """검증 파이프라인 (VERIFY_WORKERS/AUTO_ROLLBACK 설정이 바뀌면 새로 만듦)"""
+    global verifier, verifier_settings
+    with pool_lock:
+        config = load_config()
+        settings = (int(config.get('VERIFY_WORKERS', VERIFY_WORKERS)), config.get('AUTO_ROLLBACK', True))
+        if verifier is not None and verifier_settings != settings:
+            verifier.shutdown(wait=False)
+            verifier = None
+        if verifier is None:
+            verifier = VerificationPipeline(max_workers=settings[0], auto_rollback=settings[1])
+            verifier_settings = settings
+        return verifier
+
+def get_journal():
+    global upgrade_journal
+    with pool_lock:
+        if upgrade_journal is None:
+            upgrade_journal = UpgradeJournal(JOURNAL_FILE)
+        return upgrade_journal
+
+def upgrade_task(detector_ip, tftp_ip, upgrade_file_path, rid=None):
     """
     업그레이드 절차:
     1) 파일을 TFTP 루트 디렉토리에 복사
@@ -187,165 +363,328 @@ def upgrade_task(detector_ip, tftp_ip, upgrade_file_path):
     3) 모드 변경 (cmd:4)
     4) 대기 2초
     5) 업그레이드 (cmd:5)
+    6) 재부팅 후 버전 확인 (불일치 시 자동 롤백), 검증은 백그라운드 풀에서 진행
+    각 단계 전환은 업그레이드 저널의 롤아웃 rid에 기록됩니다. (없으면 이 장비 하나로 새 롤아웃 시작)
     """
+    started = time.monotonic()
+    file_name = os.path.basename(upgrade_file_path)
+    journal = get_journal()
+    if rid is None:
+        rid = rollout_id([file_name], [detector_ip])
+        journal.begin(rid, [detector_ip])
+
+    tftp_ip = resolve_tftp_ip(detector_ip, tftp_ip)
+    if tftp_ip is None:
+        journal.record(rid, detector_ip, "failed", "tftp-ip")
+        return
+
     # 1. 파일 복사
     if not copy_to_tftp(upgrade_file_path):
+        journal.record(rid, detector_ip, "failed", "copy")
         return
+    journal.record(rid, detector_ip, "staged", file_name)
 
     # 2. TFTP 서버 기동
     start_tftp_server()
 
     # 3. 모드 변경
     ret1 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "4", "1"])
+    journal.record(rid, detector_ip, "mode-changed", ret1)
 
     # 4. 약간 대기 (디텍터가 업그레이드 모드로 전환될 시간)
     time.sleep(2)
 
     # 5. 업그레이드
-    file_name = os.path.basename(upgrade_file_path)
+    journal.record(rid, detector_ip, "transfer", tftp_ip)
+    transfer_start = time.monotonic()
     ret2 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "5", tftp_ip, file_name])
 
     if ret2 == 0:
-        async_log_print("[알림] 업그레이드 명령을 성공적으로 마쳤습니다.")
+        async_log_print("[알림] 업그레이드 명령을 성공적으로 마쳤습니다. 재부팅 후 버전을 확인합니다...")
+        journal.record(rid, detector_ip, "verify", file_name)
+
+        def on_verified(res):
+            tftp = tftp_report(detector_ip, transfer_start)
+            if res.ok:
+                journal.record(rid, detector_ip, "done", f"version={res.actual}")
+                if journal.is_complete(rid):
+                    journal.end(rid)
+                async_log_print(f"[검증] {detector_ip} {res.message} (버전 {res.actual})")
+            else:
+                journal.record(rid, detector_ip, "failed", res.message)
+                rollback = " -> 롤백 명령 전송" if res.rolled_back else ""
+                async_log_print(f"[검증 실패] {detector_ip} {res.message}: 기대 {res.expected}, "
+                                f"실제 {res.actual}{rollback}")
+            if tftp:
+                async_log_print(f"[TFTP] {tftp}")
+            elapsed = time.monotonic() - started
+            root.after(0, lambda: add_result(detector_ip, "업그레이드", 0 if res.ok else 1,
+                                             f"{res.message} (버전 {res.actual})", elapsed, tftp))
+        get_verifier().submit(detector_ip, upgrade_file_path, on_result=on_verified)
     else:
+        journal.record(rid, detector_ip, "failed", ret2)
         async_log_print("[알림] 업그레이드 명령 중 오류가 발생했습니다.")
+        tftp = tftp_report(detector_ip, transfer_start)
+        elapsed = time.monotonic() - started
+        root.after(0, lambda: add_result(detector_ip, "업그레이드", ret2, "업그레이드 명령 오류", elapsed, tftp))
 
 def upgrade():
-    detector_ip = detector_ip_entry.get().strip()
     tftp_ip = tftp_ip_entry.get().strip()
     upgrade_file_path = file_entry.get().strip()
 
-    if not detector_ip or not tftp_ip or not upgrade_file_path:
+    if not detector_ip_entry.get().strip() or not tftp_ip or not upgrade_file_path:
         messagebox.showwarning("경고", "모든 입력 항목(Detector IP, TFTP IP, 업그레이드 파일)을 입력하세요.")
         return
+    targets = get_targets()
+    if not targets:
+        return
+    if len(targets) > 1 and not messagebox.askyesno(
+            "확인", f"{len(targets)}대의 장비를 업그레이드할까요?"):
+        return
 
-    # 백그라운드 스레드로 실행
-    t = threading.Thread(
-        target=upgrade_task,
-        args=(detector_ip, tftp_ip, upgrade_file_path),
-        daemon=True
-    )
-    t.start()
-
-# --------------------- (F) Tkinter UI ---------------------- #
-root = tk.Tk()
-root.title("GDS 클라이언트 UI (실시간 로그 & IP 자동 설정)")
-
-info_label = tk.Label(
-    root,
-    text=(
-        "라즈베리파이/Ubuntu에서 TFTP 서버를 자동 구동하고,\n"
-        "GDSClientLinux 명령을 실시간 로그로 표시합니다.\n"
-        "sudo 권한으로 실행해야 정상 동작합니다."
-    ),
-    fg="blue"
-)
-info_label.pack(padx=10, pady=5)
-
-# IP 입력 프레임
-frame_ip = tk.Frame(root)
-frame_ip.pack(padx=10, pady=5, fill="x")
-
-tk.Label(frame_ip, text="Detector IP:").grid(row=0, column=0, sticky="e")
-detector_ip_entry = tk.Entry(frame_ip, width=20)
-detector_ip_entry.grid(row=0, column=1, padx=5)
-
-tk.Label(frame_ip, text="TFTP IP:").grid(row=0, column=2, sticky="e")
-tftp_ip_entry = tk.Entry(frame_ip, width=20)
-tftp_ip_entry.grid(row=0, column=3, padx=5)
-
-# 파일 선택 프레임
-frame_file = tk.Frame(root)
-frame_file.pack(padx=10, pady=5, fill="x")
-
-tk.Label(frame_file, text="업그레이드 파일:").grid(row=0, column=0, sticky="e")
-file_entry = tk.Entry(frame_file, width=40)
-file_entry.grid(row=0, column=1, padx=5)
-file_btn = tk.Button(frame_file, text="파일 선택", command=select_file)
-file_btn.grid(row=0, column=2, padx=5)
-
-# 명령 버튼들
-frame_buttons = tk.Frame(root)
-frame_buttons.pack(padx=10, pady=5)
-
-btn_chip_size = tk.Button(frame_buttons, text="칩 크기 조회", width=15, command=get_chip_size)
-btn_chip_size.grid(row=0, column=0, padx=5, pady=5)
-
-btn_mode = tk.Button(frame_buttons, text="모드 조회 (뱅크)", width=15, command=get_mode)
-btn_mode.grid(row=0, column=1, padx=5, pady=5)
-
-btn_version = tk.Button(frame_buttons, text="버전 조회", width=15, command=get_version)
-btn_version.grid(row=0, column=2, padx=5, pady=5)
-
-btn_reboot = tk.Button(frame_buttons, text="재부팅", width=15, command=reboot)
-btn_reboot.grid(row=1, column=0, padx=5, pady=5)
-
-btn_change_mode = tk.Button(frame_buttons, text="모드 변경 (4 1)", width=15, command=change_mode)
-btn_change_mode.grid(row=1, column=1, padx=5, pady=5)
-
-btn_upgrade = tk.Button(frame_buttons, text="업그레이드", width=15, command=upgrade)
-btn_upgrade.grid(row=1, column=2, padx=5, pady=5)
-
-# 로그 창
-log_text = scrolledtext.ScrolledText(root, width=80, height=15)
-log_text.pack(padx=10, pady=10)
-
-# Ctrl + C, V, X 바인딩
-log_text.bind("<Control-c>", lambda event: log_text.event_generate("<<Copy>>"))
-log_text.bind("<Control-v>", lambda event: log_text.event_generate("<<Paste>>"))
-log_text.bind("<Control-x>", lambda event: log_text.event_generate("<<Cut>>"))
+    # 같은 파일·장비 목록의 이전 업그레이드가 중간에 끊겼으면 끝나지 않은 장비만 진행
+    journal = get_journal()
+    rid = rollout_id([os.path.basename(upgrade_file_path)], targets)
+    remaining, resumed = journal.resume_plan(rid, targets)
+    if resumed:
+        async_log_print(f"[저널] 중단된 업그레이드 {rid} 이어서 진행: 완료 {len(targets) - len(remaining)}대 생략, "
+                        f"{len(remaining)}대 남음")
+        if not remaining:
+            journal.end(rid)
+            return
+    else:
+        journal.begin(rid, targets)
 
-# 마우스 우클릭 메뉴 (복사)
-def copy_selection():
-    log_text.event_generate("<<Copy>>")
+    # 작업 풀에서 실행 (여러 대면 GROUP_WORKERS대씩 동시에)
+    clear_results()
+    for detector_ip in remaining:
+        future = get_group_pool().submit(upgrade_task, detector_ip, tftp_ip, upgrade_file_path, rid)
+        future.add_done_callback(log_task_error)
 
-context_menu = tk.Menu(log_text, tearoff=0)
-context_menu.add_command(label="복사", command=copy_selection)
+# --------------------- 프로필 (config_store 참고) --------------------- #
+NO_PROFILE = "(없음)"
 
-def show_context_menu(event):
-    context_menu.tk_popup(event.x_root, event.y_root)
+def set_entry(entry, text):
+    if text is None:
+        return
+    entry.delete(0, tk.END)
+    entry.insert(0, text)
+
+def fill_profile_entries():
+    """선택된 프로필의 장비 목록/펌웨어/TFTP IP를 입력란에, 사이트 이름을 창 제목에 표시"""
+    name = config_store.active_profile()
+    if name is None:
+        root.title(WINDOW_TITLE)
+        return
+    config = load_config()
+    set_entry(detector_ip_entry, entry_text(config.get('DEVICES')))
+    set_entry(tftp_ip_entry, entry_text(config.get('TFTP_IP')))
+    set_entry(file_entry, first_firmware(config.get('FIRMWARE')))
+    root.title(f"{WINDOW_TITLE} - {config.get('SITE', name)}")
+
+def first_firmware(value):
+    # 이 UI는 파일 하나만 업그레이드하므로 프로필의 펌웨어 목록 중 첫 번째
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+def on_profile_selected(event=None):
+    name = profile_var.get()
+    try:
+        config_store.use_profile(None if name == NO_PROFILE else name)
+    except KeyError:
+        async_log_print(f"[프로필] 없는 프로필입니다: {name}")
+        return
+    fill_profile_entries()
+    async_log_print(f"[프로필] '{name}' 적용")
 
-log_text.bind("<Button-3>", show_context_menu)
+# --------------------- (F) Tkinter UI ---------------------- #
+def import_tk():
+    global tk, ttk, filedialog, messagebox, scrolledtext, simpledialog
+    import tkinter
+    from tkinter import ttk as _ttk, filedialog as _filedialog, messagebox as _messagebox, \
+        scrolledtext as _scrolledtext, simpledialog as _simpledialog
+    tk, ttk, filedialog, messagebox, scrolledtext, simpledialog = \
+        tkinter, _ttk, _filedialog, _messagebox, _scrolledtext, _simpledialog
+
+def build_ui():
+    global root, detector_ip_entry, tftp_ip_entry, file_entry, log_text, results_tree, profile_var
+    import_tk()
+
+    root = tk.Tk()
+    root.title(WINDOW_TITLE)
+
+    info_label = tk.Label(
+        root,
+        text=(
+            "라즈베리파이/Ubuntu에서 TFTP 서버를 자동 구동하고,\n"
+            "GDSClientLinux 명령을 실시간 로그로 표시합니다.\n"
+            "sudo 권한으로 실행해야 정상 동작합니다."
+        ),
+        fg="blue"
+    )
+    info_label.pack(padx=10, pady=5)
+
+    # IP 입력 프레임
+    frame_ip = tk.Frame(root)
+    frame_ip.pack(padx=10, pady=5, fill="x")
+
+    tk.Label(frame_ip, text="Detector IP(들):").grid(row=0, column=0, sticky="e")
+    detector_ip_entry = tk.Entry(frame_ip, width=30)
+    detector_ip_entry.grid(row=0, column=1, padx=5)
+
+    tk.Label(frame_ip, text="TFTP IP:").grid(row=0, column=2, sticky="e")
+    tftp_ip_entry = tk.Entry(frame_ip, width=20)
+    tftp_ip_entry.grid(row=0, column=3, padx=5)
+
+    tk.Label(
+        frame_ip,
+        text="예) 192.168.0.15, 192.168.0.10-40, 192.168.0.0/26, @저장한그룹",
+        fg="gray"
+    ).grid(row=1, column=1, columnspan=3, sticky="w", padx=5)
+    tk.Button(frame_ip, text="그룹 저장", command=save_group).grid(row=0, column=4, padx=5)
+    tk.Button(frame_ip, text="장비 검색", command=discover_devices).grid(row=1, column=4, padx=5)
+
+    # 프로필 선택 (사이트/장비 목록/TFTP 루트/동시 작업 수/펌웨어 묶음)
+    tk.Label(frame_ip, text="프로필:").grid(row=2, column=0, sticky="e")
+    profile_var = tk.StringVar(value=config_store.active_profile() or NO_PROFILE)
+    profile_box = ttk.Combobox(frame_ip, textvariable=profile_var, state="readonly", width=27,
+                               values=[NO_PROFILE] + sorted(config_store.profiles()))
+    profile_box.grid(row=2, column=1, padx=5, pady=2, sticky="w")
+    profile_box.bind("<<ComboboxSelected>>", on_profile_selected)
+
+    # 파일 선택 프레임
+    frame_file = tk.Frame(root)
+    frame_file.pack(padx=10, pady=5, fill="x")
+
+    tk.Label(frame_file, text="업그레이드 파일:").grid(row=0, column=0, sticky="e")
+    file_entry = tk.Entry(frame_file, width=40)
+    file_entry.grid(row=0, column=1, padx=5)
+    file_btn = tk.Button(frame_file, text="파일 선택", command=select_file)
+    file_btn.grid(row=0, column=2, padx=5)
+
+    # 명령 버튼들
+    frame_buttons = tk.Frame(root)
+    frame_buttons.pack(padx=10, pady=5)
+
+    btn_chip_size = tk.Button(frame_buttons, text="칩 크기 조회", width=15, command=get_chip_size)
+    btn_chip_size.grid(row=0, column=0, padx=5, pady=5)
+
+    btn_mode = tk.Button(frame_buttons, text="모드 조회 (뱅크)", width=15, command=get_mode)
+    btn_mode.grid(row=0, column=1, padx=5, pady=5)
+
+    btn_version = tk.Button(frame_buttons, text="버전 조회", width=15, command=get_version)
+    btn_version.grid(row=0, column=2, padx=5, pady=5)
+
+    btn_reboot = tk.Button(frame_buttons, text="재부팅", width=15, command=reboot)
+    btn_reboot.grid(row=1, column=0, padx=5, pady=5)
+
+    btn_change_mode = tk.Button(frame_buttons, text="모드 변경 (4 1)", width=15, command=change_mode)
+    btn_change_mode.grid(row=1, column=1, padx=5, pady=5)
+
+    btn_upgrade = tk.Button(frame_buttons, text="업그레이드", width=15, command=upgrade)
+    btn_upgrade.grid(row=1, column=2, padx=5, pady=5)
+
+    # 결과 표 (열 제목 클릭으로 정렬)
+    frame_results = tk.Frame(root)
+    frame_results.pack(padx=10, pady=5, fill="both", expand=True)
+    results_tree = ttk.Treeview(frame_results, columns=[c[0] for c in RESULT_COLUMNS],
+                                show="headings", height=8)
+    for column, title, width in RESULT_COLUMNS:
+        results_tree.heading(column, text=title, command=lambda c=column: sort_results(c))
+        results_tree.column(column, width=width, anchor="w")
+    results_scroll = ttk.Scrollbar(frame_results, orient="vertical", command=results_tree.yview)
+    results_tree.configure(yscrollcommand=results_scroll.set)
+    results_tree.pack(side="left", fill="both", expand=True)
+    results_scroll.pack(side="right", fill="y")
+
+    # 로그 창
+    log_text = scrolledtext.ScrolledText(root, width=80, height=15)
+    log_text.pack(padx=10, pady=10)
+
+    # Ctrl + C, V, X 바인딩
+    log_text.bind("<Control-c>", lambda event: log_text.event_generate("<<Copy>>"))
+    log_text.bind("<Control-v>", lambda event: log_text.event_generate("<<Paste>>"))
+    log_text.bind("<Control-x>", lambda event: log_text.event_generate("<<Cut>>"))
+
+    # 마우스 우클릭 메뉴 (복사)
+    def copy_selection():
+        log_text.event_generate("<<Copy>>")
+
+    context_menu = tk.Menu(log_text, tearoff=0)
+    context_menu.add_command(label="복사", command=copy_selection)
+
+    def show_context_menu(event):
+        context_menu.tk_popup(event.x_root, event.y_root)
+
+    log_text.bind("<Button-3>", show_context_menu)
 
 # --------------------- (G) 시작 시 자동 설정 ---------------------- #
 def get_local_ip():
     """
-    로컬 IP 주소를 반환합니다.
+    로컬 IP 주소를 반환합니다. (기본 경로 인터페이스 기준, 오프라인이어도 동작)
     """
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return netif.get_local_ip()
+
+def resolve_tftp_ip(detector_ip, tftp_ip):
+    """
+    TFTP IP가 'auto'이면 디텍터와 같은 서브넷(또는 해당 경로)의 로컬 주소를 선택합니다.
+    디텍터 주소가 IPv4 주소가 아니면(호스트 이름, 오타 등) 고를 수 없으므로 로그를 남기고 None을 반환합니다.
+    """
+    if tftp_ip.lower() != "auto":
+        return tftp_ip
     try:
-        # 외부에 연결하지 않고도 로컬 IP를 얻을 수 있습니다.
-        s.connect(('8.8.8.8', 1))
-        IP = s.getsockname()[0]
-    except Exception:
-        IP = '127.0.0.1'  # 실패 시 루프백 주소 반환
-    finally:
-        s.close()
-    return IP
+        chosen = netif.tftp_ip_for(detector_ip)
+    except ValueError:
+        async_log_print(f"[오류] {detector_ip}: IPv4 주소가 아니어서 TFTP IP 자동 선택 불가 "
+                        "(디텍터 IP를 주소로 입력하거나 TFTP IP를 직접 지정하세요)")
+        return None
+    async_log_print(f"[정보] {detector_ip} -> TFTP 서버 IP {chosen} 자동 선택")
+    return chosen
 
 def on_start():
     global GDSCLIENT_PATH
 
-    # 1. GDSClientLinux 실행 경로 가져오기
+    # 1. GDSClientLinux 실행 경로 가져오기 (파일 선택 대화상자가 필요할 수 있어 UI 스레드에서)
     GDSCLIENT_PATH = get_gdsclient_path()
     if not GDSCLIENT_PATH:
         return  # 경로 설정 실패 시 종료
 
+    # 2~4. dpkg/apt-get/systemctl/IP 조회는 시간이 걸리므로 백그라운드에서 실행
+    threading.Thread(target=startup_checks, daemon=True).start()
+
+def startup_checks():
     # 2. GDSClientLinux 실행 권한 확인
     if not ensure_gdsclientlinux_executable():
         async_log_print("[오류] GDSClientLinux 실행 권한 설정 실패 혹은 파일이 없습니다.")
 
+    # 4. TFTP IP & Detector IP 자동 설정 (입력란은 UI 스레드에서 채움)
+    local_ip = get_local_ip()
+    addresses = netif.local_addresses()
+    root.after(0, lambda: fill_ip_entries(local_ip, addresses))
+
+    # 이전 실행에서 끝나지 않은 업그레이드 알림
+    try:
+        for rid, devices in get_journal().unfinished():
+            r = get_journal().rollouts[rid]
+            for device in devices:
+                phase = r.phases.get(device, ("시작 전",))[0]
+                async_log_print(f"[저널] {device} 업그레이드가 '{phase}' 단계에서 끝나지 않았습니다.")
+    except OSError as e:
+        async_log_print(f"[경고] 업그레이드 저널을 읽을 수 없습니다: {e}")
+
     # 3. tftpd-hpa 설치 확인 & 자동 설치
     if check_and_install_tftpd():
         start_tftp_server()
 
-    # 4. TFTP IP & Detector IP 자동 설정
-    local_ip = get_local_ip()
+def fill_ip_entries(local_ip, addresses):
     async_log_print(f"[정보] 로컬 IP 주소 감지: {local_ip}")
 
-    # TFTP IP 설정
+    # TFTP IP 설정 (NIC가 여러 개면 디텍터마다 자동 선택하도록 'auto')
+    for addr in addresses:
+        async_log_print(f"[정보] 인터페이스 {addr.ifname}: {addr.interface}")
     tftp_ip_entry.delete(0, tk.END)
-    tftp_ip_entry.insert(0, local_ip)
+    tftp_ip_entry.insert(0, "auto" if len(addresses) > 1 else local_ip)
 
     # Detector IP의 서브넷 설정 (예: "192.168.0.")
     try:
@@ -357,6 +696,9 @@ def on_start():
     detector_ip_entry.delete(0, tk.END)
     detector_ip_entry.insert(0, base_ip)
 
+    # 선택된 프로필이 있으면 그 장비 목록 등으로 덮어씀
+    fill_profile_entries()
+
 # --------------------- (C) 기존에 사용하던 함수들 (권한 체크, TFTP 설치 등) --------------------- #
 def ensure_gdsclientlinux_executable():
     if not os.path.isfile(GDSCLIENT_PATH):
@@ -402,34 +744,101 @@ def check_and_install_tftpd():
         async_log_print("[오류] tftpd-hpa 설치 실패")
         return False
 
+# 설정 "TFTP_SERVER": "builtin" 이면 tftpd-hpa 대신 내장 TFTP 서버(tftp_server.py)를 사용해
+# 장비별 전송 통계(속도/재전송/타임아웃)를 결과 표의 "TFTP 전송" 열에 표시합니다.
+tftp_server = None
+tftp_lock = threading.Lock()
+builtin_tftp_failed = False
+
+def get_tftp_server():
+    """내장 TFTP 서버 (한 번만 시작, TFTP 루트가 바뀌면 다시 시작). 시작할 수 없으면 None"""
+    global tftp_server, builtin_tftp_failed
+    with tftp_lock:
+        tftp_root = os.path.realpath(get_tftp_root())
+        if tftp_server is not None and tftp_server.root != tftp_root:
+            tftp_server.stop()
+            tftp_server = None
+        if tftp_server is None and not builtin_tftp_failed:
+            config = load_config()
+            port = int(config.get('TFTP_PORT', 69))
+            # tftpd-hpa가 같은 포트를 쓰고 있으면 먼저 내림
+            run_command_realtime(["sudo", "systemctl", "stop", "tftpd-hpa"])
+            server = TftpServer(tftp_root, port=port,
+                                max_blksize=int(config.get('TFTP_MAX_BLKSIZE', MAX_BLKSIZE)))
+            try:
+                tftp_server = server.start()
+                async_log_print(f"[정보] 내장 TFTP 서버 시작: 포트 {port}, 루트 {tftp_root}")
+            except OSError as e:
+                builtin_tftp_failed = True
+                async_log_print(f"[오류] 내장 TFTP 서버를 시작할 수 없습니다 (포트 {port}): {e}")
+        return tftp_server
+
+def tftp_report(detector_ip, since):
+    """내장 TFTP 서버를 쓰는 경우 장비의 since(monotonic) 이후 마지막 전송 요약, 아니면 빈 문자열"""
+    server = tftp_server
+    if server is None:
+        return ""
+    stats = server.last_transfer(detector_ip, since)
+    if stats is None:
+        running = [st for st in server.active() if st.ip == detector_ip]
+        return running[-1].summary() if running else "TFTP 요청 없음"
+    return stats.summary()
+
 def start_tftp_server():
+    if load_config().get('TFTP_SERVER') == 'builtin':
+        if get_tftp_server() is not None:
+            return
+        async_log_print("[정보] 내장 TFTP 서버 대신 tftpd-hpa를 사용합니다.")
     async_log_print("[정보] TFTP 서버를 시작합니다...")
     run_command_realtime(["sudo", "systemctl", "enable", "tftpd-hpa"])
     run_command_realtime(["sudo", "systemctl", "start", "tftpd-hpa"])
 
+def get_tftp_root():
+    return load_config().get('TFTP_ROOT_DIR', TFTP_ROOT_DIR)
+
+def get_firmware_cache(tftp_root):
+    cache = firmware_caches.get(tftp_root)
+    if cache is None:
+        cache = firmware_caches[tftp_root] = FirmwareCache(tftp_root)
+    return cache
+
+def make_readable(path):
+    # TFTP 루트가 내 소유이면 직접, 아니면 sudo로 권한 변경 (sudo 프로세스를 매번 띄우지 않도록)
+    try:
+        os.chmod(path, 0o644)
+    except PermissionError:
+        run_command_realtime(["sudo", "chmod", "644", path])
+
 def copy_to_tftp(file_path):
     if not os.path.isfile(file_path):
         async_log_print(f"[오류] 파일이 존재하지 않습니다: {file_path}")
         return False
 
-    if not os.path.exists(TFTP_ROOT_DIR):
-        async_log_print(f"[오류] TFTP 루트 디렉토리가 없습니다: {TFTP_ROOT_DIR}")
+    tftp_root = get_tftp_root()
+    if not os.path.exists(tftp_root):
+        async_log_print(f"[오류] TFTP 루트 디렉토리가 없습니다: {tftp_root}")
         return False
 
-    file_name = os.path.basename(file_path)
-    dest_path = os.path.join(TFTP_ROOT_DIR, file_name)
-
+    # 같은 이름·내용의 파일이 이미 있으면 다시 복사하지 않음
     try:
-        shutil.copy(file_path, dest_path)
-        async_log_print(f"[파일 복사] {file_path} -> {dest_path}")
-        run_command_realtime(["sudo", "chmod", "644", dest_path])
-        return True
+        dest_path, copied = get_firmware_cache(tftp_root).stage(file_path)
     except Exception as e:
         async_log_print(f"[오류] 파일 복사 중 문제 발생: {e}")
         return False
+    if copied:
+        async_log_print(f"[파일 복사] {file_path} -> {dest_path}")
+        make_readable(dest_path)
+    else:
+        async_log_print(f"[파일 복사] 동일한 파일이 이미 있어 생략: {dest_path}")
+    return True
 
 # --------------------- (G) 시작 시 자동 설정 ---------------------- #
-
-# 메인 윈도우 표시 후 on_start 실행 (100ms 후)
-root.after(100, on_start)
-root.mainloop()
+def main():
+    os.environ['DISPLAY'] = ':0'
+    build_ui()
+    # 메인 윈도우 표시 후 on_start 실행 (100ms 후)
+    root.after(100, on_start)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
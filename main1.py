@@ -1,57 +1,194 @@
 #!/usr/bin/env python3
+import time
+_T0 = time.perf_counter()   # --timing: 프로세스 시작(모듈 로드) -> 첫 응답까지 시간 측정용
+
 import socket
 import struct
 import argparse
-from pymodbus import __version__ as _pymodbus_version
-
-# pymodbus v2.x/v3.x 호환 import
-try:
-    # pymodbus 2.x
-    from pymodbus.client.sync import ModbusTcpClient
-except (ImportError, ModuleNotFoundError):
+import functools
+import modbus_tcp
+from register_block import RegisterBlock, RecordLayout
+
+
+@functools.lru_cache(maxsize=None)
+def _pymodbus():
+    """
+    pymodbus는 임포트가 무거우므로(라즈베리파이에서 수백 ms) 실제로 필요할 때만 읽습니다.
+    반환: (ModbusTcpClient 클래스, pymodbus 버전)
+    """
+    from pymodbus import __version__ as version
+    # pymodbus v2.x/v3.x 호환 import
     try:
-        # pymodbus 3.x
-        from pymodbus.client import ModbusTcpClient
-    except ImportError:
-        # alternate path
-        from pymodbus.client.tcp import ModbusTcpClient
+        # pymodbus 2.x
+        from pymodbus.client.sync import ModbusTcpClient
+    except (ImportError, ModuleNotFoundError):
+        try:
+            # pymodbus 3.x
+            from pymodbus.client import ModbusTcpClient
+        except ImportError:
+            # alternate path
+            from pymodbus.client.tcp import ModbusTcpClient
+    return ModbusTcpClient, version
+
+def _ip_to_registers(ip):
+    packed = socket.inet_aton(ip)
+    return list(struct.unpack('>HH', packed))
+
+
+def _contiguous_runs(writes):
+    """{reg: value}를 [(시작 레지스터, [값, ...]), ...] 연속 구간 목록으로 변환"""
+    runs = []
+    for reg in sorted(writes):
+        if runs and runs[-1][0] + len(runs[-1][1]) == reg:
+            runs[-1][1].append(writes[reg])
+        else:
+            runs.append((reg, [writes[reg]]))
+    return runs
+
+
+ILLEGAL_FUNCTION = 0x01     # Modbus 예외 코드: 장치가 지원하지 않는 기능 코드
+
+
+class ModbusExceptionError(IOError):
+    """장치가 Modbus 예외 응답을 보냄 (전송 오류와 구분하기 위해 예외 코드를 함께 전달)"""
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+def _check(response, message):
+    if response.isError():
+        code = getattr(response, "exception_code", None)
+        if code is not None:
+            raise ModbusExceptionError(f"{message} (exception code {code})", code)
+        raise IOError(message)
+
+
+# 40022–40024: 펌웨어 버전, 업그레이드 상태, 다운로드 진행률(하위 바이트)/남은 시간(상위 바이트)
+STATUS_LAYOUT = RecordLayout(40022, {
+    "version":  (40022, "u16"),
+    "status":   (40023, "u16"),
+    "progress": (40024, "bits", 0, 8),
+    "remain":   (40024, "bits", 8, 8),
+})
+
 
 class GDSClient:
     BASE = 40001  # Modbus 주소 오프셋
 
-    def __init__(self, host, port=502, unit_id=1):
-        # timeout=5초, 재시도 5회, 응답 없을 때 재시도
-        self.client = ModbusTcpClient(
-            host, port=port,
-            timeout=5,
-            retries=5,
-            retry_on_empty=True
-        )
+    # FC16(Write Multiple Registers)을 지원하지 않는 것으로 확인된 장치 (host, port, unit_id)
+    # 프로세스 내 모든 GDSClient 인스턴스가 공유하여, 실패가 확정된 FC16 시도를 반복하지 않습니다.
+    _no_fc16 = set()
+    # 응답이 없을 때 읽기를 다시 보내는 횟수 (쓰기는 중복 적용을 막기 위해 한 번만 보냄)
+    READ_RETRIES = 5
+
+    def __init__(self, host, port=502, unit_id=1, shared=False, pipeline_depth=None, log=None):
+        # shared=True: 같은 host:port의 다른 Unit ID와 TCP 연결 하나를 공유 (Modbus 게이트웨이용)
+        # pipeline_depth: 공유 연결에서 동시에 응답을 기다릴 수 있는 요청 수
+        # log: 안내 메시지를 받을 함수 (예: CLI는 print, UI는 async_log_print)
+        self.shared = shared
+        self.log = log or (lambda msg: None)
+        if shared:
+            # 경량 전송 계층(modbus_tcp): pymodbus를 임포트하지 않으므로 CLI 시작이 빠름
+            # 재시도는 공유 연결 설정을 바꾸지 않고 읽기 요청마다 지정 (_read_holding)
+            self.client = modbus_tcp.acquire(host, port, timeout=5, pipeline_depth=pipeline_depth)
+        else:
+            ModbusTcpClient, _ = _pymodbus()
+            # timeout=5초, 요청당 한 번만 전송 (pymodbus는 retries를 총 시도 횟수로 사용)
+            # 쓰기는 다시 보내지 않고, 읽기 재시도는 _read_holding에서 처리
+            self.client = ModbusTcpClient(
+                host, port=port,
+                timeout=5,
+                retries=1,
+                retry_on_empty=False
+            )
+        self.host = host
+        self.port = port
         self.unit_id = unit_id
+        # 반복 조회용 블록은 한 번만 할당해서 재사용
+        self._status_block = STATUS_LAYOUT.block(self.BASE)
+        self.first_response_at = None      # 장치 응답을 처음 받은 시각 (perf_counter, --timing용)
         if not self.client.connect():
+            self.close()
             raise ConnectionError(f"Cannot connect to {host}:{port}")
 
+    @classmethod
+    def for_units(cls, host, unit_ids, port=502, pipeline_depth=None):
+        """게이트웨이 뒤의 여러 Unit ID에 대해 연결 하나를 공유하는 클라이언트 목록"""
+        return [cls(host, port=port, unit_id=unit, shared=True, pipeline_depth=pipeline_depth)
+                for unit in unit_ids]
+
     def _addr(self, reg):
         return reg - self.BASE
 
+    def _responded(self):
+        if self.first_response_at is None:
+            self.first_response_at = time.perf_counter()
+
+    def _read_holding(self, address, count):
+        """
+        FC03 읽기. 응답이 없으면 READ_RETRIES번까지 다시 보냅니다.
+        읽기는 다시 보내도 장치 상태가 바뀌지 않지만, 쓰기는 이미 적용되었을 수 있으므로 재시도하지 않습니다.
+        """
+        if self.shared:
+            rr = self.client.read_holding_registers(address=address, count=count, slave=self.unit_id,
+                                                    retries=self.READ_RETRIES)
+            self._responded()
+            return rr
+        from pymodbus.exceptions import ModbusException
+        for attempt in range(self.READ_RETRIES + 1):
+            try:
+                rr = self.client.read_holding_registers(address=address, count=count, slave=self.unit_id)
+            except ModbusException:
+                if attempt == self.READ_RETRIES:
+                    raise
+                continue
+            # 예외 응답(exception_code)은 장치가 확정한 답이므로 다시 묻지 않음
+            if not rr.isError() or hasattr(rr, "exception_code"):
+                self._responded()
+                return rr
+            if attempt == self.READ_RETRIES:
+                return rr
+
     def read_register(self, reg):
-        rr = self.client.read_holding_registers(
-            address=self._addr(reg),
-            count=1,
-            slave=self.unit_id
-        )
+        rr = self._read_holding(self._addr(reg), 1)
         if rr.isError():
             raise IOError(f"Read error at register {reg}")
         return rr.registers[0]
 
+    def read_registers(self, reg, count):
+        rr = self._read_holding(self._addr(reg), count)
+        if rr.isError():
+            raise IOError(f"Read error at registers starting {reg}")
+        return list(rr.registers[:count])
+
+    def read_into(self, block):
+        """
+        block(RegisterBlock) 범위를 FC03 한 번으로 읽습니다.
+        경량 전송 계층이면 응답 데이터가 소켓에서 block 버퍼로 바로 들어갑니다.
+        """
+        if self.shared:
+            self.client.read_into(block, slave=self.unit_id, retries=self.READ_RETRIES)
+            self._responded()
+        else:
+            rr = self._read_holding(self._addr(block.start), block.count)
+            if rr.isError():
+                block.set_exception(getattr(rr, "exception_code", 0))
+            else:
+                block.load_registers(rr.registers[:block.count])
+        if block.isError() or not block.valid:
+            raise IOError(f"Read error at registers starting {block.start}")
+        return block
+
     def write_register(self, reg, value):
         wr = self.client.write_register(
             address=self._addr(reg),
             value=value,
             slave=self.unit_id
         )
-        if wr.isError():
-            raise IOError(f"Write error at register {reg}")
+        self._responded()
+        _check(wr, f"Write error at register {reg}")
 
     def write_registers(self, reg, values):
         wr = self.client.write_registers(
@@ -59,8 +196,68 @@ class GDSClient:
             values=values,
             slave=self.unit_id
         )
-        if wr.isError():
-            raise IOError(f"Write error at registers starting {reg}")
+        self._responded()
+        _check(wr, f"Write error at registers starting {reg}")
+
+    # === 쓰기 결합(write-combining) & 검증 ===
+    def _device_key(self):
+        return (self.host, self.port, self.unit_id)
+
+    def supports_fc16(self):
+        return self._device_key() not in GDSClient._no_fc16
+
+    def verify_registers(self, reg, values):
+        """
+        reg부터 len(values)개를 한 번의 FC03으로 읽어 values와 비교합니다.
+        일치하지 않으면 IOError를 발생시킵니다.
+        """
+        actual = self.read_registers(reg, len(values))
+        if actual != list(values):
+            raise IOError(
+                f"Verify failed at registers starting {reg}: "
+                f"wrote {list(values)}, read {actual}"
+            )
+
+    def write_block(self, reg, values, verify=False):
+        """
+        연속 레지스터 블록 쓰기.
+        - 2개 이상이면 FC16 한 번으로 전송합니다.
+        - 장치가 FC16에 Illegal Function(예외 코드 01) 응답을 주면 쓰기가 적용되지 않은 것이므로
+          단일 쓰기(FC06)로 다시 보내고, 해당 장치를 FC16 미지원으로 기억하여 이후에는 바로 단일 쓰기를 사용합니다.
+          시간 초과/연결 끊김 등 전송 오류는 쓰기가 이미 적용되었을 수 있으므로 재전송하지 않고 그대로 올립니다.
+        - verify=True이면 쓰기 후 블록 전체를 한 번에 읽어 확인합니다.
+        """
+        values = list(values)
+        if not values:
+            return
+        if len(values) == 1:
+            self.write_register(reg, values[0])
+        elif self.supports_fc16():
+            try:
+                self.write_registers(reg, values)
+            except ModbusExceptionError as e:
+                if e.code != ILLEGAL_FUNCTION:
+                    raise
+                self.log("!!! WriteMultipleRegisters 미지원, 단일 레지스터로 재시도합니다.")
+                for i, value in enumerate(values):
+                    self.write_register(reg + i, value)
+                GDSClient._no_fc16.add(self._device_key())
+        else:
+            for i, value in enumerate(values):
+                self.write_register(reg + i, value)
+
+        if verify:
+            self.verify_registers(reg, values)
+
+    def write_many(self, writes, verify=False):
+        """
+        {레지스터: 값} 묶음을 주소 순으로 정렬한 뒤 연속 구간마다 write_block 한 번으로 전송합니다.
+        예) {40088: hi, 40089: lo, 40091: 1} -> FC16(40088, 2개) + FC06(40091)
+        verify: True이면 모든 구간, 레지스터 집합이면 그 레지스터로 시작하는 구간만 쓰기 직후 읽어 확인합니다.
+        구간은 주소 순으로 쓰므로 확인에 실패하면 뒤쪽 구간은 보내지 않습니다.
+        """
+        for reg, values in _contiguous_runs(writes):
+            self.write_block(reg, values, verify=verify is True or (bool(verify) and reg in verify))
 
     # === 읽기 메서드 ===
     def get_version(self):
@@ -70,26 +267,21 @@ class GDSClient:
         return self.read_register(40023)            # 업그레이드/롤백 상태
 
     def get_download_progress(self):
-        val = self.read_register(40024)
-        return val & 0xFF, (val >> 8) & 0xFF        # (진행률, 남은시간)
+        status = self.read_status()
+        return status["progress"], status["remain"]  # (진행률, 남은시간)
+
+    def read_status(self):
+        """40022–40024를 한 번에 읽어 {"version", "status", "progress", "remain"}으로 반환"""
+        return STATUS_LAYOUT.decode(self.read_into(self._status_block))
 
     # === 쓰기 메서드 ===
-    def set_tftp_server(self, ip):
+    def set_tftp_server(self, ip, verify=False):
         """
         TFTP 서버 IP 설정 (레지스터 40088–40089).
         Ubuntu 머신에서 TFTP 서버를 띄우셨다면, 이 머신의 IP를 지정하세요.
         예: "192.168.0.4" 또는 로컬호스트 "127.0.0.1"
         """
-        packed = socket.inet_aton(ip)
-        hi, lo = struct.unpack('>HH', packed)
-        try:
-            # multiple-register 쓰기 시도
-            self.write_registers(40088, [hi, lo])
-        except Exception:
-            # 실패 시 단일 레지스터로 분할 쓰기
-            print("!!! WriteMultipleRegisters 실패, 단일 레지스터로 재시도합니다.")
-            self.write_register(40088, hi)
-            self.write_register(40089, lo)
+        self.write_block(40088, _ip_to_registers(ip), verify=verify)
 
     def start_upgrade(self):    self.write_register(40091, 1)
     def cancel_upgrade(self):   self.write_register(40091, 0)
@@ -97,14 +289,31 @@ class GDSClient:
     def zero_calibration(self): self.write_register(40092, 1)
     def reboot(self):           self.write_register(40093, 1)
 
+    def begin_upgrade(self, tftp_ip, verify=True):
+        """
+        TFTP 서버 IP 설정 + 업그레이드 시작을 최소 왕복으로 전송합니다.
+        40090이 사이에 있어 40088–40089(FC16)와 40091(FC06) 두 요청으로 나뉩니다.
+        verify=True이면 TFTP IP만 읽어서 확인합니다(40091은 장치가 즉시 상태를 바꿀 수 있음).
+        확인에 실패하면 업그레이드 시작은 보내지 않습니다.
+        """
+        hi, lo = _ip_to_registers(tftp_ip)
+        self.write_many({40088: hi, 40089: lo, 40091: 1}, verify={40088} if verify else False)
+
     def close(self):
-        self.client.close()
+        if self.shared:
+            modbus_tcp.release(self.client)
+        else:
+            self.client.close()
 
 
 def main():
     parser = argparse.ArgumentParser(description="GDS Modbus TCP CLI")
     parser.add_argument("host", help="GDS 장치 IP (예: 192.168.0.15)")
     parser.add_argument("--unit", type=int, default=1, help="Modbus 슬레이브 ID (기본: 1)")
+    parser.add_argument("--port", type=int, default=502, help="Modbus TCP 포트 (기본: 502)")
+    parser.add_argument("--pymodbus", action="store_true",
+                        help="경량 전송 계층 대신 pymodbus ModbusTcpClient 사용 (버전 출력 포함)")
+    parser.add_argument("--timing", action="store_true", help="시작 후 연결 및 첫 응답까지 걸린 시간 출력")
     sub = parser.add_subparsers(dest="cmd", required=True)
 
     sub.add_parser("version", help="펌웨어 버전 조회")
@@ -113,6 +322,11 @@ def main():
 
     tftp = sub.add_parser("set-tftp", help="TFTP 서버 IP 설정")
     tftp.add_argument("ip", help="설정할 TFTP 서버 IP (예: Ubuntu 머신 IP)")
+    tftp.add_argument("--verify", action="store_true", help="쓰기 후 읽어서 확인")
+
+    upg = sub.add_parser("upgrade", help="TFTP 서버 IP 설정 + 업그레이드 시작")
+    upg.add_argument("ip", help="TFTP 서버 IP")
+    upg.add_argument("--no-verify", action="store_true", help="TFTP IP 확인 읽기 생략")
 
     sub.add_parser("start",   help="업그레이드 시작")
     sub.add_parser("cancel",  help="업그레이드 취소")
@@ -122,8 +336,10 @@ def main():
 
     args = parser.parse_args()
 
-    print(f"pymodbus version: {_pymodbus_version}")
-    client = GDSClient(args.host, unit_id=args.unit)
+    if args.pymodbus:
+        print(f"pymodbus version: {_pymodbus()[1]}")
+    client = GDSClient(args.host, port=args.port, unit_id=args.unit, shared=not args.pymodbus, log=print)
+    connected_at = time.perf_counter()
 
     try:
         if args.cmd == "version":
@@ -138,9 +354,13 @@ def main():
             print(f"Download Progress: {prog}% remaining {rem}s")
 
         elif args.cmd == "set-tftp":
-            client.set_tftp_server(args.ip)
+            client.set_tftp_server(args.ip, verify=args.verify)
             print("TFTP 서버 IP 설정 완료:", args.ip)
 
+        elif args.cmd == "upgrade":
+            client.begin_upgrade(args.ip, verify=not args.no_verify)
+            print("TFTP 서버 IP 설정 및 업그레이드 시작 명령 전송됨:", args.ip)
+
         elif args.cmd == "start":
             client.start_upgrade()
             print("업그레이드 시작 명령 전송됨")
@@ -163,6 +383,10 @@ def main():
 
     finally:
         client.close()
+        if args.timing:
+            print(f"[timing] 시작 -> 연결 완료: {(connected_at - _T0) * 1000:.1f} ms")
+            if client.first_response_at is not None:
+                print(f"[timing] 시작 -> 첫 응답: {(client.first_response_at - _T0) * 1000:.1f} ms")
 
 
 if __name__ == "__main__":
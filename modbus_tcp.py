@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+경량 Modbus TCP 전송 계층.
+
+하나의 TCP 연결 위에서 여러 Unit ID(Modbus TCP→RTU 게이트웨이 뒤의 장치들)에 대한
+요청을 MBAP 트랜잭션 ID로 구분하여 동시에 주고받습니다.
+pymodbus ModbusTcpClient와 같은 모양의 메서드(read_holding_registers 등)를 제공하므로
+GDSClient / ModbusPoller에서 그대로 바꿔 끼워 사용할 수 있습니다.
+"""
+import socket
+import struct
+import threading
+
+# MBAP 헤더: 트랜잭션 ID, 프로토콜 ID(0), 길이(Unit ID + PDU), Unit ID
+MBAP = struct.Struct('>HHHB')
+
+FC_READ_HOLDING = 0x03
+FC_WRITE_SINGLE = 0x06
+FC_WRITE_MULTIPLE = 0x10
+
+# 연결당 동시에 응답을 기다릴 수 있는 최대 트랜잭션 수 (파이프라인 깊이)
+DEFAULT_PIPELINE_DEPTH = 8
+
+
+class ModbusResponse:
+    """pymodbus 응답 객체와 호환되는 최소 응답 (isError(), registers)"""
+
+    def __init__(self, function_code, registers=None, exception_code=None):
+        self.function_code = function_code
+        self.registers = registers if registers is not None else []
+        self.exception_code = exception_code
+
+    def isError(self):
+        return self.exception_code is not None
+
+    def __repr__(self):
+        if self.isError():
+            return f"ModbusResponse(fc={self.function_code}, exception={self.exception_code})"
+        return f"ModbusResponse(fc={self.function_code}, registers={self.registers})"
+
+
+def decode_response(function_code, pdu):
+    if pdu[0] & 0x80:
+        return ModbusResponse(function_code, exception_code=pdu[1] if len(pdu) > 1 else 0)
+    if function_code == FC_READ_HOLDING:
+        count = pdu[1] // 2
+        return ModbusResponse(function_code, list(struct.unpack_from(f'>{count}H', pdu, 2)))
+    return ModbusResponse(function_code)
+
+
+class PendingRequest:
+    """전송 후 응답을 기다리는 트랜잭션 하나"""
+    __slots__ = ('tid', 'unit_id', 'function_code', 'event', 'pdu', 'error', 'sink')
+
+    def __init__(self, tid, unit_id, function_code, sink=None):
+        self.tid = tid
+        self.unit_id = unit_id
+        self.function_code = function_code
+        self.event = threading.Event()
+        self.pdu = None
+        self.error = None
+        # sink(쓰기 가능한 버퍼)가 있으면 정상 FC03 응답의 데이터 바이트를 소켓에서 그 버퍼로 바로 받음
+        self.sink = sink
+
+    def wait(self, timeout):
+        """응답 PDU(bytes)를 반환합니다. 시간 초과 시 TimeoutError."""
+        if not self.event.wait(timeout):
+            raise TimeoutError(f"No response for transaction {self.tid} (unit {self.unit_id})")
+        if self.error is not None:
+            raise self.error
+        return self.pdu
+
+
+class ModbusTcpConnection:
+    """
+    여러 Unit ID가 공유하는 Modbus TCP 연결.
+    송신은 잠금으로 직렬화하고, 수신은 전용 스레드가 트랜잭션 ID로 대기 중인 요청에 분배합니다.
+    따라서 서로 다른 스레드/Unit의 요청이 한 소켓 위에서 겹쳐서 진행됩니다.
+
+    pipeline_depth개까지는 응답을 기다리지 않고 연달아 전송하므로,
+    RTT가 큰 링크에서도 처리량이 RTT가 아닌 대역폭에 가깝게 나옵니다.
+    pipeline_depth=1이면 요청-응답을 하나씩 주고받는 기존 방식과 같습니다.
+    """
+
+    def __init__(self, host, port=502, timeout=3, pipeline_depth=DEFAULT_PIPELINE_DEPTH, retries=0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries      # 읽기 요청이 시간 초과/연결 끊김 시 다시 시도하는 기본 횟수 (쓰기는 다시 보내지 않음)
+        self._sock = None
+        self._lock = threading.Lock()
+        self._window = threading.Condition(self._lock)
+        self._pending = {}
+        self._next_tid = 0
+        self.pipeline_depth = max(1, int(pipeline_depth))
+
+    def set_pipeline_depth(self, depth):
+        with self._lock:
+            self.pipeline_depth = max(1, int(depth))
+            self._window.notify_all()
+
+    # --------------------- 연결 관리 --------------------- #
+    def connect(self):
+        with self._lock:
+            if self._sock is not None:
+                return True
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            except OSError:
+                return False
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            threading.Thread(target=self._read_loop, args=(sock,), daemon=True).start()
+            return True
+
+    def is_socket_open(self):
+        return self._sock is not None
+
+    def close(self):
+        with self._lock:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            self._close_socket(sock)
+        self._fail_pending(ConnectionError(f"Connection to {self.host}:{self.port} closed"))
+
+    @staticmethod
+    def _close_socket(sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _fail_pending(self, error):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._window.notify_all()
+        for req in pending.values():
+            req.error = error
+            req.event.set()
+
+    # --------------------- 수신 스레드 --------------------- #
+    @staticmethod
+    def _recv_into(sock, view):
+        got = 0
+        n = len(view)
+        while got < n:
+            r = sock.recv_into(view[got:], n - got)
+            if r == 0:
+                raise ConnectionError("Connection closed by peer")
+            got += r
+
+    def _recv_exact(self, sock, n):
+        buf = bytearray(n)
+        self._recv_into(sock, memoryview(buf))
+        return buf
+
+    def _read_loop(self, sock):
+        header = bytearray(MBAP.size)
+        header_view = memoryview(header)
+        req = None
+        try:
+            while True:
+                req = None
+                self._recv_into(sock, header_view)
+                tid, _, length, _ = MBAP.unpack(header)
+                with self._lock:
+                    req = self._pending.pop(tid, None)
+                    if req is not None:
+                        self._window.notify()
+                if req is not None and req.sink is not None and length - 3 == len(req.sink):
+                    # 정상 응답 길이와 정확히 맞을 때만 (예외 응답은 길이가 다르므로 아래 경로)
+                    pdu = bytes(self._recv_exact(sock, 2))     # 기능 코드 + 바이트 수
+                    self._recv_into(sock, req.sink)
+                else:
+                    pdu = bytes(self._recv_exact(sock, length - 1))
+                if req is not None:     # 시간 초과로 포기한 트랜잭션의 늦은 응답은 버림
+                    req.pdu = pdu
+                    req.event.set()
+        except (OSError, ValueError, struct.error) as e:
+            if req is not None and not req.event.is_set():
+                # 이미 대기 목록에서 꺼낸 요청은 _fail_pending이 알 수 없으므로 직접 실패 처리
+                req.error = ConnectionError(f"Connection to {self.host}:{self.port} lost: {e}")
+                req.event.set()
+            with self._lock:
+                if self._sock is sock:
+                    self._sock = None
+            self._close_socket(sock)
+            self._fail_pending(ConnectionError(f"Connection to {self.host}:{self.port} lost: {e}"))
+
+    # --------------------- 요청 송신 --------------------- #
+    def _alloc_tid(self):
+        # 잠금 보유 상태에서 호출: 사용 중이 아닌 다음 트랜잭션 ID
+        for _ in range(0x10000):
+            self._next_tid = (self._next_tid + 1) & 0xFFFF
+            if self._next_tid not in self._pending:
+                return self._next_tid
+        raise RuntimeError("No free Modbus transaction IDs")
+
+    def submit(self, unit_id, pdu, sink=None):
+        """
+        요청을 전송하고 응답을 기다리지 않고 PendingRequest를 반환합니다.
+        응답 대기 중인 요청이 pipeline_depth개이면 자리가 날 때까지(최대 timeout) 기다립니다.
+        sink: 정상 응답의 데이터 바이트를 받을 버퍼 (read_into 용)
+        """
+        if not self.connect():
+            raise ConnectionError(f"Cannot connect to {self.host}:{self.port}")
+        with self._lock:
+            if not self._window.wait_for(
+                    lambda: self._sock is None or len(self._pending) < self.pipeline_depth,
+                    self.timeout):
+                raise TimeoutError(f"Pipeline to {self.host}:{self.port} full")
+            if self._sock is None:
+                raise ConnectionError(f"Connection to {self.host}:{self.port} lost")
+            tid = self._alloc_tid()
+            req = PendingRequest(tid, unit_id, pdu[0], sink)
+            self._pending[tid] = req
+            try:
+                self._sock.sendall(MBAP.pack(tid, 0, len(pdu) + 1, unit_id) + pdu)
+            except OSError as e:
+                del self._pending[tid]
+                self._window.notify()
+                raise ConnectionError(f"Send to {self.host}:{self.port} failed: {e}")
+        return req
+
+    def result(self, req, timeout=None):
+        """PendingRequest의 응답을 기다려 ModbusResponse로 변환합니다."""
+        return decode_response(req.function_code, self._wait(req, timeout))
+
+    def _wait(self, req, timeout=None):
+        try:
+            pdu = req.wait(self.timeout if timeout is None else timeout)
+        finally:
+            with self._lock:
+                # 트랜잭션 ID가 재사용되었을 수 있으므로 같은 요청일 때만 제거
+                if self._pending.get(req.tid) is req:
+                    del self._pending[req.tid]
+                    self._window.notify()
+        return pdu
+
+    def request(self, unit_id, pdu, timeout=None, retries=None):
+        """
+        읽기(FC03)만 retries(기본 self.retries)번까지 다시 보냅니다.
+        쓰기는 응답만 잃어버렸을 뿐 장치에 이미 적용되었을 수 있으므로 다시 보내지 않습니다.
+        """
+        if pdu[0] != FC_READ_HOLDING:
+            retries = 0
+        elif retries is None:
+            retries = self.retries
+        for attempt in range(retries + 1):
+            try:
+                return self.result(self.submit(unit_id, pdu), timeout)
+            except (TimeoutError, ConnectionError):
+                if attempt == retries:
+                    raise
+
+    def read_pipelined(self, reads):
+        """
+        [(address, count, slave), ...]를 파이프라인으로 전송하고 같은 순서로 응답 목록을 반환합니다.
+        응답이 없거나 연결이 끊긴 항목은 해당 예외 객체가 들어갑니다.
+        """
+        reqs = []
+        for address, count, slave in reads:
+            try:
+                reqs.append(self.submit_read(address, count, slave))
+            except (ConnectionError, TimeoutError) as e:
+                reqs.append(e)
+        results = []
+        for req in reqs:
+            if isinstance(req, Exception):
+                results.append(req)
+                continue
+            try:
+                results.append(self.result(req))
+            except (ConnectionError, TimeoutError) as e:
+                results.append(e)
+        return results
+
+    # --------------------- 블록 읽기 (register_block.RegisterBlock) --------------------- #
+    def submit_read_into(self, block, slave=1):
+        return self.submit(slave, block.request_pdu, sink=block.view)
+
+    def finish_read_into(self, block, req, timeout=None):
+        pdu = self._wait(req, timeout)
+        if pdu[0] & 0x80:
+            block.set_exception(pdu[1] if len(pdu) > 1 else 0)
+        elif len(pdu) == 2:
+            # 데이터는 이미 block.raw에 들어 있음
+            block.valid = True
+            block.exception_code = None
+        else:
+            block.load(memoryview(pdu)[2:])     # 요청과 다른 길이의 응답
+        return block
+
+    def read_into(self, block, slave=1, timeout=None, retries=None):
+        """
+        block 범위를 FC03 한 번으로 읽어 block.raw에 직접 받습니다. block을 반환합니다.
+        시간 초과로 포기한 뒤에도 늦은 응답이 버퍼에 쓰일 수 있으므로 그 경우 block.valid를 믿지 마세요.
+        """
+        if retries is None:
+            retries = self.retries
+        for attempt in range(retries + 1):
+            try:
+                return self.finish_read_into(block, self.submit_read_into(block, slave), timeout)
+            except (TimeoutError, ConnectionError):
+                block.valid = False
+                if attempt == retries:
+                    raise
+
+    def read_pipelined_into(self, reads):
+        """
+        [(block, slave), ...]를 파이프라인으로 전송하고 같은 순서로 block 또는 예외 객체 목록을 반환합니다.
+        """
+        reqs = []
+        for block, slave in reads:
+            try:
+                reqs.append(self.submit_read_into(block, slave))
+            except (ConnectionError, TimeoutError) as e:
+                reqs.append(e)
+        results = []
+        for (block, _), req in zip(reads, reqs):
+            if isinstance(req, Exception):
+                block.valid = False
+                results.append(req)
+                continue
+            try:
+                results.append(self.finish_read_into(block, req))
+            except (ConnectionError, TimeoutError) as e:
+                block.valid = False
+                results.append(e)
+        return results
+
+    # --------------------- pymodbus 호환 메서드 --------------------- #
+    def submit_read(self, address, count=1, slave=1):
+        return self.submit(slave, struct.pack('>BHH', FC_READ_HOLDING, address, count))
+
+    def read_holding_registers(self, address, count=1, slave=1, retries=None):
+        return self.request(slave, struct.pack('>BHH', FC_READ_HOLDING, address, count), retries=retries)
+
+    def write_register(self, address, value, slave=1):
+        return self.request(slave, struct.pack('>BHH', FC_WRITE_SINGLE, address, value))
+
+    def write_registers(self, address, values, slave=1):
+        values = list(values)
+        pdu = struct.pack(f'>BHHB{len(values)}H', FC_WRITE_MULTIPLE, address,
+                          len(values), len(values) * 2, *values)
+        return self.request(slave, pdu)
+
+
+# --------------------- 호스트별 공유 연결 --------------------- #
+_pool = {}          # key: (host, port), value: [connection, refcount]
+_pool_lock = threading.Lock()
+
+
+def acquire(host, port=502, timeout=3, pipeline_depth=None):
+    """
+    (host, port)당 하나의 연결을 공유합니다. 사용 후 release()로 반납하세요.
+    pipeline_depth를 주면 해당 장치의 설정을 그 값으로 바꿉니다.
+    재시도 횟수는 다른 사용자에게 영향을 주지 않도록 요청마다 retries= 인자로 지정하세요.
+    """
+    with _pool_lock:
+        entry = _pool.get((host, port))
+        if entry is None:
+            entry = _pool[(host, port)] = [ModbusTcpConnection(host, port, timeout), 0]
+        if pipeline_depth is not None:
+            entry[0].set_pipeline_depth(pipeline_depth)
+        entry[1] += 1
+        return entry[0]
+
+
+def release(conn):
+    """마지막 사용자가 반납하면 연결을 닫습니다."""
+    with _pool_lock:
+        entry = _pool.get((conn.host, conn.port))
+        if entry is None or entry[0] is not conn:
+            return
+        entry[1] -= 1
+        if entry[1] > 0:
+            return
+        del _pool[(conn.host, conn.port)]
+    conn.close()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+로컬 네트워크 인터페이스 목록 & 장비별 TFTP 서버 IP 선택.
+
+get_local_ip()는 8.8.8.8로 UDP "연결"을 해서 주소 하나만 얻기 때문에,
+오프라인이면 127.0.0.1이 되고 NIC가 여러 개면 다른 서브넷 장비가 닿을 수 없는 IP를 받습니다.
+여기서는 모든 IPv4 주소(보조 주소 포함)와 라우팅 표를 읽어, 장비 IP마다
+  1) 같은 서브넷에 있는 로컬 주소
+  2) 라우팅 표에서 가장 긴 접두사로 일치하는 경로의 인터페이스 주소
+  3) 커널이 그 장비로 보낼 때 쓰는 출발지 주소 (UDP connect, 패킷은 나가지 않음)
+순으로 TFTP 서버 주소를 고르고 결과를 캐시합니다.
+"""
+import fcntl
+import ipaddress
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+INVENTORY_TTL = 30.0    # 인터페이스 목록/선택 결과 캐시 유효 시간(초)
+
+
+class LocalAddress:
+    def __init__(self, ifname, interface):
+        self.ifname = ifname
+        self.interface = interface      # ipaddress.IPv4Interface (주소/접두사)
+
+    @property
+    def ip(self):
+        return str(self.interface.ip)
+
+    @property
+    def network(self):
+        return self.interface.network
+
+    def __repr__(self):
+        return f"LocalAddress({self.ifname}, {self.interface})"
+
+
+def _addresses_from_ip_command():
+    out = subprocess.check_output(["ip", "-o", "-4", "addr", "show"],
+                                  stderr=subprocess.DEVNULL, universal_newlines=True, timeout=2)
+    result = []
+    for line in out.splitlines():
+        parts = line.split()
+        if "inet" in parts:
+            result.append(LocalAddress(parts[1], ipaddress.IPv4Interface(parts[parts.index("inet") + 1])))
+    return result
+
+
+def _addresses_from_ioctl():
+    # ip 명령이 없을 때: 인터페이스당 기본 주소 하나씩
+    result = []
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for _, name in socket.if_nameindex():
+            req = struct.pack('256s', name.encode()[:15])
+            try:
+                addr = socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, req)[20:24])
+                mask = socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFNETMASK, req)[20:24])
+            except OSError:
+                continue        # 주소가 없는 인터페이스
+            result.append(LocalAddress(name, ipaddress.IPv4Interface(f"{addr}/{mask}")))
+    finally:
+        s.close()
+    return result
+
+
+def list_addresses():
+    """모든 로컬 IPv4 주소 (루프백 포함)"""
+    try:
+        return _addresses_from_ip_command()
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return _addresses_from_ioctl()
+
+
+def list_routes():
+    """/proc/net/route의 IPv4 경로: [(ipaddress.IPv4Network, 인터페이스 이름, 게이트웨이), ...]"""
+    routes = []
+    try:
+        with open("/proc/net/route") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                if len(fields) < 8:
+                    continue
+                dest, gw, mask = (socket.inet_ntoa(struct.pack('<I', int(v, 16)))
+                                  for v in (fields[1], fields[2], fields[7]))
+                routes.append((ipaddress.IPv4Network(f"{dest}/{mask}", strict=False), fields[0], gw))
+    except OSError:
+        pass
+    return routes
+
+
+def _kernel_source_address(target_ip):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect((target_ip, 1))
+        return s.getsockname()[0]
+    except OSError:
+        return None
+    finally:
+        s.close()
+
+
+class InterfaceInventory:
+    def __init__(self, ttl=INVENTORY_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._addresses = []
+        self._routes = []
+        self._choices = {}      # key: 장비 IP, value: TFTP 서버 IP
+
+    def refresh(self):
+        addresses = list_addresses()
+        routes = list_routes()
+        with self._lock:
+            self._addresses = addresses
+            self._routes = routes
+            self._choices = {}
+            self._loaded_at = self.clock()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or self.clock() - self._loaded_at >= self.ttl:
+            self.refresh()
+
+    def addresses(self, include_loopback=False):
+        self._ensure_fresh()
+        with self._lock:
+            return [a for a in self._addresses if include_loopback or not a.interface.ip.is_loopback]
+
+    def primary_address(self):
+        """기본 경로 인터페이스의 주소, 없으면 첫 번째 비루프백 주소, 그것도 없으면 127.0.0.1"""
+        addrs = self.addresses()
+        with self._lock:
+            default_ifs = [ifname for net, ifname, _ in self._routes if net.prefixlen == 0]
+        for ifname in default_ifs:
+            for a in addrs:
+                if a.ifname == ifname:
+                    return a.ip
+        return addrs[0].ip if addrs else '127.0.0.1'
+
+    def tftp_ip_for(self, device_ip):
+        """device_ip가 도달할 수 있는 이 머신의 주소를 고릅니다."""
+        self._ensure_fresh()
+        with self._lock:
+            cached = self._choices.get(device_ip)
+            if cached:
+                return cached
+            addresses = list(self._addresses)
+            routes = list(self._routes)
+        target = ipaddress.IPv4Address(device_ip)
+        choice = None
+        # 1) 같은 서브넷 (접두사가 가장 긴 것)
+        same_subnet = [a for a in addresses if target in a.network]
+        if same_subnet:
+            choice = max(same_subnet, key=lambda a: a.network.prefixlen).ip
+        # 2) 라우팅 표의 최장 접두사 일치 경로 -> 그 인터페이스의 주소
+        if choice is None:
+            matching = [(net, ifname) for net, ifname, _ in routes if target in net]
+            if matching:
+                _, ifname = max(matching, key=lambda r: r[0].prefixlen)
+                choice = next((a.ip for a in addresses if a.ifname == ifname), None)
+        # 3) 커널이 선택하는 출발지 주소
+        if choice is None:
+            choice = _kernel_source_address(device_ip) or self.primary_address()
+        with self._lock:
+            self._choices[device_ip] = choice
+        return choice
+
+
+_inventory = InterfaceInventory()
+
+
+def get_local_ip():
+    """기존 get_local_ip()와 같은 용도: 이 머신의 대표 IPv4 주소 (오프라인이어도 동작)"""
+    return _inventory.primary_address()
+
+
+def tftp_ip_for(device_ip):
+    return _inventory.tftp_ip_for(device_ip)
+
+
+def local_addresses():
+    return _inventory.addresses()
+
+
+if __name__ == "__main__":
+    import sys
+    for a in _inventory.addresses(include_loopback=True):
+        print(f"{a.ifname:10} {a.interface}")
+    for ip in sys.argv[1:]:
+        print(f"{ip} -> TFTP {tftp_ip_for(ip)}")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+장비별 적응형 폴링 스케줄러.
+
+ModbusPoller가 고정 간격(0.2초)으로 모든 장비를 똑같이 두드리는 대신,
+장비마다 관측한 응답 시간(RTT)과 오류율로 폴링 간격과 타임아웃을 조정합니다.
+  - 타임아웃: TCP RTO와 같은 방식 (SRTT + 4 × RTTVAR), [min_timeout, max_timeout]으로 제한
+  - 간격: 기본 간격, 장비의 한 주기 소요 시간의 2배, 전체 예산의 공평 분배 중 가장 긴 값에
+          오류율만큼 가중 (오류율 100%면 5배)
+  - 서킷 브레이커: 연속 breaker_threshold회 주기 전체가 실패하면 일정 시간 폴링을 멈추고,
+                  실패가 반복될수록 대기 시간을 두 배씩 늘림 (최대 breaker_max초)
+  - 전체 초당 요청 수(max_rps)를 브레이커가 열리지 않은 장비들이 요청 수 비율로 나눠 씀
+"""
+import threading
+import time
+from collections import deque
+
+
+class DeviceStats:
+    def __init__(self, requests_per_cycle, window):
+        self.requests_per_cycle = requests_per_cycle
+        self.srtt = None            # 요청 하나당 평활 RTT
+        self.rttvar = 0.0
+        self.cycle_time = 0.0       # 한 주기(요청 묶음) 평활 소요 시간
+        self.errors = deque(maxlen=window)  # 주기별 오류 비율
+        self.consecutive_failures = 0
+        self.breaker_until = 0.0
+        self.breaker_backoff = 0.0
+        self.next_due = 0.0
+
+    @property
+    def error_rate(self):
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+
+class PollScheduler:
+    def __init__(self, base_interval=0.2, max_interval=30.0, min_timeout=0.3, max_timeout=3.0,
+                 max_rps=200.0, breaker_threshold=5, breaker_base=5.0, breaker_max=300.0,
+                 window=20, clock=time.monotonic):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.max_rps = max_rps
+        self.breaker_threshold = breaker_threshold
+        self.breaker_base = breaker_base
+        self.breaker_max = breaker_max
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._devices = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        설정 파일 형식 예)
+          "POLL_SCHEDULER": {"base_interval": 0.2, "max_rps": 200, "max_timeout": 3}
+        """
+        keys = ("base_interval", "max_interval", "min_timeout", "max_timeout", "max_rps",
+                "breaker_threshold", "breaker_base", "breaker_max", "window")
+        return cls(**{k: config[k] for k in keys if k in config})
+
+    # --------------------- 장비 등록 --------------------- #
+    def register(self, key, requests_per_cycle=1):
+        with self._lock:
+            self._devices[key] = DeviceStats(requests_per_cycle, self.window)
+
+    def unregister(self, key):
+        with self._lock:
+            self._devices.pop(key, None)
+
+    # --------------------- 계산 --------------------- #
+    def timeout_for(self, key):
+        with self._lock:
+            dev = self._devices.get(key)
+            if dev is None or dev.srtt is None:
+                return self.max_timeout
+            return min(self.max_timeout, max(self.min_timeout, dev.srtt + 4 * dev.rttvar))
+
+    def _fair_interval(self, dev, now):
+        # 브레이커가 닫혀 있는 장비들의 주기당 요청 수 합 / 초당 예산 = 한 바퀴 도는 데 필요한 최소 시간
+        if not self.max_rps:
+            return 0.0
+        total = sum(d.requests_per_cycle for d in self._devices.values() if d.breaker_until <= now)
+        return max(total, dev.requests_per_cycle) / self.max_rps
+
+    def _interval(self, dev, now):
+        interval = max(self.base_interval, 2 * dev.cycle_time, self._fair_interval(dev, now))
+        return min(self.max_interval, interval * (1 + 4 * dev.error_rate))
+
+    def interval_for(self, key):
+        with self._lock:
+            dev = self._devices.get(key)
+            return self.base_interval if dev is None else self._interval(dev, self.clock())
+
+    def is_open(self, key):
+        """서킷 브레이커가 열려(폴링 중단 상태) 있는지"""
+        with self._lock:
+            dev = self._devices.get(key)
+            return dev is not None and dev.breaker_until > self.clock()
+
+    # --------------------- 폴러에서 호출 --------------------- #
+    def record(self, key, cycle_time, rtt, error_ratio):
+        """
+        한 주기를 마친 뒤 호출합니다.
+        cycle_time: 주기 전체 소요 시간, rtt: 요청 하나의 왕복 시간 추정치, error_ratio: 실패한 요청 비율
+        """
+        now = self.clock()
+        with self._lock:
+            dev = self._devices.get(key)
+            if dev is None:
+                return
+            dev.errors.append(error_ratio)
+            if error_ratio < 1.0:
+                if dev.srtt is None:
+                    dev.srtt, dev.rttvar = rtt, rtt / 2
+                else:
+                    dev.rttvar = 0.75 * dev.rttvar + 0.25 * abs(dev.srtt - rtt)
+                    dev.srtt = 0.875 * dev.srtt + 0.125 * rtt
+                dev.cycle_time = cycle_time if not dev.cycle_time else 0.8 * dev.cycle_time + 0.2 * cycle_time
+                dev.consecutive_failures = 0
+                dev.breaker_backoff = 0.0
+            else:
+                dev.consecutive_failures += 1
+                if dev.consecutive_failures >= self.breaker_threshold:
+                    dev.breaker_backoff = min(self.breaker_max, dev.breaker_backoff * 2 or self.breaker_base)
+                    dev.breaker_until = now + dev.breaker_backoff
+                    # 반열림(half-open): 대기 후 한 주기만 시도, 또 실패하면 바로 다시 열림
+                    dev.consecutive_failures = self.breaker_threshold - 1
+            dev.next_due = max(now + self._interval(dev, now), dev.breaker_until)
+
+    def wait_turn(self, key, should_stop, step=0.2):
+        """다음 폴링 시각까지 대기합니다. should_stop()이 True가 되면 False를 반환합니다."""
+        while not should_stop():
+            with self._lock:
+                dev = self._devices.get(key)
+                due = dev.next_due if dev is not None else 0.0
+            remaining = due - self.clock()
+            if remaining <= 0:
+                return True
+            time.sleep(min(step, remaining))
+        return False
+
+    def snapshot(self):
+        """장비별 현재 상태 (로그/모니터링용)"""
+        now = self.clock()
+        with self._lock:
+            return {
+                key: {
+                    "interval": round(self._interval(dev, now), 3),
+                    "srtt": None if dev.srtt is None else round(dev.srtt, 4),
+                    "error_rate": round(dev.error_rate, 3),
+                    "breaker_open": dev.breaker_until > now,
+                }
+                for key, dev in self._devices.items()
+            }
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+미리 할당한 버퍼에 레지스터를 받아 바로 해석하는 블록 (대량 읽기용).
+
+pymodbus 응답 객체 -> int 리스트 -> 값마다 비트 연산 대신,
+  - FC03 응답의 데이터 바이트를 장치가 보낸 그대로(빅엔디언) RegisterBlock.raw에 받고
+    (modbus_tcp.ModbusTcpConnection.read_into()는 소켓에서 이 버퍼로 직접 recv_into 합니다)
+  - 필요한 값만 struct.unpack_from으로 그 자리에서 꺼냅니다.
+읽기마다 새로 만드는 객체가 없고, 같은 블록을 폴링 주기마다 재사용합니다.
+
+여러 필드를 한 번에 꺼낼 때는 RecordLayout으로 필드 정의를 struct 형식 하나로 미리 컴파일해 두면
+unpack_from 한 번으로 모든 값을 얻습니다.
+"""
+import struct
+import sys
+from array import array
+
+BASE = 40001
+
+_U16 = struct.Struct('>H')
+_S16 = struct.Struct('>h')
+_U32 = struct.Struct('>I')
+_S32 = struct.Struct('>i')
+_F32 = struct.Struct('>f')
+
+# 32비트 값의 워드 순서: "big" = 상위 워드가 먼저(낮은 주소), "little" = 하위 워드가 먼저
+_WORD_SWAP = {'big': False, 'little': True}
+
+
+class RegisterBlock:
+    """start 레지스터부터 count개의 레지스터를 담는 재사용 버퍼"""
+
+    def __init__(self, start, count, base=BASE):
+        self.start = start
+        self.count = count
+        self.base = base
+        self.raw = bytearray(count * 2)
+        self.view = memoryview(self.raw)
+        self.valid = False
+        self.exception_code = None
+        # FC03 요청 PDU도 한 번만 만들어 둠
+        self.request_pdu = struct.pack('>BHH', 0x03, start - base, count)
+        self._words = array('H', bytes(count * 2))
+        self._words_bytes = memoryview(self._words).cast('B')
+
+    # ---- modbus_tcp 응답 객체와 같은 모양 ----
+    def isError(self):
+        return self.exception_code is not None
+
+    @property
+    def registers(self):
+        return self.to_list()
+
+    # ---- 버퍼 채우기 ----
+    def load(self, data):
+        """FC03 데이터 바이트(빅엔디언 레지스터 값들)를 버퍼에 복사"""
+        n = min(len(data), len(self.raw))
+        self.view[:n] = data[:n]
+        self.valid = n == len(self.raw)
+        self.exception_code = None
+
+    def load_registers(self, values):
+        """pymodbus 등 이미 int 리스트로 받은 경우"""
+        struct.pack_into(f'>{len(values)}H', self.raw, 0, *values)
+        self.valid = len(values) == self.count
+        self.exception_code = None
+
+    def set_exception(self, code):
+        self.valid = False
+        self.exception_code = code
+
+    # ---- 값 해석 ----
+    def _offset(self, reg):
+        off = (reg - self.start) * 2
+        if not 0 <= off < len(self.raw):
+            raise IndexError(f"Register {reg} is outside block {self.start}+{self.count}")
+        return off
+
+    def u16(self, reg):
+        return _U16.unpack_from(self.raw, self._offset(reg))[0]
+
+    def s16(self, reg):
+        return _S16.unpack_from(self.raw, self._offset(reg))[0]
+
+    def _dword(self, fmt, reg, word_order):
+        off = self._offset(reg)
+        if not _WORD_SWAP[word_order]:
+            return fmt.unpack_from(self.raw, off)[0]
+        lo, hi = self.raw[off:off + 2], self.raw[off + 2:off + 4]
+        return fmt.unpack(hi + lo)[0]
+
+    def u32(self, reg, word_order='big'):
+        return self._dword(_U32, reg, word_order)
+
+    def s32(self, reg, word_order='big'):
+        return self._dword(_S32, reg, word_order)
+
+    def f32(self, reg, word_order='big'):
+        return self._dword(_F32, reg, word_order)
+
+    def bits(self, reg, shift, width=1):
+        """레지스터 reg의 shift번째 비트부터 width비트 (예: 40024 하위 바이트 = bits(40024, 0, 8))"""
+        return (self.u16(reg) >> shift) & ((1 << width) - 1)
+
+    def bit(self, reg, n):
+        return bool(self.u16(reg) >> n & 1)
+
+    def words(self):
+        """전체 레지스터를 재사용 array('H')로 (네이티브 엔디언으로 변환)"""
+        self._words_bytes[:] = self.raw
+        if sys.byteorder == 'little':
+            self._words.byteswap()
+        return self._words
+
+    def to_list(self):
+        return self.words().tolist()
+
+    def __repr__(self):
+        state = f"exception={self.exception_code}" if self.isError() else f"valid={self.valid}"
+        return f"RegisterBlock({self.start}+{self.count}, {state})"
+
+
+class RecordLayout:
+    """
+    필드 정의를 struct 형식 하나로 컴파일합니다.
+      layout = RecordLayout(40022, {
+          "version":  (40022, "u16"),
+          "status":   (40023, "u16"),
+          "progress": (40024, "bits", 0, 8),
+          "remain":   (40024, "bits", 8, 8),
+      })
+      block = layout.block()           # 레이아웃 범위만큼의 RegisterBlock
+      conn.read_into(block, slave=1)
+      layout.decode(block)             # {"version": 364, ...}
+    """
+    _CODES = {"u16": ("H", 1), "s16": ("h", 1), "u32": ("I", 2), "s32": ("i", 2), "f32": ("f", 2),
+              "bits": ("H", 1)}
+
+    def __init__(self, start, fields):
+        self.start = start
+        items = sorted(fields.items(), key=lambda kv: kv[1][0])
+        fmt = ['>']
+        pos = start
+        self.names = []
+        self._bits = []         # (결과 인덱스, shift, mask)
+        slots = {}              # 같은 레지스터를 여러 비트 필드가 나눠 쓰는 경우 한 번만 unpack
+        for name, spec in items:
+            reg, kind = spec[0], spec[1]
+            code, width = self._CODES[kind]
+            if reg in slots and kind == "bits":
+                index = slots[reg]
+            else:
+                if reg < pos:
+                    raise ValueError(f"Field {name} overlaps the previous field")
+                if reg > pos:
+                    fmt.append(f"{(reg - pos) * 2}x")
+                fmt.append(code)
+                index = slots[reg] = len(slots)
+                pos = reg + width
+            self.names.append((name, index))
+            if kind == "bits":
+                shift, nbits = spec[2], spec[3] if len(spec) > 3 else 1
+                self._bits.append((len(self.names) - 1, shift, (1 << nbits) - 1))
+        self.count = pos - start
+        self.struct = struct.Struct(''.join(fmt))
+
+    def block(self, base=BASE):
+        return RegisterBlock(self.start, self.count, base)
+
+    def unpack(self, block):
+        """필드 순서(레지스터 순)대로 값 튜플. 비트 필드는 아직 레지스터 전체 값."""
+        return self.struct.unpack_from(block.raw, (self.start - block.start) * 2)
+
+    def decode(self, block):
+        raw = self.unpack(block)
+        values = [raw[index] for _, index in self.names]
+        for i, shift, mask in self._bits:
+            values[i] = (values[i] >> shift) & mask
+        return {name: v for (name, _), v in zip(self.names, values)}
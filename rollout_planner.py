@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+롤아웃 계획: 측정값 기반 소요 시간 예측 & 점검 시간대(maintenance window) 안에 끝나도록 웨이브 편성.
+
+장비 한 대의 업그레이드는
+  준비(모드 변경 + 대기) -> 전송(GDSClientLinux cmd 5, TFTP 전송 포함) -> 재부팅/버전 확인
+으로 진행되고, 작업 풀은 전송이 끝나면 다음 장비로 넘어갑니다(재부팅 확인은 검증 풀에서 병행).
+따라서 W대씩 묶은 웨이브 하나의 시간 ≈ 준비 + 전송(W), 전체 ≈ 웨이브 수 × 웨이브 시간 + 마지막 재부팅.
+전송(W)는 장비당 전송 속도와, 여러 대가 TFTP 서버를 나눠 쓸 때의 전체 전송 속도 중 느린 쪽으로 계산합니다.
+
+측정값(RolloutStats)은 업그레이드가 끝날 때마다 지수 이동 평균으로 갱신되어 파일에 저장되고,
+진행 중에는 RolloutProgress가 실제로 끝난 웨이브 시간으로 남은 시간 예측을 고쳐 나갑니다.
+"""
+import datetime
+import json
+import math
+import os
+import threading
+import time
+
+from config_store import atomic_write_json
+
+STATS_FILE = os.path.expanduser("~/.gds_rollout_stats.json")
+
+# 측정값이 없을 때의 기본값
+DEFAULT_RATE = 64 * 1024        # 장비당 전송 속도 (바이트/초)
+DEFAULT_OVERHEAD = 5.0          # 모드 변경 + 대기 (초)
+DEFAULT_REBOOT = 60.0           # 재부팅 후 버전 확인까지 (초)
+
+
+class RolloutStats:
+    """장비당 전송 속도 / 전체 전송 속도 / 준비 시간 / 재부팅 시간의 이동 평균"""
+
+    FIELDS = ("rate", "aggregate_rate", "overhead", "reboot")
+
+    def __init__(self, path=STATS_FILE, alpha=0.2):
+        self.path = path
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self.rate = DEFAULT_RATE
+        self.aggregate_rate = None      # 동시에 여러 대일 때 관측된 전체 전송 속도 (없으면 제한 없음으로 봄)
+        self.overhead = DEFAULT_OVERHEAD
+        self.reboot = DEFAULT_REBOOT
+        self.samples = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key in self.FIELDS + ("samples",):
+            if data.get(key) is not None:
+                setattr(self, key, data[key])
+
+    def save(self):
+        with self._lock:
+            data = {key: getattr(self, key) for key in self.FIELDS + ("samples",)}
+        try:
+            atomic_write_json(self.path, data)
+        except OSError:
+            pass
+
+    def _ewma(self, old, new):
+        if old is None or self.samples == 0:
+            return new
+        return (1 - self.alpha) * old + self.alpha * new
+
+    def observe_transfer(self, size, transfer_seconds, overhead_seconds=None):
+        """장비 한 대의 전송 측정값"""
+        if transfer_seconds <= 0 or size <= 0:
+            return
+        with self._lock:
+            self.rate = self._ewma(self.rate, size / transfer_seconds)
+            if overhead_seconds is not None:
+                self.overhead = self._ewma(self.overhead, overhead_seconds)
+            self.samples += 1
+
+    def observe_wave(self, total_bytes, transfer_span, concurrency):
+        """여러 대 동시 전송의 전체 속도 (웨이브의 첫 전송 시작 ~ 마지막 전송 끝)"""
+        if concurrency < 2 or transfer_span <= 0:
+            return
+        with self._lock:
+            self.aggregate_rate = self._ewma(self.aggregate_rate, total_bytes / transfer_span)
+
+    def observe_reboot(self, seconds):
+        with self._lock:
+            self.reboot = self._ewma(self.reboot, seconds)
+
+    def transfer_seconds(self, size, concurrency=1):
+        per_device = size / self.rate
+        if self.aggregate_rate and concurrency > 1:
+            return max(per_device, concurrency * size / self.aggregate_rate)
+        return per_device
+
+    def wave_seconds(self, size, concurrency):
+        return self.overhead + self.transfer_seconds(size, concurrency)
+
+    def rollout_seconds(self, devices, size, concurrency):
+        if devices <= 0:
+            return 0.0
+        concurrency = max(1, min(concurrency, devices))
+        return math.ceil(devices / concurrency) * self.wave_seconds(size, concurrency) + self.reboot
+
+
+class MaintenanceWindow:
+    """매일 반복되는 점검 시간대 ("02:00"~"05:00", 자정을 넘겨도 됨)"""
+
+    def __init__(self, start, end):
+        self.start = self._parse(start)
+        self.end = self._parse(end)
+
+    @staticmethod
+    def _parse(text):
+        hour, minute = (int(v) for v in str(text).split(":"))
+        return datetime.time(hour, minute)
+
+    @classmethod
+    def from_config(cls, config):
+        """ "MAINTENANCE_WINDOW": {"start": "02:00", "end": "05:00"} , 없으면 None"""
+        if not config:
+            return None
+        return cls(config["start"], config["end"])
+
+    def bounds(self, now):
+        """now가 속한(또는 다음) 시간대의 (시작, 끝) datetime"""
+        for days in (-1, 0, 1):
+            day = now.date() + datetime.timedelta(days=days)
+            start = datetime.datetime.combine(day, self.start)
+            end = datetime.datetime.combine(day, self.end)
+            if end <= start:
+                end += datetime.timedelta(days=1)
+            if now < end:
+                return start, end
+        raise AssertionError("unreachable")
+
+    def in_window(self, now=None):
+        """now(기본: 현재 시각)가 시간대 안이면 True"""
+        now = now or datetime.datetime.now()
+        start, end = self.bounds(now)
+        return start <= now < end
+
+    def __repr__(self):
+        return f"{self.start:%H:%M}~{self.end:%H:%M}"
+
+
+class RolloutPlan:
+    def __init__(self, waves, wave_size, wave_seconds, eta_seconds, start_at, deferred, window_end=None,
+                 window=None):
+        self.waves = waves              # [[ip, ...], ...]
+        self.wave_size = wave_size
+        self.wave_seconds = wave_seconds
+        self.eta_seconds = eta_seconds
+        self.start_at = start_at        # datetime (지금 또는 시간대 시작)
+        self.deferred = deferred        # 시간대 안에 끝낼 수 없어 다음으로 미룬 장비
+        self.window_end = window_end
+        self.window = window            # MaintenanceWindow 또는 None (진행 중 시간대 확인용)
+
+    @property
+    def finish_at(self):
+        return self.start_at + datetime.timedelta(seconds=self.eta_seconds)
+
+    def summary(self):
+        devices = sum(len(w) for w in self.waves)
+        text = (f"{devices}대, {len(self.waves)}웨이브 × 최대 {self.wave_size}대, "
+                f"예상 {format_duration(self.eta_seconds)} "
+                f"({self.start_at:%m-%d %H:%M} 시작 -> {self.finish_at:%H:%M} 완료)")
+        if self.deferred:
+            text += f", 시간대 초과로 {len(self.deferred)}대 다음으로 연기"
+        return text
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}시간 {seconds % 3600 // 60}분"
+    if seconds >= 60:
+        return f"{seconds // 60}분 {seconds % 60}초"
+    return f"{seconds}초"
+
+
+def plan_rollout(devices, image_size, stats, max_concurrency, window=None, now=None):
+    """
+    devices를 웨이브로 나눕니다.
+    시간대가 있으면 그 안에 끝나는 가장 작은 웨이브 크기를 고르고(장비/네트워크 부하 최소),
+    최대 동시 작업 수로도 모자라면 시간대 안에 끝낼 수 있는 만큼만 넣고 나머지는 deferred로 돌립니다.
+    """
+    now = now or datetime.datetime.now()
+    devices = list(devices)
+    max_concurrency = max(1, min(max_concurrency, len(devices) or 1))
+    start_at, window_end = now, None
+    if window is not None:
+        start, window_end = window.bounds(now)
+        start_at = max(now, start)
+
+    wave_size = max_concurrency
+    deferred = []
+    if window_end is not None:
+        available = (window_end - start_at).total_seconds()
+        fitting = [w for w in range(1, max_concurrency + 1)
+                   if stats.rollout_seconds(len(devices), image_size, w) <= available]
+        if fitting:
+            wave_size = fitting[0]
+        else:
+            per_wave = stats.wave_seconds(image_size, max_concurrency)
+            waves_fit = max(0, int((available - stats.reboot) // per_wave))
+            keep = waves_fit * max_concurrency
+            devices, deferred = devices[:keep], devices[keep:]
+
+    waves = [devices[i:i + wave_size] for i in range(0, len(devices), wave_size)]
+    eta = stats.rollout_seconds(len(devices), image_size, wave_size)
+    return RolloutPlan(waves, wave_size, stats.wave_seconds(image_size, wave_size), eta,
+                       start_at, deferred, window_end, window)
+
+
+class RolloutProgress:
+    """
+    진행 중인 롤아웃의 남은 시간 예측.
+    끝난 웨이브의 실제 시간을 계획값과 섞어(끝난 웨이브가 많을수록 실측 비중이 커짐) 남은 웨이브에 적용합니다.
+    """
+
+    def __init__(self, plan, reboot_seconds, clock=time.monotonic):
+        self.plan = plan
+        self.reboot_seconds = reboot_seconds
+        self.clock = clock
+        self.started = clock()
+        self.wave_times = []
+        self.devices_done = 0
+        self.devices_total = sum(len(w) for w in plan.waves)
+
+    def wave_done(self, seconds, devices):
+        self.wave_times.append(seconds)
+        self.devices_done += devices
+
+    def remaining_seconds(self):
+        remaining_waves = len(self.plan.waves) - len(self.wave_times)
+        if remaining_waves <= 0:
+            return self.reboot_seconds
+        if self.wave_times:
+            n = len(self.wave_times)
+            observed = sum(self.wave_times) / n
+            weight = n / (n + 1)
+            per_wave = weight * observed + (1 - weight) * self.plan.wave_seconds
+        else:
+            per_wave = self.plan.wave_seconds
+        return remaining_waves * per_wave + self.reboot_seconds
+
+    def summary(self):
+        remaining = self.remaining_seconds()
+        finish = datetime.datetime.now() + datetime.timedelta(seconds=remaining)
+        return (f"{self.devices_done}/{self.devices_total}대 완료, "
+                f"경과 {format_duration(self.clock() - self.started)}, "
+                f"남은 시간 약 {format_duration(remaining)} ({finish:%H:%M} 완료 예상)")
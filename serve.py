@@ -1,32 +1,52 @@
 #!/usr/bin/env python3
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
 import subprocess
 import os
-import shutil
 import stat
 import time
 import threading
 import random
-import socket
-import json
+import collections
+import contextlib
+import datetime
+from concurrent.futures import ThreadPoolExecutor
 
-# 추가: pymodbus 모듈 임포트
-from pymodbus.client import ModbusTcpClient
+import modbus_tcp
+from change_filter import ChangeFilter
+from poll_scheduler import PollScheduler
+import fw_delta
+import netif
+from fw_delta import FirmwareCache
+from upgrade_journal import UpgradeJournal, rollout_id
+from upgrade_verify import VerificationPipeline
+from session_broker import broker
+from soak_telemetry import SoakMonitor
+from register_block import RegisterBlock
+from config_store import ConfigStore, entry_text
+from rollout_planner import RolloutStats, RolloutProgress, MaintenanceWindow, plan_rollout
+from tftp_server import TftpServer, MAX_BLKSIZE
 
-# 디스플레이 환경 변수 설정 (리눅스에서 GUI를 사용할 경우 필요)
-os.environ['DISPLAY'] = ':0'
-
-# ------------------- Tkinter 루트 생성 -------------------
-root = tk.Tk()
-root.title("자동 업그레이드 테스트 UI (다중 장비)")
+# tkinter / pymodbus는 실제로 필요할 때 임포트합니다 (모듈 임포트만으로 창을 만들거나
+# 무거운 라이브러리를 읽지 않도록). UI 위젯은 build_ui()에서 생성됩니다.
+tk = ttk = filedialog = messagebox = scrolledtext = None
+root = None
+frame_modbus = detector_ip_entry = tftp_ip_entry = file_entry = log_text = profile_var = None
+WINDOW_TITLE = "자동 업그레이드 테스트 UI (다중 장비)"
 
 # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 # 1) 설정 파일 경로 설정
 CONFIG_FILE = os.path.expanduser("~/.gds_client_config_auto_upgrade.json")
+config_store = ConfigStore(CONFIG_FILE, on_error=lambda msg: async_log_print(msg))
 
-# 2) TFTP 서버 루트 디렉토리 (실제 환경에 맞게 수정)
+# 2) TFTP 서버 루트 디렉토리 (실제 환경에 맞게 수정, 프로필의 TFTP_ROOT_DIR이 있으면 그 값)
 TFTP_ROOT_DIR = "/srv/tftp"
+
+# 3) 업그레이드 저널 (중단된 롤아웃 이어하기용)
+JOURNAL_FILE = os.path.expanduser("~/.gds_upgrade_journal_auto.log")
+
+# 4) 장시간 운용 (로그 창 최대 줄 수, 업그레이드/검증 동시 작업 수 기본값)
+LOG_MAX_LINES = 5000
+UPGRADE_WORKERS = 16
+VERIFY_WORKERS = 32
 # <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<
 
 # 전역 스레드/이벤트 객체
@@ -34,11 +54,38 @@ auto_thread = None                 # 자동 업그레이드 반복 스레드
 stop_event = threading.Event()     # 중지 신호 전달용 이벤트
 
 # --------------------- (A) 로그 업데이트 함수 --------------------- #
+# 로그는 제한된 큐에 모았다가 UI 스레드에서 한 번에 붙이고, 로그 창은 LOG_MAX_LINES 줄만 유지합니다.
+# (며칠씩 도는 자동 모드에서 로그 창과 after 콜백이 끝없이 쌓이지 않도록)
+log_pending = collections.deque(maxlen=LOG_MAX_LINES)
+log_lock = threading.Lock()
+log_flush_scheduled = False
+
 def async_log_print(msg: str):
-    def insert_log():
-        log_text.insert(tk.END, msg.rstrip() + "\n")
-        log_text.see(tk.END)  # 자동 스크롤
-    root.after(0, insert_log)
+    global log_flush_scheduled
+    if root is None:
+        # UI 없이(다른 모듈/스크립트에서) 사용할 때는 표준 출력으로
+        print(msg.rstrip(), flush=True)
+        return
+    with log_lock:
+        log_pending.append(msg.rstrip())
+        if log_flush_scheduled:
+            return
+        log_flush_scheduled = True
+    root.after(50, flush_log)
+
+def flush_log():
+    global log_flush_scheduled
+    with log_lock:
+        lines = list(log_pending)
+        log_pending.clear()
+        log_flush_scheduled = False
+    if not lines:
+        return
+    log_text.insert(tk.END, "\n".join(lines) + "\n")
+    excess = int(log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+    if excess > 0:
+        log_text.delete("1.0", f"{excess + 1}.0")
+    log_text.see(tk.END)  # 자동 스크롤
 
 # --------------------- (B) subprocess 실행 함수 --------------------- #
 def run_command_realtime(args):
@@ -64,21 +111,11 @@ def run_command_realtime(args):
 
 # --------------------- (C) 설정 파일 관리 --------------------- #
 def load_config():
-    if not os.path.isfile(CONFIG_FILE):
-        return {}
-    try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        async_log_print(f"[오류] 설정 파일을 로드할 수 없습니다: {e}")
-        return {}
+    # 파일이 바뀌었을 때만 다시 읽음, 반환값은 공유 캐시이므로 수정하지 말 것
+    return config_store.load()
 
 def save_config(config):
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=4)
-    except Exception as e:
-        async_log_print(f"[오류] 설정 파일을 저장할 수 없습니다: {e}")
+    config_store.save(config)
 
 def select_gdsclientlinux():
     filepath = filedialog.askopenfilename(
@@ -86,9 +123,7 @@ def select_gdsclientlinux():
         filetypes=[("Executable Files", "GDSClientLinux"), ("All Files", "*.*")]
     )
     if filepath:
-        config = load_config()
-        config['GDSCLIENT_PATH'] = filepath
-        save_config(config)
+        config_store.update(GDSCLIENT_PATH=filepath)
         async_log_print(f"[설정] GDSClientLinux 경로가 설정되었습니다: {filepath}")
         return filepath
     else:
@@ -152,54 +187,258 @@ def check_and_install_tftpd():
         async_log_print("[오류] tftpd-hpa 설치 실패")
         return False
 
+# 설정 "TFTP_SERVER": "builtin" 이면 tftpd-hpa 대신 내장 TFTP 서버(tftp_server.py)를 사용해
+# 장비별 전송 통계(속도/재전송/타임아웃)를 로그와 업그레이드 결과에 남깁니다.
+tftp_server = None
+tftp_lock = threading.Lock()
+builtin_tftp_failed = False
+
+def on_tftp_transfer(stats):
+    async_log_print(f"[TFTP] {stats.summary()}")
+
+def get_tftp_server():
+    """내장 TFTP 서버 (한 번만 시작, TFTP 루트가 바뀌면 다시 시작). 시작할 수 없으면 None"""
+    global tftp_server, builtin_tftp_failed
+    with tftp_lock:
+        tftp_root = os.path.realpath(get_tftp_root())
+        if tftp_server is not None and tftp_server.root != tftp_root:
+            tftp_server.stop()
+            tftp_server = None
+        if tftp_server is None and not builtin_tftp_failed:
+            config = load_config()
+            port = int(config.get('TFTP_PORT', 69))
+            # tftpd-hpa가 같은 포트를 쓰고 있으면 먼저 내림
+            run_command_realtime(["sudo", "systemctl", "stop", "tftpd-hpa"])
+            server = TftpServer(tftp_root, port=port,
+                                max_blksize=int(config.get('TFTP_MAX_BLKSIZE', MAX_BLKSIZE)),
+                                on_transfer=on_tftp_transfer)
+            try:
+                tftp_server = server.start()
+                async_log_print(f"[정보] 내장 TFTP 서버 시작: 포트 {port}, 루트 {tftp_root}")
+            except OSError as e:
+                builtin_tftp_failed = True
+                async_log_print(f"[오류] 내장 TFTP 서버를 시작할 수 없습니다 (포트 {port}): {e}")
+        return tftp_server
+
+def tftp_report(detector_ip, since):
+    """내장 TFTP 서버를 쓰는 경우 장비의 since(monotonic) 이후 마지막 전송 요약, 아니면 빈 문자열"""
+    server = tftp_server
+    if server is None:
+        return ""
+    stats = server.last_transfer(detector_ip, since)
+    if stats is None:
+        running = [st for st in server.active() if st.ip == detector_ip]
+        return running[-1].summary() if running else "TFTP 요청 없음"
+    return stats.summary()
+
 def start_tftp_server():
+    if load_config().get('TFTP_SERVER') == 'builtin':
+        if get_tftp_server() is not None:
+            return
+        async_log_print("[정보] 내장 TFTP 서버 대신 tftpd-hpa를 사용합니다.")
     async_log_print("[정보] TFTP 서버를 시작합니다...")
     run_command_realtime(["sudo", "systemctl", "enable", "tftpd-hpa"])
     run_command_realtime(["sudo", "systemctl", "start", "tftpd-hpa"])
 
 # --------------------- (E) 파일 복사 (고정 이름) --------------------- #
+firmware_caches = {}    # key: TFTP 루트, value: FirmwareCache
+
+def get_tftp_root():
+    return load_config().get('TFTP_ROOT_DIR', TFTP_ROOT_DIR)
+
+def get_firmware_cache(tftp_root):
+    cache = firmware_caches.get(tftp_root)
+    if cache is None:
+        cache = firmware_caches[tftp_root] = FirmwareCache(tftp_root)
+    return cache
+
+def make_readable(path):
+    # TFTP 루트가 내 소유이면 직접, 아니면 sudo로 권한 변경 (sudo 프로세스를 매번 띄우지 않도록)
+    try:
+        os.chmod(path, 0o644)
+    except PermissionError:
+        run_command_realtime(["sudo", "chmod", "644", path])
+
 def copy_to_tftp(file_path, dest_name="ASGD3000E_H.bin"):
     if not os.path.isfile(file_path):
         async_log_print(f"[오류] 파일이 존재하지 않습니다: {file_path}")
         return False
-    if not os.path.exists(TFTP_ROOT_DIR):
-        async_log_print(f"[오류] TFTP 루트 디렉토리가 없습니다: {TFTP_ROOT_DIR}")
+    tftp_root = get_tftp_root()
+    if not os.path.exists(tftp_root):
+        async_log_print(f"[오류] TFTP 루트 디렉토리가 없습니다: {tftp_root}")
         return False
+    firmware_cache = get_firmware_cache(tftp_root)
 
-    dest_path = os.path.join(TFTP_ROOT_DIR, dest_name)
+    # 같은 내용이 이미 배치되어 있으면 다시 쓰지 않음 (장비마다가 아니라 버전당 한 번만 복사)
+    previous = firmware_cache.previous_source(dest_name)
     try:
-        shutil.copy(file_path, dest_path)
-        async_log_print(f"[파일 복사] {file_path} -> {dest_path}")
-        run_command_realtime(["sudo", "chmod", "644", dest_path])
-        return True
+        dest_path, copied = firmware_cache.stage(file_path, dest_name)
     except Exception as e:
         async_log_print(f"[오류] 파일 복사 중 문제 발생: {e}")
         return False
+    if not copied:
+        return True
+    async_log_print(f"[파일 복사] {file_path} -> {dest_path}")
+    make_readable(dest_path)
+    if previous and previous != file_path:
+        try:
+            report = fw_delta.compare_files(previous, file_path)
+            async_log_print(f"[델타 측정] {fw_delta.format_report(previous, file_path, report)}")
+        except Exception as e:
+            async_log_print(f"[경고] 이미지 유사도 측정 실패: {e}")
+    return True
 
 # --------------------- (F) 업그레이드 작업 (고정 이름) --------------------- #
-def upgrade_task(detector_ip, tftp_ip, upgrade_file_paths):
+upgrade_journal = None
+journal_lock = threading.Lock()
+
+def get_journal():
+    global upgrade_journal
+    with journal_lock:
+        if upgrade_journal is None:
+            upgrade_journal = UpgradeJournal(JOURNAL_FILE)
+        return upgrade_journal
+
+def journal_record(rollout, detector_ip, phase, detail=""):
+    if rollout is None:
+        return
+    try:
+        get_journal().record(rollout, detector_ip, phase, detail)
+    except OSError as e:
+        async_log_print(f"[경고] 업그레이드 저널 기록 실패: {e}")
+
+verifier = None
+verifier_settings = None
+upgrade_pool = None
+upgrade_pool_workers = None
+rollout_stats = None
+
+def get_rollout_stats():
+    global rollout_stats
+    with journal_lock:
+        if rollout_stats is None:
+            rollout_stats = RolloutStats()
+        return rollout_stats
+
+def get_upgrade_pool():
+    # 장비마다/주기마다 스레드를 새로 만들지 않고 고정 크기 풀을 재사용
+    # (프로필 변경 등으로 UPGRADE_WORKERS가 바뀌면 새 크기로 다시 만들고, 진행 중인 작업은 기존 풀에서 마저 실행)
+    global upgrade_pool, upgrade_pool_workers
+    with journal_lock:
+        workers = int(load_config().get('UPGRADE_WORKERS', UPGRADE_WORKERS))
+        if upgrade_pool is not None and upgrade_pool_workers != workers:
+            upgrade_pool.shutdown(wait=False)
+            upgrade_pool = None
+        if upgrade_pool is None:
+            upgrade_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upgrade")
+            upgrade_pool_workers = workers
+        return upgrade_pool
+
+def modbus_port():
+    # 장비 Modbus TCP 포트 (기본 502, 게이트웨이/시험 환경에서는 "MODBUS_PORT"로 변경)
+    return int(load_config().get('MODBUS_PORT', 502))
+
+def verify_options(config):
+    """
+    verify_device()에 넘길 옵션. 설정 파일 형식 예)
+      "VERIFY": {"settle": 2, "down_limit": 15, "up_limit": 180, "poll_interval": 1}
+    """
+    verify = config.get('VERIFY', {})
+    options = {k: float(verify[k]) for k in ("settle", "down_limit", "up_limit", "poll_interval") if k in verify}
+    options['port'] = int(config.get('MODBUS_PORT', 502))
+    options['auto_rollback'] = config.get('AUTO_ROLLBACK', True)
+    return options
+
+def get_verifier():
+    # VERIFY_WORKERS/AUTO_ROLLBACK/VERIFY/MODBUS_PORT 설정이 바뀌면 새로 만듦
+    global verifier, verifier_settings
+    with journal_lock:
+        config = load_config()
+        workers = int(config.get('VERIFY_WORKERS', VERIFY_WORKERS))
+        options = verify_options(config)
+        settings = (workers, sorted(options.items()))
+        if verifier is not None and verifier_settings != settings:
+            verifier.shutdown(wait=False)
+            verifier = None
+        if verifier is None:
+            verifier = VerificationPipeline(max_workers=workers, **options)
+            verifier_settings = settings
+        return verifier
+
+def on_verified(rollout, res, transfer_start=None):
+    tftp = tftp_report(res.ip, transfer_start)
+    tftp = f" | TFTP {tftp}" if tftp else ""
+    if res.ok:
+        get_rollout_stats().observe_reboot(res.elapsed)
+        journal_record(rollout, res.ip, "done", f"version={res.actual}")
+        async_log_print(f"[검증] {res.ip} {res.message} (버전 {res.actual}, {res.elapsed:.0f}초){tftp}")
+    else:
+        journal_record(rollout, res.ip, "failed", res.message)
+        rollback = " -> 롤백 명령 전송" if res.rolled_back else ""
+        async_log_print(f"[검증 실패] {res.ip} {res.message}: 기대 {res.expected}, "
+                        f"실제 {res.actual}{rollback}{tftp}")
+
+fixed_stage_lock = threading.Lock()     # 고정 이름 배치 모드에서 배치~전송 구간 보호
+
+def upgrade_task(detector_ip, tftp_ip, upgrade_file_paths, rollout=None, timings=None):
+    """
+    업그레이드 명령이 성공하면 검증(재부팅 대기 -> 버전 확인)을 검증 풀에 넘기고
+    그 Future를 반환합니다. 검증하지 않거나 실패하면 None.
+    timings(dict)를 주면 성공한 경우 이미지 크기와 준비/전송 시간(monotonic)을 채웁니다.
+    """
+    started = time.monotonic()
     files = [f.strip() for f in upgrade_file_paths.split(",") if f.strip()]
     if not files:
         async_log_print("[오류] 업그레이드할 파일이 선택되지 않았습니다.")
         return
     selected_file = random.choice(files)
-    fixed_name = "ASGD3000E_H.bin"
-
-    if not copy_to_tftp(selected_file, dest_name=fixed_name):
+    # 버전별 배포(기본): 이미지마다 원래 이름으로 배치하여, 동시에 업그레이드되는 장비들이
+    # 서로 다른 이미지를 골라도 파일을 덮어쓰지 않음 (검증하는 버전 = 장비가 받은 이미지의 버전)
+    # "STAGE_PER_VERSION": false 이면 고정 이름을 쓰고, 배치부터 전송 끝까지 한 장비씩 진행
+    per_version = load_config().get('STAGE_PER_VERSION', True)
+    fixed_name = os.path.basename(selected_file) if per_version else "ASGD3000E_H.bin"
+    tftp_ip = resolve_tftp_ip(detector_ip, tftp_ip)
+    if tftp_ip is None:
+        journal_record(rollout, detector_ip, "failed", "tftp-ip")
         return
-    start_tftp_server()
-    ret1 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "4", "1"])
-    time.sleep(2)
-    ret2 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "5", tftp_ip, fixed_name])
+    with contextlib.nullcontext() if per_version else fixed_stage_lock:
+        if not copy_to_tftp(selected_file, dest_name=fixed_name):
+            journal_record(rollout, detector_ip, "failed", "copy")
+            return
+        journal_record(rollout, detector_ip, "staged", os.path.basename(selected_file))
+        start_tftp_server()
+        ret1 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "4", "1"])
+        journal_record(rollout, detector_ip, "mode-changed", ret1)
+        time.sleep(2)
+        journal_record(rollout, detector_ip, "transfer", tftp_ip)
+        transfer_start = time.monotonic()
+        ret2 = run_command_realtime([GDSCLIENT_PATH, detector_ip, "5", tftp_ip, fixed_name])
     if ret2 == 0:
+        if timings is not None:
+            timings.update(size=os.path.getsize(selected_file), overhead=transfer_start - started,
+                           transfer_start=transfer_start, transfer_end=time.monotonic())
         async_log_print(f"[알림] {detector_ip} 업그레이드 명령을 성공적으로 마쳤습니다. 사용된 파일: {fixed_name}")
+        if not load_config().get('VERIFY_AFTER_UPGRADE', True):
+            journal_record(rollout, detector_ip, "done", fixed_name)
+            return None
+        journal_record(rollout, detector_ip, "verify", os.path.basename(selected_file))
+        return get_verifier().submit(detector_ip, selected_file,
+                                     on_result=lambda res: on_verified(rollout, res, transfer_start))
     else:
-        async_log_print(f"[알림] {detector_ip} 업그레이드 명령 중 오류가 발생했습니다.")
+        journal_record(rollout, detector_ip, "failed", ret2)
+        tftp = tftp_report(detector_ip, transfer_start)
+        async_log_print(f"[알림] {detector_ip} 업그레이드 명령 중 오류가 발생했습니다."
+                        + (f" (TFTP {tftp})" if tftp else ""))
 
 # --------------------- (G) 단발 업그레이드 호출 --------------------- #
 def get_detector_ips():
+    # "IP@Unit" 형식의 Unit 지정은 Modbus 폴링 전용이므로 업그레이드 대상에서는 IP만 사용
     ip_text = detector_ip_entry.get().strip()
-    ips = [ip.strip() for ip in ip_text.split(",") if ip.strip()]
+    ips = []
+    for spec in ip_text.split(","):
+        ip = spec.split("@", 1)[0].strip()
+        if ip and ip not in ips:
+            ips.append(ip)
     return ips
 
 def upgrade_once_multiple():
@@ -209,12 +448,127 @@ def upgrade_once_multiple():
     if not detector_ips or not tftp_ip or not upgrade_file_paths:
         messagebox.showwarning("경고", "모든 입력 항목(장비 IP(들), TFTP IP, 업그레이드 파일)을 입력하세요.")
         return
-    for ip in detector_ips:
-        threading.Thread(
-            target=upgrade_task,
-            args=(ip, tftp_ip, upgrade_file_paths),
-            daemon=True
-        ).start()
+    threading.Thread(
+        target=run_rollout,
+        args=(detector_ips, tftp_ip, upgrade_file_paths),
+        daemon=True
+    ).start()
+
+def image_size(upgrade_file_paths):
+    """선택된 이미지들의 평균 크기 (업그레이드마다 무작위로 하나를 고르므로)"""
+    sizes = []
+    for path in upgrade_file_paths.split(","):
+        try:
+            sizes.append(os.path.getsize(path.strip()))
+        except OSError:
+            pass
+    return sum(sizes) / len(sizes) if sizes else 0
+
+def make_plan(detector_ips, upgrade_file_paths):
+    config = load_config()
+    try:
+        window = MaintenanceWindow.from_config(config.get('MAINTENANCE_WINDOW'))
+    except (KeyError, ValueError) as e:
+        async_log_print(f"[경고] MAINTENANCE_WINDOW 설정 오류 ({e}), 시간대 없이 계획합니다.")
+        window = None
+    workers = int(config.get('UPGRADE_WORKERS', UPGRADE_WORKERS))
+    return plan_rollout(detector_ips, image_size(upgrade_file_paths), get_rollout_stats(), workers, window)
+
+def show_rollout_plan():
+    upgrade_file_paths = file_entry.get().strip()
+    detector_ips = get_detector_ips()
+    if not detector_ips or not upgrade_file_paths:
+        messagebox.showwarning("경고", "장비 IP(들)와 업그레이드 파일을 입력하세요.")
+        return
+    plan = make_plan(detector_ips, upgrade_file_paths)
+    stats = get_rollout_stats()
+    async_log_print(f"[계획] {plan.summary()}")
+    async_log_print(f"[계획] 측정값: 장비당 {stats.rate / 1024:.0f}KB/s, 준비 {stats.overhead:.0f}초, "
+                    f"재부팅 {stats.reboot:.0f}초 (표본 {stats.samples}개)")
+
+def wait_until(when, should_stop=None):
+    """when(datetime)까지 대기, 중간에 중지되면 False"""
+    while True:
+        remaining = (when - datetime.datetime.now()).total_seconds()
+        if remaining <= 0:
+            return True
+        if should_stop is not None and should_stop():
+            return False
+        time.sleep(min(remaining, 1.0))
+
+def run_rollout(detector_ips, tftp_ip, upgrade_file_paths, resume=True, should_stop=None):
+    """
+    장비들을 웨이브 단위로 동시에 업그레이드하고 저널에 기록합니다.
+    같은 이미지·장비 목록의 이전 롤아웃이 중간에 끊겼으면(resume=True) 끝나지 않은 장비만 진행합니다.
+    MAINTENANCE_WINDOW가 설정되어 있으면 시간대가 열릴 때까지 기다리고, 시간대 안에 끝나도록 웨이브를 나눕니다.
+    진행 중에 시간대가 끝나면 남은 장비는 시작하지 않고 저널에 남겨 다음 실행에서 이어서 진행합니다.
+    """
+    files = [os.path.basename(f.strip()) for f in upgrade_file_paths.split(",") if f.strip()]
+    rid = rollout_id(files, detector_ips)
+    journal = get_journal()
+    targets, resumed = journal.resume_plan(rid, detector_ips) if resume else (list(detector_ips), False)
+    if resumed:
+        skipped = len(detector_ips) - len(targets)
+        async_log_print(f"[저널] 중단된 롤아웃 {rid} 이어서 진행: 완료 {skipped}대 생략, {len(targets)}대 남음")
+    else:
+        journal.begin(rid, detector_ips)
+
+    stats = get_rollout_stats()
+    plan = make_plan(targets, upgrade_file_paths)
+    async_log_print(f"[계획] {plan.summary()}")
+    if plan.start_at > datetime.datetime.now():
+        async_log_print(f"[계획] 점검 시간대 시작({plan.start_at:%m-%d %H:%M})까지 대기")
+        if not wait_until(plan.start_at, should_stop):
+            return
+    progress = RolloutProgress(plan, stats.reboot)
+    pool = get_upgrade_pool()
+    verifies = []
+    closed = []     # 진행 중 점검 시간대가 끝나 시작하지 못한 장비 (저널에 남아 다음 실행에서 이어서 진행)
+    for index, wave in enumerate(plan.waves):
+        if should_stop is not None and should_stop():
+            break
+        wave_start = time.monotonic()
+        timings = {ip: {} for ip in wave}
+        tasks = []
+        for ip in wave:
+            # 장비마다 시작 직전에 시간대를 다시 확인 (계획 시점보다 실제 진행이 느릴 수 있음)
+            if closed or (plan.window is not None and not plan.window.in_window()):
+                closed.append(ip)
+                continue
+            tasks.append(pool.submit(upgrade_task, ip, tftp_ip, upgrade_file_paths, rid, timings[ip]))
+        for task in tasks:
+            try:
+                verify = task.result()      # 검증 Future (업그레이드 작업은 검증을 기다리지 않고 끝남)
+            except Exception as e:
+                async_log_print(f"[오류] 업그레이드 작업 예외: {e}")
+                continue
+            if verify is not None:
+                verifies.append(verify)
+        # 측정값 갱신: 장비별 전송 속도 + 웨이브 전체 전송 속도
+        measured = [t for t in timings.values() if t]
+        for t in measured:
+            stats.observe_transfer(t["size"], t["transfer_end"] - t["transfer_start"], t["overhead"])
+        if measured:
+            span = max(t["transfer_end"] for t in measured) - min(t["transfer_start"] for t in measured)
+            stats.observe_wave(sum(t["size"] for t in measured), span, len(measured))
+        if tasks:
+            progress.wave_done(time.monotonic() - wave_start, len(tasks))
+            async_log_print(f"[진행] {progress.summary()}")
+        if closed:
+            closed += [ip for later in plan.waves[index + 1:] for ip in later]
+            break
+    for verify in verifies:
+        verify.result()
+    stats.save()
+    if plan.deferred:
+        async_log_print(f"[계획] 점검 시간대를 넘겨 {len(plan.deferred)}대는 다음 시간대로 연기: "
+                        f"{', '.join(plan.deferred)}")
+    if closed:
+        async_log_print(f"[계획] 진행 중 점검 시간대가 끝나 {len(closed)}대는 시작하지 않았습니다 "
+                        f"(다음 실행에서 이어서 진행): {', '.join(closed)}")
+    if journal.is_complete(rid):
+        journal.end(rid)
+        journal.sync()
 
 # ============================================================
 # =============== 랜덤 반복 업그레이드 로직 (다중 장비) ===============
@@ -227,26 +581,28 @@ def auto_upgrade_loop_multiple():
     if not files:
         async_log_print("[오류] 업그레이드할 파일이 선택되지 않았습니다.")
         return
-    while not stop_event.is_set():
-        threads = []
-        for ip in detector_ips:
-            th = threading.Thread(
-                target=upgrade_task,
-                args=(ip, tftp_ip, upgrade_file_paths),
-                daemon=True
-            )
-            th.start()
-            threads.append(th)
-        for th in threads:
-            th.join()
-        if stop_event.is_set():
-            break
-        wait_sec = random.randint(42, 300)
-        async_log_print(f"[자동모드] 다음 업그레이드까지 대기: {wait_sec}초")
-        for _ in range(wait_sec):
+    # 장시간 운용 상태(메모리/스레드 수) 주기 기록, "SOAK_TELEMETRY": false 로 끌 수 있음
+    soak_config = load_config().get('SOAK_TELEMETRY', {})
+    monitor = None
+    if soak_config is not False:
+        monitor = SoakMonitor.from_config(soak_config or {}, log=async_log_print)
+        monitor.start()
+    try:
+        while not stop_event.is_set():
+            # 자동(반복) 모드는 매 주기 전체 장비를 다시 업그레이드하므로 이어하기 없이 기록만 함
+            run_rollout(detector_ips, tftp_ip, upgrade_file_paths, resume=False, should_stop=stop_event.is_set)
+            if get_journal().maybe_compact():
+                async_log_print("[저널] 완료된 롤아웃 기록 정리")
             if stop_event.is_set():
                 break
-            time.sleep(1)
+            wait_sec = random.randint(42, 300)
+            async_log_print(f"[자동모드] 다음 업그레이드까지 대기: {wait_sec}초")
+            stop_event.wait(wait_sec)
+    finally:
+        if monitor is not None:
+            monitor.stop()
+            if monitor.violations:
+                async_log_print(f"[텔레메트리] 누수 의심 {len(monitor.violations)}건 기록됨")
 
 def start_auto_upgrade_multiple():
     global auto_thread
@@ -287,25 +643,48 @@ def select_files():
 
 # --------------------- (I) 로컬 IP 주소 가져오기 --------------------- #
 def get_local_ip():
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return netif.get_local_ip()
+
+def resolve_tftp_ip(detector_ip, tftp_ip):
+    # TFTP IP가 'auto'이면 장비와 같은 서브넷(또는 해당 경로)의 로컬 주소를 장비마다 선택
+    # 장비 주소가 IPv4 주소가 아니면(호스트 이름, 오타 등) 고를 수 없으므로 로그를 남기고 None
+    if tftp_ip.lower() != "auto":
+        return tftp_ip
     try:
-        s.connect(('8.8.8.8', 1))
-        IP = s.getsockname()[0]
-    except Exception:
-        IP = '127.0.0.1'
-    finally:
-        s.close()
-    return IP
+        chosen = netif.tftp_ip_for(detector_ip)
+    except ValueError:
+        async_log_print(f"[오류] {detector_ip}: IPv4 주소가 아니어서 TFTP IP 자동 선택 불가 "
+                        "(장비 IP를 주소로 입력하거나 TFTP IP를 직접 지정하세요)")
+        return None
+    async_log_print(f"[정보] {detector_ip} -> TFTP 서버 IP {chosen} 자동 선택")
+    return chosen
 
 # --------------------- Modbus TCP 테스트 기능 --------------------- #
+def pymodbus_client(ip, timeout, port=502):
+    # pymodbus는 임포트가 무거우므로 처음 사용할 때 읽습니다
+    from pymodbus.client import ModbusTcpClient
+    return ModbusTcpClient(ip, port=port, timeout=timeout)
+
 def modbus_test():
     ip_text = detector_ip_entry.get().strip()
     if not ip_text:
         messagebox.showwarning("경고", "장비 IP(들)를 입력하세요.")
         return
-    modbus_ip = ip_text.split(",")[0].strip()
+    spec = ip_text.split(",")[0].strip()
+    modbus_ip = spec.split("@", 1)[0].strip()
+    # 이미 폴링 중인 장비면 폴러의 마지막 샘플을 사용 (장비로 추가 요청을 보내지 않음)
+    sample = broker.snapshot(modbus_ip, max_age=snapshot_max_age(modbus_ip))
+    if sample is not None:
+        if sample.regs is not None and sample.regs[0] not in ("err", "timeout"):
+            data = sample.regs[0]
+            async_log_print(f"[Modbus 테스트] {sample.key} 폴링 세션 데이터 ({sample.age():.1f}초 전): {data}")
+            messagebox.showinfo("Modbus 테스트", f"{sample.key} 폴링 중 (세션 공유).\n데이터: {data}")
+        else:
+            async_log_print(f"[Modbus 테스트] {sample.key} 폴링 세션 상태: {sample.status}")
+            messagebox.showerror("Modbus 테스트", f"{sample.key} 폴링 세션 상태: {sample.status}")
+        return
     try:
-        client = ModbusTcpClient(modbus_ip, port=502, timeout=3)
+        client = pymodbus_client(modbus_ip, timeout=3, port=modbus_port())
         if client.connect():
             # 단일 레지스터 읽기
             result = client.read_holding_registers(0)
@@ -324,16 +703,47 @@ def modbus_test():
         async_log_print(f"[Modbus 테스트] 예외 발생: {e}")
         messagebox.showerror("Modbus 테스트", f"예외 발생: {e}")
 
+def snapshot_max_age(ip):
+    # 폴링 간격의 두 배까지는 최신 샘플로 간주 (스케줄러가 간격을 늘린 장비도 고려)
+    if modbus_scheduler is not None and ip in modbus_pollers:
+        return max(5.0, 2 * modbus_scheduler.interval_for(ip))
+    return 5.0
+
 # ====================== Modbus Polling 기능 추가 ======================
 modbus_pollers = {}  # key: ip, value: ModbusPoller instance
 modbus_labels = {}   # key: ip, value: Label widget
+modbus_filter = None # 모든 폴러가 공유하는 ChangeFilter (폴링 시작 시 설정 파일로 생성)
+modbus_scheduler = None  # 모든 폴러가 공유하는 PollScheduler (전체 초당 요청 예산 분배)
 
 class ModbusPoller:
-    def __init__(self, ip, update_callback, poll_interval=0.02):
+    POLL_REGS = 11  # 40001 ~ 40011
+
+    def __init__(self, ip, update_callback, poll_interval=0.02, unit_ids=None, pipeline_depth=None,
+                 sample_filter=None, scheduler=None, bulk=False, port=502):
         self.ip = ip
+        self.port = port
         self.update_callback = update_callback
+        # scheduler(PollScheduler)가 있으면 poll_interval 대신 장비 상태에 맞춘 간격/타임아웃 사용
+        self.scheduler = scheduler
+        # sample_filter(ChangeFilter)가 있으면 변화가 있는 샘플만 update_callback으로 전달
+        self.sample_filter = sample_filter
         self.poll_interval = poll_interval
-        self.client = ModbusTcpClient(ip, port=502, timeout=1)
+        # unit_ids가 주어지면 게이트웨이 뒤의 여러 장치를 TCP 연결 하나로 다중화하여 폴링
+        self.unit_ids = list(unit_ids) if unit_ids else None
+        # 다중 Unit이거나 파이프라인 깊이가 지정되면 경량 전송 계층(modbus_tcp)을 사용하여
+        # 응답을 기다리지 않고 여러 요청을 연달아 보냅니다. (RTT가 큰 원격 링크용)
+        self.pipelined = bool(self.unit_ids) or bool(pipeline_depth) or bulk
+        # bulk=True: Unit마다 40001~40011을 FC03 한 번으로, 미리 할당한 블록 버퍼에 바로 받음
+        # (레지스터 여러 개 읽기를 지원하는 장비에서만 사용)
+        self.blocks = [RegisterBlock(40001, self.POLL_REGS) for _ in (self.unit_ids or [0])] if bulk else None
+        if self.pipelined:
+            self.client = modbus_tcp.acquire(ip, port, timeout=1, pipeline_depth=pipeline_depth)
+        else:
+            self.client = pymodbus_client(ip, timeout=1, port=port)
+        # 읽은 샘플은 필터와 관계없이 모두 세션에 게시 (다른 구독자는 snapshot/subscribe로 공유)
+        self.session = broker.open(ip)
+        self.last_errors = {}   # key: 장치 키, value: 마지막으로 로그에 남긴 오류 상태
+        self.last_raw = {}      # key: 장치 키, value: (마지막 응답 바이트, 그 바이트로 만든 레지스터 목록)
         self.running = False
         self.thread = None
 
@@ -343,38 +753,181 @@ class ModbusPoller:
             return
         # older 버전에서는 unit_id를 별도로 전달하지 않습니다.
         self.running = True
-        self.thread = threading.Thread(target=self.poll_loop, daemon=True)
+        if self.scheduler is not None:
+            self.scheduler.register(self.ip, self.POLL_REGS * len(self.unit_ids or [0]))
+        if self.blocks is not None:
+            target = self.poll_loop_bulk
+        else:
+            target = self.poll_loop_pipelined if self.pipelined else self.poll_loop
+        self.thread = threading.Thread(target=target, daemon=True)
         self.thread.start()
 
+    @staticmethod
+    def format_regs(regs):
+        # 추출: 40001 -> regs[0], 40005 -> regs[4], 40007 -> regs[7], 40011 -> regs[10]
+        return (
+            f"40001: {regs[0]}, "
+            f"40005: {regs[4]}, "
+            f"40007: {regs[7]}, "
+            f"40011: {regs[10]}"
+        )
+
+    @staticmethod
+    def error_status(e):
+        """
+        예외를 상태 문자열로. 예외 메시지에는 트랜잭션 ID처럼 매 주기 바뀌는 값이 들어 있어
+        그대로 쓰면 ChangeFilter가 매번 "상태 변화"로 보고 통과시키므로 종류만 남깁니다.
+        """
+        if isinstance(e, TimeoutError):
+            return "예외: timeout"
+        if isinstance(e, OSError):
+            return "예외: 연결"
+        return f"예외: {type(e).__name__}"
+
+    def emit(self, key, regs, status, error=None):
+        # error: 상태의 원인이 된 예외, 상태가 바뀔 때만 자세한 메시지를 로그에 남김
+        if error is not None:
+            if self.last_errors.get(key) != status:
+                async_log_print(f"[Modbus 폴링] {key} {status} ({error})")
+            self.last_errors[key] = status
+        else:
+            self.last_errors.pop(key, None)
+        self.session.publish(key, regs, status)
+        if self.sample_filter is not None and not self.sample_filter.accept(key, regs, status):
+            return
+        self.update_callback(key, None if regs is None else self.format_regs(regs), status)
+
+    def set_timeout(self, timeout):
+        # modbus_tcp / pymodbus 2.x: .timeout, pymodbus 3.x: comm_params.timeout_connect
+        comm = getattr(self.client, "comm_params", None)
+        if comm is not None and hasattr(comm, "timeout_connect"):
+            comm.timeout_connect = timeout
+        else:
+            self.client.timeout = timeout
+        sock = getattr(self.client, "socket", None)
+        if sock is not None:
+            sock.settimeout(timeout)
+
+    def pace(self, started, requests, errors, sequential):
+        # 한 주기를 마친 뒤 다음 주기까지 대기
+        if self.scheduler is None:
+            time.sleep(self.poll_interval)
+            return
+        cycle_time = time.monotonic() - started
+        rtt = cycle_time / requests if sequential else cycle_time
+        self.scheduler.record(self.ip, cycle_time, rtt, errors / requests)
+        self.set_timeout(self.scheduler.timeout_for(self.ip))
+        self.scheduler.wait_turn(self.ip, lambda: not self.running)
+
     def poll_loop(self):
         # pymodbus의 구버전에서는 read_holding_registers가 단일 레지스터만 지원하므로,
         # 0번부터 10번까지 개별적으로 호출합니다.
         while self.running:
+            started = time.monotonic()
+            errors = 0
             try:
                 regs = []
-                for addr in range(11):
+                for addr in range(self.POLL_REGS):
                     result = self.client.read_holding_registers(addr)
                     if result.isError():
                         regs.append("err")
+                        errors += 1
                     else:
                         regs.append(result.registers[0])
-                # 추출: 40001 -> regs[0], 40005 -> regs[4], 40007 -> regs[7], 40011 -> regs[10]
-                display_data = (
-                    f"40001: {regs[0]}, "
-                    f"40005: {regs[4]}, "
-                    f"40007: {regs[7]}, "
-                    f"40011: {regs[10]}"
-                )
-                self.update_callback(self.ip, display_data, "정상")
+                self.emit(self.ip, regs, "정상")
             except Exception as e:
-                self.update_callback(self.ip, None, f"예외: {e}")
-            time.sleep(self.poll_interval)
+                errors = self.POLL_REGS
+                self.emit(self.ip, None, self.error_status(e), e)
+            self.pace(started, self.POLL_REGS, errors, sequential=True)
+
+    def poll_loop_pipelined(self):
+        # 모든 Unit × 레지스터 요청을 트랜잭션 ID로 구분하여 파이프라인으로 보내고 응답을 모아서 처리
+        # unit_ids가 없으면 pymodbus 기본값과 같은 Unit 0 하나만 폴링하고 IP를 그대로 키로 사용
+        units = self.unit_ids or [0]
+        while self.running:
+            started = time.monotonic()
+            reads = [(addr, 1, unit) for unit in units for addr in range(self.POLL_REGS)]
+            results = self.client.read_pipelined(reads)
+            errors = sum(1 for r in results if isinstance(r, Exception) or r.isError())
+            for i, unit in enumerate(units):
+                key = f"{self.ip}@{unit}" if self.unit_ids else self.ip
+                chunk = results[i * self.POLL_REGS:(i + 1) * self.POLL_REGS]
+                failed = [r for r in chunk if isinstance(r, Exception)]
+                if len(failed) == len(chunk):
+                    self.emit(key, None, self.error_status(failed[0]), failed[0])
+                    continue
+                regs = []
+                for result in chunk:
+                    if isinstance(result, Exception):
+                        regs.append("timeout")
+                    elif result.isError():
+                        regs.append("err")
+                    else:
+                        regs.append(result.registers[0])
+                self.emit(key, regs, "정상")
+            self.pace(started, len(reads), errors, sequential=False)
+
+    def poll_loop_bulk(self):
+        units = self.unit_ids or [0]
+        reads = list(zip(self.blocks, units))
+        while self.running:
+            started = time.monotonic()
+            results = self.client.read_pipelined_into(reads)
+            errors = 0
+            for (block, unit), result in zip(reads, results):
+                key = f"{self.ip}@{unit}" if self.unit_ids else self.ip
+                if isinstance(result, Exception):
+                    errors += 1
+                    self.emit(key, None, self.error_status(result), result)
+                elif block.isError() or not block.valid:
+                    errors += 1
+                    self.emit(key, ["err"] * self.POLL_REGS, "정상")
+                else:
+                    last = self.last_raw.get(key)
+                    if last is not None and last[0] == block.raw:
+                        regs = last[1]      # 응답 바이트가 그대로면 이전 목록 재사용 (to_list 생략)
+                    else:
+                        regs = block.to_list()
+                        self.last_raw[key] = (bytes(block.raw), regs)
+                    self.emit(key, regs, "정상")
+            self.pace(started, len(reads), errors, sequential=False)
 
     def stop(self):
         self.running = False
         if self.thread is not None:
             self.thread.join(timeout=1)
-        self.client.close()
+        if self.pipelined:
+            modbus_tcp.release(self.client)
+        else:
+            self.client.close()
+        if self.sample_filter is not None:
+            self.sample_filter.forget(self.ip)
+        if self.scheduler is not None:
+            self.scheduler.unregister(self.ip)
+        broker.close(self.ip)
+
+def parse_unit_ids(spec):
+    """
+    Unit ID 지정 문자열 해석: "1-32", "5", "1-4+7+9" -> [1, 2, ...]
+    """
+    units = []
+    for part in spec.split("+"):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            units.extend(range(int(lo), int(hi) + 1))
+        else:
+            units.append(int(part))
+    return sorted(set(u for u in units if 0 <= u <= 247))
+
+def split_device_spec(spec):
+    """ "192.168.0.10@1-32" -> ("192.168.0.10", [1..32]), "192.168.0.10" -> ("192.168.0.10", None)"""
+    if "@" not in spec:
+        return spec.strip(), None
+    ip, units = spec.split("@", 1)
+    return ip.strip(), parse_unit_ids(units) or None
 
 def update_modbus_label(ip, data, status):
     def update():
@@ -384,123 +937,255 @@ def update_modbus_label(ip, data, status):
             text = f"IP: {ip} | {data} | 상태: {status}"
         if ip in modbus_labels:
             modbus_labels[ip].config(text=text)
-        else:
+        elif data is None or ip.split("@", 1)[0] in modbus_pollers:
+            # 정리(prune)된 장비의 늦게 도착한 샘플로 라벨이 다시 생기지 않도록
             lbl = tk.Label(frame_modbus, text=text, anchor="w")
             lbl.pack(fill="x", padx=5, pady=2)
             modbus_labels[ip] = lbl
     root.after(0, update)
 
+def get_pipeline_depth(ip):
+    """
+    설정 파일의 장치별 파이프라인 깊이. 예)
+      "PIPELINE_DEPTH": {"default": 4, "10.1.2.3": 11}
+    지정이 없으면 None (기존 pymodbus 요청-응답 방식)
+    """
+    depths = load_config().get('PIPELINE_DEPTH', {})
+    depth = depths.get(ip, depths.get('default'))
+    try:
+        return int(depth) if depth else None
+    except (TypeError, ValueError):
+        async_log_print(f"[경고] {ip} 파이프라인 깊이 설정 오류: {depth}")
+        return None
+
+def get_bulk_read(ip):
+    """
+    설정 파일의 블록 읽기 사용 여부. 예)
+      "BULK_READ": true  또는  "BULK_READ": ["10.1.2.3", "10.1.2.4"]
+    """
+    bulk = load_config().get('BULK_READ', False)
+    return ip in bulk if isinstance(bulk, list) else bool(bulk)
+
 def start_modbus_polling():
+    global modbus_filter, modbus_scheduler
+    config = load_config()
+    if modbus_filter is None:
+        modbus_filter = ChangeFilter.from_config(config.get('CHANGE_FILTER', {}))
+    if modbus_scheduler is None:
+        modbus_scheduler = PollScheduler.from_config(config.get('POLL_SCHEDULER', {}))
     ip_text = detector_ip_entry.get().strip()
     ips = [ip.strip() for ip in ip_text.split(",") if ip.strip()]
     if not ips:
         messagebox.showwarning("경고", "Modbus 폴링을 시작할 IP 주소를 입력하세요.")
         return
-    for ip in ips:
+    prune_modbus_devices({spec.split("@", 1)[0].strip() for spec in ips})
+    for spec in ips:
+        try:
+            ip, unit_ids = split_device_spec(spec)
+        except ValueError:
+            async_log_print(f"[Modbus 폴링] Unit ID 형식 오류: {spec}")
+            continue
         if ip not in modbus_pollers:
-            poller = ModbusPoller(ip, update_modbus_label, poll_interval=0.2)
-            modbus_pollers[ip] = poller
+            poller = ModbusPoller(ip, update_modbus_label, poll_interval=0.2, unit_ids=unit_ids,
+                                  pipeline_depth=get_pipeline_depth(ip), sample_filter=modbus_filter,
+                                  scheduler=modbus_scheduler, bulk=get_bulk_read(ip), port=modbus_port())
             poller.start()
+            if not poller.running:
+                poller.stop()       # 연결 실패: 연결 반납, 다음 시작 때 다시 시도
+                continue
+            modbus_pollers[ip] = poller
             async_log_print(f"[Modbus 폴링] {ip}에 대해 폴링 시작")
         else:
             async_log_print(f"[Modbus 폴링] {ip}는 이미 폴링 중입니다.")
 
+def prune_modbus_devices(active_ips):
+    """입력 목록에서 빠진 장비의 폴러와 상태 라벨을 정리합니다."""
+    for ip in [ip for ip in modbus_pollers if ip not in active_ips]:
+        modbus_pollers.pop(ip).stop()
+        async_log_print(f"[Modbus 폴링] {ip} 목록에서 제외되어 폴링 중지")
+    for key in [key for key in modbus_labels if key.split("@", 1)[0] not in active_ips]:
+        modbus_labels.pop(key).destroy()
+
 def stop_modbus_polling():
+    # 폴러가 중지되면 스케줄러에서 빠지므로 통계를 먼저 기록
+    if modbus_scheduler is not None:
+        for ip, st in modbus_scheduler.snapshot().items():
+            async_log_print(f"[Modbus 폴링] {ip} 간격 {st['interval']}s, RTT {st['srtt']}s, "
+                            f"오류율 {st['error_rate']}, 차단 {st['breaker_open']}")
     for ip, poller in list(modbus_pollers.items()):
         poller.stop()
         async_log_print(f"[Modbus 폴링] {ip} 폴링 중지")
         del modbus_pollers[ip]
+    if modbus_filter is not None:
+        st = modbus_filter.stats()
+        async_log_print(f"[Modbus 폴링] 변화 필터: 샘플 {st['offered']}개 중 {st['emitted']}개 전달")
+
+# --------------------- 프로필 (config_store 참고) --------------------- #
+NO_PROFILE = "(없음)"
+
+def set_entry(entry, text):
+    if text is None:
+        return
+    entry.delete(0, tk.END)
+    entry.insert(0, text)
+
+def fill_profile_entries():
+    """선택된 프로필의 장비 목록/펌웨어/TFTP IP를 입력란에, 사이트 이름을 창 제목에 표시"""
+    name = config_store.active_profile()
+    if name is None:
+        root.title(WINDOW_TITLE)
+        return
+    config = load_config()
+    set_entry(detector_ip_entry, entry_text(config.get('DEVICES')))
+    set_entry(tftp_ip_entry, entry_text(config.get('TFTP_IP')))
+    set_entry(file_entry, entry_text(config.get('FIRMWARE')))
+    root.title(f"{WINDOW_TITLE} - {config.get('SITE', name)}")
+
+def on_profile_selected(event=None):
+    name = profile_var.get()
+    try:
+        config_store.use_profile(None if name == NO_PROFILE else name)
+    except KeyError:
+        async_log_print(f"[프로필] 없는 프로필입니다: {name}")
+        return
+    fill_profile_entries()
+    async_log_print(f"[프로필] '{name}' 적용")
+
+# --------------------- (J) UI 구성 --------------------- #
+def import_tk():
+    global tk, ttk, filedialog, messagebox, scrolledtext
+    import tkinter
+    from tkinter import ttk as _ttk, filedialog as _filedialog, messagebox as _messagebox, \
+        scrolledtext as _scrolledtext
+    tk, ttk, filedialog, messagebox, scrolledtext = tkinter, _ttk, _filedialog, _messagebox, _scrolledtext
+
+def build_ui():
+    global root, frame_modbus, detector_ip_entry, tftp_ip_entry, file_entry, log_text, profile_var
+    import_tk()
+
+    # ------------------- Tkinter 루트 생성 -------------------
+    root = tk.Tk()
+    root.title(WINDOW_TITLE)
+
+    # ====================== Modbus Polling UI 추가 ======================
+    frame_modbus = tk.Frame(root)
+    frame_modbus.pack(padx=10, pady=5, fill="x")
+    lbl_modbus_title = tk.Label(frame_modbus, text="Modbus Polling 데이터", fg="green", font=("Helvetica", 10, "bold"))
+    lbl_modbus_title.pack(anchor="w", padx=5)
+
+    # ======================= Tkinter UI 구성 =======================
+    info_label = tk.Label(
+        root,
+        text=(
+            "GDSClientLinux를 이용하여 랜덤 간격(42~300초)으로\n"
+            "자동 업그레이드를 반복 실행하는 테스트 툴입니다.\n"
+            "여러 장비(Detector IP)를 동시에 처리할 수 있습니다.\n"
+            "업그레이드 파일을 여러 개 선택하면 업그레이드 시 무작위로 선택됩니다.\n\n"
+            "※ Modbus 테스트는 '장비 IP(들)' 입력란의 첫 번째 IP를 사용합니다.\n"
+            "※ TFTP IP를 'auto'로 두면 장비마다 같은 서브넷의 로컬 주소를 사용합니다.\n"
+            "※ 게이트웨이 뒤 여러 장치 폴링: 'IP@1-32' 또는 'IP@1+3+5' (연결 하나를 공유)"
+        ),
+        fg="blue"
+    )
+    info_label.pack(padx=10, pady=5)
 
-# ====================== Modbus Polling UI 추가 ======================
-frame_modbus = tk.Frame(root)
-frame_modbus.pack(padx=10, pady=5, fill="x")
-lbl_modbus_title = tk.Label(frame_modbus, text="Modbus Polling 데이터", fg="green", font=("Helvetica", 10, "bold"))
-lbl_modbus_title.pack(anchor="w", padx=5)
-
-# ======================= Tkinter UI 구성 =======================
-info_label = tk.Label(
-    root,
-    text=(
-        "GDSClientLinux를 이용하여 랜덤 간격(42~300초)으로\n"
-        "자동 업그레이드를 반복 실행하는 테스트 툴입니다.\n"
-        "여러 장비(Detector IP)를 동시에 처리할 수 있습니다.\n"
-        "업그레이드 파일을 여러 개 선택하면 업그레이드 시 무작위로 선택됩니다.\n\n"
-        "※ Modbus 테스트는 '장비 IP(들)' 입력란의 첫 번째 IP를 사용합니다."
-    ),
-    fg="blue"
-)
-info_label.pack(padx=10, pady=5)
-
-# IP 입력 프레임
-frame_ip = tk.Frame(root)
-frame_ip.pack(padx=10, pady=5, fill="x")
-
-tk.Label(frame_ip, text="장비 IP(들):").grid(row=0, column=0, sticky="e")
-detector_ip_entry = tk.Entry(frame_ip, width=30)
-detector_ip_entry.grid(row=0, column=1, padx=5)
-
-tk.Label(frame_ip, text="TFTP IP:").grid(row=0, column=2, sticky="e")
-tftp_ip_entry = tk.Entry(frame_ip, width=15)
-tftp_ip_entry.grid(row=0, column=3, padx=5)
-
-# Modbus 테스트 버튼 (추가)
-modbus_test_btn = tk.Button(frame_ip, text="Modbus 테스트", command=modbus_test)
-modbus_test_btn.grid(row=1, column=1, padx=5, pady=5, sticky="w")
-
-# 파일 선택 프레임
-frame_file = tk.Frame(root)
-frame_file.pack(padx=10, pady=5, fill="x")
-
-tk.Label(frame_file, text="업그레이드 파일:").grid(row=0, column=0, sticky="e")
-file_entry = tk.Entry(frame_file, width=60)
-file_entry.grid(row=0, column=1, padx=5)
-file_btn = tk.Button(frame_file, text="파일 선택", command=select_files)
-file_btn.grid(row=0, column=2, padx=5)
-
-# 명령 버튼들 (자동 시작/중지, 단발 업그레이드, Modbus Polling 제어)
-frame_buttons = tk.Frame(root)
-frame_buttons.pack(padx=10, pady=5)
-btn_start_auto = tk.Button(frame_buttons, text="자동 업그레이드 시작 (다중)", width=25, command=start_auto_upgrade_multiple)
-btn_start_auto.grid(row=0, column=0, padx=5, pady=5)
-btn_stop_auto = tk.Button(frame_buttons, text="자동 업그레이드 중지", width=25, command=stop_auto_upgrade)
-btn_stop_auto.grid(row=0, column=1, padx=5, pady=5)
-btn_upgrade_once = tk.Button(frame_buttons, text="단발 업그레이드 실행 (다중)", width=25, command=upgrade_once_multiple)
-btn_upgrade_once.grid(row=0, column=2, padx=5, pady=5)
-btn_start_modbus = tk.Button(frame_buttons, text="Modbus Polling 시작", width=25, command=start_modbus_polling)
-btn_start_modbus.grid(row=1, column=0, padx=5, pady=5)
-btn_stop_modbus = tk.Button(frame_buttons, text="Modbus Polling 중지", width=25, command=stop_modbus_polling)
-btn_stop_modbus.grid(row=1, column=1, padx=5, pady=5)
-
-# 로그 창
-log_text = scrolledtext.ScrolledText(root, width=80, height=15)
-log_text.pack(padx=10, pady=10)
-
-# 마우스 우클릭 > 복사
-def copy_selection():
-    log_text.event_generate("<<Copy>>")
-
-context_menu = tk.Menu(log_text, tearoff=0)
-context_menu.add_command(label="복사", command=copy_selection)
-
-def show_context_menu(event):
-    context_menu.tk_popup(event.x_root, event.y_root)
-
-log_text.bind("<Button-3>", show_context_menu)
+    # IP 입력 프레임
+    frame_ip = tk.Frame(root)
+    frame_ip.pack(padx=10, pady=5, fill="x")
+
+    tk.Label(frame_ip, text="장비 IP(들):").grid(row=0, column=0, sticky="e")
+    detector_ip_entry = tk.Entry(frame_ip, width=30)
+    detector_ip_entry.grid(row=0, column=1, padx=5)
+
+    tk.Label(frame_ip, text="TFTP IP:").grid(row=0, column=2, sticky="e")
+    tftp_ip_entry = tk.Entry(frame_ip, width=15)
+    tftp_ip_entry.grid(row=0, column=3, padx=5)
+
+    # Modbus 테스트 버튼 (추가)
+    modbus_test_btn = tk.Button(frame_ip, text="Modbus 테스트", command=modbus_test)
+    modbus_test_btn.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+
+    # 프로필 선택 (사이트/장비 목록/TFTP 루트/동시 작업 수/펌웨어 묶음)
+    tk.Label(frame_ip, text="프로필:").grid(row=2, column=0, sticky="e")
+    profile_var = tk.StringVar(value=config_store.active_profile() or NO_PROFILE)
+    profile_box = ttk.Combobox(frame_ip, textvariable=profile_var, state="readonly", width=27,
+                               values=[NO_PROFILE] + sorted(config_store.profiles()))
+    profile_box.grid(row=2, column=1, padx=5, pady=2, sticky="w")
+    profile_box.bind("<<ComboboxSelected>>", on_profile_selected)
+
+    # 파일 선택 프레임
+    frame_file = tk.Frame(root)
+    frame_file.pack(padx=10, pady=5, fill="x")
+
+    tk.Label(frame_file, text="업그레이드 파일:").grid(row=0, column=0, sticky="e")
+    file_entry = tk.Entry(frame_file, width=60)
+    file_entry.grid(row=0, column=1, padx=5)
+    file_btn = tk.Button(frame_file, text="파일 선택", command=select_files)
+    file_btn.grid(row=0, column=2, padx=5)
+
+    # 명령 버튼들 (자동 시작/중지, 단발 업그레이드, Modbus Polling 제어)
+    frame_buttons = tk.Frame(root)
+    frame_buttons.pack(padx=10, pady=5)
+    btn_start_auto = tk.Button(frame_buttons, text="자동 업그레이드 시작 (다중)", width=25, command=start_auto_upgrade_multiple)
+    btn_start_auto.grid(row=0, column=0, padx=5, pady=5)
+    btn_stop_auto = tk.Button(frame_buttons, text="자동 업그레이드 중지", width=25, command=stop_auto_upgrade)
+    btn_stop_auto.grid(row=0, column=1, padx=5, pady=5)
+    btn_upgrade_once = tk.Button(frame_buttons, text="단발 업그레이드 실행 (다중)", width=25, command=upgrade_once_multiple)
+    btn_upgrade_once.grid(row=0, column=2, padx=5, pady=5)
+    btn_start_modbus = tk.Button(frame_buttons, text="Modbus Polling 시작", width=25, command=start_modbus_polling)
+    btn_start_modbus.grid(row=1, column=0, padx=5, pady=5)
+    btn_stop_modbus = tk.Button(frame_buttons, text="Modbus Polling 중지", width=25, command=stop_modbus_polling)
+    btn_stop_modbus.grid(row=1, column=1, padx=5, pady=5)
+    btn_plan = tk.Button(frame_buttons, text="롤아웃 계획 (예상 시간)", width=25, command=show_rollout_plan)
+    btn_plan.grid(row=1, column=2, padx=5, pady=5)
+
+    # 로그 창
+    log_text = scrolledtext.ScrolledText(root, width=80, height=15)
+    log_text.pack(padx=10, pady=10)
+
+    # 마우스 우클릭 > 복사
+    def copy_selection():
+        log_text.event_generate("<<Copy>>")
+
+    context_menu = tk.Menu(log_text, tearoff=0)
+    context_menu.add_command(label="복사", command=copy_selection)
+
+    def show_context_menu(event):
+        context_menu.tk_popup(event.x_root, event.y_root)
+
+    log_text.bind("<Button-3>", show_context_menu)
 
 # --------------------- (K) 시작 시 자동 설정 --------------------- #
 def on_start():
+    # 경로 선택 대화상자만 UI 스레드에서 처리하고, dpkg/apt-get/systemctl/IP 조회 등
+    # 시간이 걸리는 환경 점검은 백그라운드 스레드로 돌려 창이 바로 응답하도록 합니다.
     global GDSCLIENT_PATH
     GDSCLIENT_PATH = get_gdsclient_path()
     if not GDSCLIENT_PATH:
         return
+    threading.Thread(target=startup_checks, daemon=True).start()
+
+def startup_checks():
     if not ensure_gdsclientlinux_executable():
         async_log_print("[오류] GDSClientLinux 실행 권한 설정 실패 혹은 파일이 없습니다.")
+    local_ip = get_local_ip()
+    addresses = netif.local_addresses()
+    root.after(0, lambda: fill_ip_entries(local_ip, addresses))
+    try:
+        for rid, devices in get_journal().unfinished():
+            async_log_print(f"[저널] 끝나지 않은 롤아웃 {rid}: 남은 장비 {', '.join(devices)} "
+                            "(같은 장비/파일로 단발 업그레이드를 실행하면 이어서 진행)")
+    except OSError as e:
+        async_log_print(f"[경고] 업그레이드 저널을 읽을 수 없습니다: {e}")
     if check_and_install_tftpd():
         start_tftp_server()
-    local_ip = get_local_ip()
+
+def fill_ip_entries(local_ip, addresses):
     async_log_print(f"[정보] 로컬 IP 주소 감지: {local_ip}")
+    for addr in addresses:
+        async_log_print(f"[정보] 인터페이스 {addr.ifname}: {addr.interface}")
     tftp_ip_entry.delete(0, tk.END)
-    tftp_ip_entry.insert(0, local_ip)
+    tftp_ip_entry.insert(0, "auto" if len(addresses) > 1 else local_ip)
     try:
         base_ip = '.'.join(local_ip.split('.')[:3]) + '.'
     except Exception:
@@ -508,6 +1193,15 @@ def on_start():
         async_log_print("[경고] 로컬 IP 분석 실패, 기본값 '192.168.0.' 사용")
     detector_ip_entry.delete(0, tk.END)
     detector_ip_entry.insert(0, base_ip)
+    # 선택된 프로필이 있으면 그 장비 목록 등으로 덮어씀
+    fill_profile_entries()
+
+def main():
+    # 디스플레이 환경 변수 설정 (리눅스에서 GUI를 사용할 경우 필요)
+    os.environ['DISPLAY'] = ':0'
+    build_ui()
+    root.after(100, on_start)
+    root.mainloop()
 
-root.after(100, on_start)
-root.mainloop()
+if __name__ == "__main__":
+    main()
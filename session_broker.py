@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+장비별 세션 브로커 (읽기 한 번, 구독자 여러 개).
+
+장비마다 연결 하나 + 폴링 루프 하나(ModbusPoller)만 두고, 폴러가 읽은 샘플을
+DeviceSession에 publish 하면 구독자(UI 라벨, 기록기, API, CLI 조회 등)는
+  - snapshot(): 마지막 샘플을 바로 조회
+  - subscribe(): 새 샘플을 스트림(큐)으로 받기
+로 가져갑니다. 구독자가 몇 개든 장비로 나가는 요청 수는 그대로입니다.
+느린 구독자는 자기 큐에서 오래된 샘플이 버려질 뿐, 폴링 루프를 막지 않습니다.
+"""
+import collections
+import threading
+import time
+
+
+class Sample:
+    __slots__ = ("key", "regs", "status", "ts")
+
+    def __init__(self, key, regs, status, ts):
+        self.key = key          # 장비 IP 또는 "IP@Unit"
+        self.regs = regs        # 레지스터 값 리스트 (실패 시 None)
+        self.status = status
+        self.ts = ts            # time.monotonic() 기준 수신 시각
+
+    def age(self, now=None):
+        return (time.monotonic() if now is None else now) - self.ts
+
+    def __repr__(self):
+        return f"Sample({self.key}, {self.status}, regs={self.regs})"
+
+
+class Subscription:
+    """샘플 스트림. get()으로 하나씩 꺼내거나 for 문으로 순회합니다."""
+
+    def __init__(self, session, maxlen=256, keys=None):
+        self.session = session
+        self.keys = set(keys) if keys else None
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._maxlen = maxlen
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def _push(self, sample):
+        if self.keys is not None and sample.key not in self.keys:
+            return
+        with self._cond:
+            if len(self._queue) >= self._maxlen:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(sample)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """다음 샘플, timeout 안에 없거나 구독이 닫히면 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            return self._queue.popleft() if self._queue else None
+
+    def __iter__(self):
+        while not self.closed:
+            sample = self.get()
+            if sample is not None:
+                yield sample
+
+    def close(self):
+        self.session.unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+
+class DeviceSession:
+    def __init__(self, ip):
+        self.ip = ip
+        self._lock = threading.Lock()
+        self._latest = {}       # key: 장비 키, value: Sample
+        self._subscribers = []
+        self._callbacks = []
+        self.published = 0
+
+    def publish(self, key, regs, status):
+        """폴러가 샘플을 읽을 때마다 호출"""
+        sample = Sample(key, regs, status, time.monotonic())
+        with self._lock:
+            self._latest[key] = sample
+            self.published += 1
+            subscribers = list(self._subscribers)
+            callbacks = list(self._callbacks)
+        for sub in subscribers:
+            sub._push(sample)
+        for cb in callbacks:
+            cb(sample)
+
+    def snapshot(self, key=None, max_age=None):
+        """
+        key의 마지막 샘플 (key가 없으면 이 장비의 샘플 중 가장 최근 것).
+        샘플이 없거나 max_age초보다 오래되었으면 None.
+        """
+        with self._lock:
+            if key is not None:
+                sample = self._latest.get(key)
+            else:
+                sample = max(self._latest.values(), key=lambda s: s.ts, default=None)
+        if sample is None or (max_age is not None and sample.age() > max_age):
+            return None
+        return sample
+
+    def snapshots(self):
+        with self._lock:
+            return dict(self._latest)
+
+    def subscribe(self, maxlen=256, keys=None):
+        sub = Subscription(self, maxlen=maxlen, keys=keys)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def add_callback(self, callback):
+        """폴링 스레드에서 바로 호출되는 구독자 (가볍게 처리하고 바로 반환해야 함)"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers) + len(self._callbacks)
+
+    def close(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._callbacks = []
+        for sub in subscribers:
+            sub.close()
+
+
+class SessionBroker:
+    """IP별 DeviceSession 관리. 세션은 폴러가 열고 닫습니다."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def open(self, ip):
+        with self._lock:
+            session = self._sessions.get(ip)
+            if session is None:
+                session = self._sessions[ip] = DeviceSession(ip)
+            return session
+
+    def get(self, ip):
+        """폴링 중인 장비의 세션, 없으면 None"""
+        with self._lock:
+            return self._sessions.get(ip)
+
+    def close(self, ip):
+        with self._lock:
+            session = self._sessions.pop(ip, None)
+        if session is not None:
+            session.close()
+
+    def snapshot(self, ip, key=None, max_age=None):
+        session = self.get(ip)
+        return session.snapshot(key, max_age) if session is not None else None
+
+    def ips(self):
+        with self._lock:
+            return list(self._sessions)
+
+
+broker = SessionBroker()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+장시간(소크) 운용용 메모리/스레드 텔레메트리.
+
+interval초마다 이 프로세스의
+  - RSS / 최대 RSS (/proc/self/status 의 VmRSS, VmHWM)
+  - 스레드 수 (파이썬 스레드 + /proc 기준 OS 스레드)
+  - 열린 파일 디스크립터 수
+를 기록하고, 워밍업 이후의 기준값과 비교해 누수로 보이는 증가를 경고합니다.
+  - RSS가 기준 + rss_slack_mb를 넘거나
+  - 최근 window개 샘플의 RSS 기울기가 max_slope_mb_per_hour를 넘거나
+  - 스레드/FD 수가 기준 + thread_slack / fd_slack을 넘으면
+누수 의심으로 기록하고 violations에 남깁니다. 소크 스크립트에서는 assert_no_leak()로 확인합니다.
+"""
+import collections
+import os
+import threading
+import time
+
+
+def _proc_status():
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "VmHWM", "Threads"):
+                    values[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def _fd_count():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+class SoakSample:
+    __slots__ = ("ts", "rss_kb", "hwm_kb", "py_threads", "os_threads", "fds")
+
+    def __init__(self, ts, rss_kb, hwm_kb, py_threads, os_threads, fds):
+        self.ts = ts
+        self.rss_kb = rss_kb
+        self.hwm_kb = hwm_kb
+        self.py_threads = py_threads
+        self.os_threads = os_threads
+        self.fds = fds
+
+    def csv_row(self):
+        return ",".join(str(v if v is not None else "") for v in (
+            round(self.ts, 1), self.rss_kb, self.hwm_kb, self.py_threads, self.os_threads, self.fds))
+
+    def __repr__(self):
+        return (f"RSS {self.rss_kb / 1024:.1f}MB (최대 {self.hwm_kb / 1024:.1f}MB), "
+                f"스레드 {self.py_threads}/{self.os_threads}, FD {self.fds}")
+
+
+def sample():
+    st = _proc_status()
+    return SoakSample(time.time(), st.get("VmRSS", 0), st.get("VmHWM", 0),
+                      threading.active_count(), st.get("Threads"), _fd_count())
+
+
+def _slope_per_hour(points):
+    """[(초, 값)] 최소제곱 기울기 (값/시간)"""
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mx = sum(t for t, _ in points) / n
+    my = sum(v for _, v in points) / n
+    var = sum((t - mx) ** 2 for t, _ in points)
+    if var == 0:
+        return 0.0
+    return sum((t - mx) * (v - my) for t, v in points) / var * 3600
+
+
+class SoakMonitor:
+    def __init__(self, interval=60.0, warmup=600.0, window=60, rss_slack_mb=32, max_slope_mb_per_hour=2.0,
+                 thread_slack=8, fd_slack=32, csv_path=None, log=print, clock=time.monotonic):
+        self.interval = interval
+        self.warmup = warmup
+        self.rss_slack_kb = rss_slack_mb * 1024
+        self.max_slope_kb = max_slope_mb_per_hour * 1024
+        self.thread_slack = thread_slack
+        self.fd_slack = fd_slack
+        self.csv_path = os.path.expanduser(csv_path) if csv_path else None
+        self.log = log
+        self.clock = clock
+        self.history = collections.deque(maxlen=window)     # (경과 초, 샘플)
+        self.baseline = None
+        self.violations = collections.deque(maxlen=100)
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_config(cls, config, log=print):
+        """
+        설정 파일 형식 예)
+          "SOAK_TELEMETRY": {"interval": 60, "warmup": 600, "rss_slack_mb": 32, "csv": "~/gds_soak.csv"}
+        """
+        keys = ("interval", "warmup", "window", "rss_slack_mb", "max_slope_mb_per_hour",
+                "thread_slack", "fd_slack")
+        kwargs = {k: config[k] for k in keys if k in config}
+        return cls(csv_path=config.get("csv"), log=log, **kwargs)
+
+    def check(self, s, elapsed):
+        """샘플 하나를 기록하고, 새로 발견한 누수 의심 항목 목록을 반환합니다."""
+        self.history.append((elapsed, s))
+        if self.baseline is None:
+            if elapsed >= self.warmup:
+                self.baseline = s
+            return []
+        problems = []
+        b = self.baseline
+        if s.rss_kb > b.rss_kb + self.rss_slack_kb:
+            problems.append(f"RSS {b.rss_kb // 1024}MB -> {s.rss_kb // 1024}MB")
+        # 기울기는 워밍업 이후 샘플로 창이 꽉 찼을 때만 판단 (GC/캐시로 인한 일시적 증가 무시)
+        if len(self.history) == self.history.maxlen and self.history[0][0] >= self.warmup:
+            slope = _slope_per_hour([(t, x.rss_kb) for t, x in self.history])
+            if slope > self.max_slope_kb:
+                problems.append(f"RSS 증가 추세 {slope / 1024:.1f}MB/h")
+        if s.py_threads > b.py_threads + self.thread_slack:
+            problems.append(f"스레드 {b.py_threads} -> {s.py_threads}")
+        if s.fds is not None and b.fds is not None and s.fds > b.fds + self.fd_slack:
+            problems.append(f"FD {b.fds} -> {s.fds}")
+        for p in problems:
+            self.violations.append((s.ts, p))
+        return problems
+
+    def _write_csv(self, s):
+        if not self.csv_path:
+            return
+        try:
+            new = not os.path.exists(self.csv_path)
+            with open(self.csv_path, "a") as f:
+                if new:
+                    f.write("time,rss_kb,hwm_kb,py_threads,os_threads,fds\n")
+                f.write(s.csv_row() + "\n")
+        except OSError as e:
+            self.log(f"[텔레메트리] CSV 기록 실패: {e}")
+            self.csv_path = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            s = sample()
+            problems = self.check(s, self.clock() - self._started)
+            self._write_csv(s)
+            if problems:
+                self.log(f"[텔레메트리] 누수 의심: {', '.join(problems)} ({s})")
+            else:
+                self.log(f"[텔레메트리] {s}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._started = self.clock()
+        self._thread = threading.Thread(target=self._loop, name="soak-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def assert_no_leak(self):
+        if self.violations:
+            raise AssertionError("누수 의심: " + "; ".join(p for _, p in self.violations))
+
+
+if __name__ == "__main__":
+    print(sample())
@@ -0,0 +1,49 @@
+import glob
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fw_library
+
+PROGRAM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Program")
+
+# 색인 분석은 이미지당 수 ms여야 수천 개를 몇 초 안에 스캔할 수 있음 (바이트 단위 파이썬 반복은 수십 ms)
+ANALYZE_BUDGET_SECONDS = 0.015
+
+
+class FingerprintTest(unittest.TestCase):
+    def setUp(self):
+        self.images = sorted(glob.glob(os.path.join(PROGRAM, "*.bin")))
+        if not self.images:
+            self.skipTest("Program/*.bin 없음")
+
+    def test_analyze_stays_cheap(self):
+        fw_library.analyze(self.images[0])     # 첫 호출의 임포트/캐시 비용 제외
+        rounds = 5
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for path in self.images:
+                fw_library.analyze(path)
+        per_image = (time.perf_counter() - started) / (rounds * len(self.images))
+        self.assertLess(per_image, ANALYZE_BUDGET_SECONDS)
+
+    def test_shifted_content_still_matches(self):
+        # 앞부분이 바뀌어 뒤쪽 내용이 밀린 버전 사이에도 공유 조각이 보여야 함 (고정 위치 블록은 0%)
+        fps = {os.path.basename(p): fw_library.analyze(p)["fingerprint"] for p in self.images}
+        if "ASGD3000E_V362_H.bin" not in fps or "ASGD3000E_V364_H.bin" not in fps:
+            self.skipTest("V362_H / V364_H 이미지 없음")
+        self.assertGreater(fw_library.similarity(fps["ASGD3000E_V362_H.bin"], fps["ASGD3000E_V364_H.bin"]), 0.05)
+
+    def test_shift_by_one_byte(self):
+        with open(self.images[-1], "rb") as f:
+            body = f.read()
+        a = fw_library._fingerprint(body)
+        b = fw_library._fingerprint(b"\x5a" + body)
+        self.assertGreater(fw_library.similarity(a, b), 0.9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modbus_tcp
+
+
+class RetryTest(unittest.TestCase):
+    """응답하지 않는 장비에 보낸 요청 프레임 수로 재시도 여부를 확인"""
+
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.22", 0))
+        self.listener.listen(4)
+        self.received = bytearray()
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        self.conn = modbus_tcp.ModbusTcpConnection("127.0.0.22", self.listener.getsockname()[1],
+                                                   timeout=0.05, retries=3)
+        self.assertTrue(self.conn.connect())
+
+    def accept_loop(self):
+        try:
+            sock = self.listener.accept()[0]
+        except OSError:
+            return
+        with sock:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    return
+                self.received += data
+
+    def tearDown(self):
+        self.conn.close()
+        self.listener.close()
+
+    def frames(self, length):
+        time.sleep(0.05)
+        return len(self.received) // length
+
+    def test_write_is_sent_once(self):
+        with self.assertRaises(TimeoutError):
+            self.conn.write_register(87, 1)
+        self.assertEqual(self.frames(12), 1)
+
+    def test_write_multiple_is_sent_once(self):
+        with self.assertRaises(TimeoutError):
+            self.conn.write_registers(87, [1, 2, 3])
+        self.assertEqual(self.frames(19), 1)
+
+    def test_read_retries_per_request(self):
+        with self.assertRaises(TimeoutError):
+            self.conn.read_holding_registers(0, 10, retries=1)
+        self.assertEqual(self.frames(12), 2)
+        self.assertEqual(self.conn.retries, 3)
+
+
+class SharedConnectionTest(unittest.TestCase):
+    def test_acquire_keeps_shared_retries(self):
+        conn = modbus_tcp.acquire("127.0.0.23", 1502)
+        try:
+            conn.retries = 2
+            other = modbus_tcp.acquire("127.0.0.23", 1502, pipeline_depth=4)
+            self.assertIs(other, conn)
+            modbus_tcp.release(other)
+            self.assertEqual(conn.retries, 2)
+        finally:
+            modbus_tcp.release(conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
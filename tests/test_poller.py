@@ -0,0 +1,120 @@
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import modbus_tcp
+import serve
+from change_filter import ChangeFilter
+from e2e_harness import FakeDevice
+from poll_scheduler import PollScheduler
+from register_block import RegisterBlock
+
+
+class PipelinedPollerTest(unittest.TestCase):
+    def setUp(self):
+        self.device = FakeDevice("127.0.0.20", 364, {}, tftp_port=0).start()
+
+    def tearDown(self):
+        self.device.stop()
+
+    def run_poller(self, **kw):
+        samples = []
+        enough = threading.Event()
+
+        def on_sample(key, text, status):
+            samples.append((key, text, status))
+            if len(samples) >= 3:
+                enough.set()
+
+        scheduler = PollScheduler(base_interval=0.01)
+        poller = serve.ModbusPoller(self.device.ip, on_sample, scheduler=scheduler,
+                                    port=self.device.port, **kw)
+        poller.start()
+        try:
+            self.assertTrue(enough.wait(5), f"폴링 샘플 부족: {samples}")
+            self.assertTrue(poller.thread.is_alive())
+        finally:
+            poller.stop()
+        return samples
+
+    def test_pipelined_with_scheduler(self):
+        samples = self.run_poller(pipeline_depth=4)
+        self.assertTrue(all(status == "정상" and text for _, text, status in samples))
+
+    def test_multi_unit_with_scheduler(self):
+        samples = self.run_poller(unit_ids=[1, 2])
+        keys = {key for key, _, _ in samples}
+        self.assertLessEqual({f"{self.device.ip}@1", f"{self.device.ip}@2"}, keys)
+
+    def test_bulk_skips_to_list_for_unchanged_bytes(self):
+        self.device._tick = lambda: None       # 측정값 고정
+        calls = []
+        to_list = RegisterBlock.to_list
+        RegisterBlock.to_list = lambda block: calls.append(block) or to_list(block)
+        try:
+            samples = self.run_poller(unit_ids=[1, 2], bulk=True)
+        finally:
+            RegisterBlock.to_list = to_list
+        self.assertTrue(all(status == "정상" and text for _, text, status in samples))
+        # 장비 값이 그대로이므로 Unit마다 첫 응답에서만 목록을 만듦
+        self.assertEqual(len(calls), 2)
+
+
+class SilentDeviceTest(unittest.TestCase):
+    """연결은 받지만 응답하지 않는 장비: 모든 읽기가 시간 초과"""
+
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.21", 0))
+        self.listener.listen(4)
+        self.conns = []
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        self.saved_log = serve.async_log_print
+        self.logs = []
+        serve.async_log_print = self.logs.append
+
+    def accept_loop(self):
+        while True:
+            try:
+                self.conns.append(self.listener.accept()[0])
+            except OSError:
+                return
+
+    def tearDown(self):
+        serve.async_log_print = self.saved_log
+        self.listener.close()
+        for conn in self.conns:
+            conn.close()
+
+    def test_timeouts_only_pass_first_sample_and_heartbeats(self):
+        heartbeat = 0.5
+        samples = []
+        sample_filter = ChangeFilter(heartbeat=heartbeat)
+        scheduler = PollScheduler(base_interval=0.01, min_timeout=0.01, max_timeout=0.01, max_rps=0,
+                                  breaker_threshold=1000)
+        poller = serve.ModbusPoller("127.0.0.21", lambda *sample: samples.append(sample), scheduler=scheduler,
+                                    sample_filter=sample_filter, port=self.listener.getsockname()[1],
+                                    pipeline_depth=4)
+        poller.set_timeout(0.01)
+        started = time.monotonic()
+        poller.start()
+        try:
+            deadline = started + 10
+            while sample_filter.offered < 20 and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            poller.stop()
+        elapsed = time.monotonic() - started
+        self.assertGreaterEqual(sample_filter.offered, 20)
+        self.assertEqual({status for _, _, status in samples}, {"예외: timeout"})
+        self.assertLessEqual(len(samples), 2 + int(elapsed / heartbeat))
+        self.assertEqual(len(self.logs), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serve
+from rollout_planner import MaintenanceWindow, RolloutStats
+
+D = datetime.datetime
+
+
+class MaintenanceWindowTest(unittest.TestCase):
+    def test_in_window_across_midnight(self):
+        window = MaintenanceWindow("23:00", "02:00")
+        self.assertTrue(window.in_window(D(2026, 1, 1, 23, 30)))
+        self.assertTrue(window.in_window(D(2026, 1, 2, 1, 59)))
+        self.assertFalse(window.in_window(D(2026, 1, 2, 2, 0)))
+        self.assertFalse(window.in_window(D(2026, 1, 2, 12, 0)))
+
+
+class RolloutWindowTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (serve.JOURNAL_FILE, serve.upgrade_journal, serve.rollout_stats, serve.load_config,
+                      serve.upgrade_task, serve.async_log_print, MaintenanceWindow.in_window)
+        self.tmp = tempfile.TemporaryDirectory()
+        serve.JOURNAL_FILE = os.path.join(self.tmp.name, "journal.log")
+        serve.upgrade_journal = None
+        serve.rollout_stats = RolloutStats(os.path.join(self.tmp.name, "stats.json"))
+        now = D.now()
+        config = {"UPGRADE_WORKERS": 1,
+                  "MAINTENANCE_WINDOW": {"start": (now - datetime.timedelta(hours=1)).strftime("%H:%M"),
+                                         "end": (now + datetime.timedelta(hours=1)).strftime("%H:%M")}}
+        serve.load_config = lambda: config
+        serve.async_log_print = lambda msg: None
+
+    def tearDown(self):
+        serve.get_journal().close()
+        (serve.JOURNAL_FILE, serve.upgrade_journal, serve.rollout_stats, serve.load_config,
+         serve.upgrade_task, serve.async_log_print, MaintenanceWindow.in_window) = self.saved
+        self.tmp.cleanup()
+
+    def test_stops_launching_when_window_closes(self):
+        started = []
+        checks = []
+        serve.upgrade_task = lambda ip, *args: started.append(ip)
+        # 두 대를 시작한 뒤 시간대가 끝난 것으로 봄
+        MaintenanceWindow.in_window = lambda self, now=None: checks.append(now) or len(checks) <= 2
+        devices = [f"10.0.0.{i}" for i in range(1, 5)]
+        serve.run_rollout(devices, "10.0.0.100", "/nonexistent/ASGD3000E_V364_H.bin")
+        self.assertEqual(started, devices[:2])
+        self.assertEqual(serve.get_journal().unfinished()[0][1], devices)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serve
+
+
+class AutoTftpIpTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (serve.JOURNAL_FILE, serve.upgrade_journal, serve.load_config,
+                      serve.copy_to_tftp, serve.async_log_print)
+        self.tmp = tempfile.TemporaryDirectory()
+        serve.JOURNAL_FILE = os.path.join(self.tmp.name, "journal.log")
+        serve.upgrade_journal = None
+        serve.load_config = lambda: {}
+        self.copied = []
+        serve.copy_to_tftp = lambda *args, **kw: self.copied.append(args)
+        self.logs = []
+        serve.async_log_print = self.logs.append
+
+    def tearDown(self):
+        serve.get_journal().close()
+        (serve.JOURNAL_FILE, serve.upgrade_journal, serve.load_config,
+         serve.copy_to_tftp, serve.async_log_print) = self.saved
+        self.tmp.cleanup()
+
+    def test_hostname_with_auto_records_failed(self):
+        device = "gds-01.local"
+        serve.get_journal().begin("r1", [device])
+        self.assertIsNone(serve.upgrade_task(device, "auto", "/nonexistent/ASGD3000E_V364_H.bin", rollout="r1"))
+        phase, _, detail = serve.get_journal().rollouts["r1"].phases[device]
+        self.assertEqual((phase, detail), ("failed", "tftp-ip"))
+        self.assertEqual(self.copied, [])
+        self.assertTrue(any("자동 선택 불가" in msg for msg in self.logs))
+
+
+if __name__ == "__main__":
+    unittest.main()
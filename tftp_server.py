@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+전송 통계를 남기는 읽기 전용 TFTP 서버 (RFC 1350 + 옵션 협상 RFC 2347/2348/2349).
+
+tftpd-hpa로는 장비가 이미지를 얼마나 빨리 받아 갔는지, 재전송이 있었는지 알 수 없으므로
+설정 "TFTP_SERVER": "builtin" 이면 tftpd-hpa 대신 이 서버로 TFTP 루트를 제공합니다.
+전송마다 TransferStats를 남깁니다.
+  - 클라이언트 IP/포트, 파일, 크기, 협상된 blksize/timeout
+  - 보낸 블록 수, 보낸 바이트(재전송 포함), 재전송/타임아웃/중복 ACK 횟수
+  - 소요 시간, 유효 전송 속도(파일 크기 / 소요 시간), 초당 블록 수
+장비 IP별 최근 기록을 보관하므로 업그레이드 결과와 같은 IP로 맞춰 볼 수 있습니다.
+
+쓰기 요청(WRQ)은 거부합니다. 전송마다 스레드와 소켓(TID) 하나를 사용합니다.
+
+사용 예)
+  python3 tftp_server.py /srv/tftp                   (포트 69는 root 권한 필요)
+  python3 tftp_server.py /tmp/tftp --port 6969 --max-blksize 1428
+"""
+import argparse
+import collections
+import os
+import socket
+import struct
+import threading
+import time
+
+OP_RRQ, OP_WRQ, OP_DATA, OP_ACK, OP_ERROR, OP_OACK = 1, 2, 3, 4, 5, 6
+
+ERR_UNDEFINED, ERR_NOT_FOUND, ERR_ACCESS, ERR_ILLEGAL_OP, ERR_UNKNOWN_TID, ERR_OPTION = 0, 1, 2, 4, 5, 8
+
+DEFAULT_BLKSIZE = 512
+MAX_BLKSIZE = 1468          # 이더넷 MTU 1500 - IP/UDP/TFTP 헤더 (조각화 없이 보낼 수 있는 최대)
+
+_HEADER = struct.Struct('>HH')     # opcode, 블록 번호(또는 오류 코드)
+
+
+class TransferStats:
+    """TFTP 전송 하나의 기록"""
+
+    def __init__(self, client, filename, clock=time.monotonic):
+        self.client = client            # (ip, port)
+        self.filename = filename
+        self.clock = clock
+        self.size = 0
+        self.blksize = DEFAULT_BLKSIZE
+        self.timeout = None
+        self.options = {}               # 협상된 옵션
+        self.blocks = 0                 # 확인(ACK)된 블록 수
+        self.bytes_sent = 0             # 재전송 포함 실제로 보낸 데이터 바이트
+        self.retransmits = 0
+        self.timeouts = 0
+        self.dup_acks = 0
+        self.error = None
+        self.started = clock()
+        self.started_at = time.time()
+        self.finished = None
+
+    @property
+    def ip(self):
+        return self.client[0]
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    @property
+    def ok(self):
+        return self.done and self.error is None
+
+    @property
+    def elapsed(self):
+        return (self.finished if self.done else self.clock()) - self.started
+
+    @property
+    def throughput(self):
+        """유효 전송 속도 (바이트/초, 재전송 제외)"""
+        elapsed = self.elapsed
+        delivered = self.size if self.ok else min(self.size, self.blocks * self.blksize)
+        return delivered / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def block_rate(self):
+        elapsed = self.elapsed
+        return self.blocks / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def retransmit_ratio(self):
+        sent = self.blocks + self.retransmits
+        return self.retransmits / sent if sent else 0.0
+
+    def to_dict(self):
+        return {
+            "ip": self.ip, "port": self.client[1], "file": self.filename, "size": self.size,
+            "blksize": self.blksize, "timeout": self.timeout, "blocks": self.blocks,
+            "bytes_sent": self.bytes_sent, "retransmits": self.retransmits, "timeouts": self.timeouts,
+            "dup_acks": self.dup_acks, "elapsed": round(self.elapsed, 3),
+            "throughput": round(self.throughput), "block_rate": round(self.block_rate, 1),
+            "started_at": self.started_at, "ok": self.ok, "error": self.error,
+        }
+
+    def summary(self):
+        state = "완료" if self.ok else (f"실패({self.error})" if self.done else "진행 중")
+        return (f"{self.ip} {self.filename} {state}: {self.size / 1024:.0f}KB {self.elapsed:.1f}초 "
+                f"{self.throughput / 1024:.0f}KB/s, 블록 {self.blocks}개 ({self.block_rate:.0f}/s, "
+                f"blksize {self.blksize}), 재전송 {self.retransmits}, 타임아웃 {self.timeouts}")
+
+    def __repr__(self):
+        return f"TransferStats({self.summary()})"
+
+
+class TransferError(Exception):
+    pass
+
+
+def _error_packet(code, message):
+    return _HEADER.pack(OP_ERROR, code) + message.encode("ascii", "replace") + b"\0"
+
+
+def parse_request(packet):
+    """RRQ/WRQ -> (opcode, 파일명, 모드, {옵션: 값}), 형식이 잘못되었으면 ValueError"""
+    if len(packet) < 4:
+        raise ValueError("Packet too short")
+    opcode = _HEADER.unpack_from(packet)[0]
+    fields = bytes(packet[2:]).split(b"\0")
+    if len(fields) < 3 or fields[-1] != b"":
+        raise ValueError("Malformed request")
+    fields = [f.decode("ascii", "replace") for f in fields[:-1]]
+    filename, mode = fields[0], fields[1].lower()
+    options = {}
+    for i in range(2, len(fields) - 1, 2):
+        options[fields[i].lower()] = fields[i + 1]
+    return opcode, filename, mode, options
+
+
+class TftpServer:
+    """
+    server = TftpServer("/srv/tftp", port=69, on_transfer=lambda st: print(st.summary())).start()
+    ...
+    st = server.wait_for("192.168.0.15", since=t0, timeout=30)
+    server.stop()
+    """
+
+    def __init__(self, root, host="", port=69, timeout=1.0, retries=5, max_blksize=MAX_BLKSIZE,
+                 history=32, on_transfer=None, clock=time.monotonic):
+        self.root = os.path.realpath(root)
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.max_blksize = max_blksize
+        self.on_transfer = on_transfer or (lambda stats: None)
+        self.clock = clock
+        self._history = collections.defaultdict(lambda: collections.deque(maxlen=history))
+        self._active = set()
+        self._cond = threading.Condition()
+        self._sock = None
+        self._thread = None
+        self._running = threading.Event()
+
+    @property
+    def address(self):
+        return self._sock.getsockname() if self._sock else (self.host, self.port)
+
+    # --------------------- 실행/중지 --------------------- #
+    def start(self):
+        """소켓을 열고 수신 스레드 시작 (포트를 열 수 없으면 OSError)"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((self.host, self.port))
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(0.5)
+        self._sock = sock
+        self._running.set()
+        self._thread = threading.Thread(target=self._serve, name="tftp-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _serve(self):
+        while self._running.is_set():
+            try:
+                packet, client = self._sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(packet, client), daemon=True).start()
+
+    # --------------------- 기록 조회 --------------------- #
+    def active(self):
+        with self._cond:
+            return list(self._active)
+
+    def transfers(self, ip=None, since=None):
+        """끝난 전송 기록 (오래된 순). since: clock() 기준 시작 시각 하한"""
+        with self._cond:
+            if ip is None:
+                items = [st for dq in self._history.values() for st in dq]
+                items.sort(key=lambda st: st.started)
+            else:
+                items = list(self._history.get(ip, ()))
+        if since is not None:
+            items = [st for st in items if st.started >= since]
+        return items
+
+    def last_transfer(self, ip, since=None):
+        items = self.transfers(ip, since)
+        return items[-1] if items else None
+
+    def wait_for(self, ip, since=None, timeout=None):
+        """ip의 (since 이후 시작한) 전송이 끝날 때까지 대기, 시간 초과 시 진행 중인 전송 또는 None"""
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._cond:
+            while True:
+                st = self.last_transfer(ip, since)
+                if st is not None:
+                    return st
+                remaining = None if deadline is None else deadline - self.clock()
+                if remaining is not None and remaining <= 0:
+                    running = [s for s in self._active if s.ip == ip and (since is None or s.started >= since)]
+                    return running[-1] if running else None
+                self._cond.wait(remaining)
+
+    # --------------------- 전송 처리 --------------------- #
+    def _resolve(self, filename):
+        path = os.path.realpath(os.path.join(self.root, filename.lstrip("/")))
+        if os.path.commonpath([self.root, path]) != self.root:
+            raise TransferError(ERR_ACCESS, "Access violation")
+        if not os.path.isfile(path):
+            raise TransferError(ERR_NOT_FOUND, "File not found")
+        return path
+
+    def _negotiate(self, options, size, stats):
+        """요청 옵션 중 받아들인 것 (OACK로 보냄)"""
+        accepted = {}
+        if "blksize" in options:
+            try:
+                blksize = int(options["blksize"])
+            except ValueError:
+                blksize = 0
+            if blksize >= 8:
+                stats.blksize = min(blksize, self.max_blksize)
+                accepted["blksize"] = str(stats.blksize)
+        if "timeout" in options:
+            try:
+                timeout = int(options["timeout"])
+            except ValueError:
+                timeout = 0
+            if 1 <= timeout <= 255:
+                stats.timeout = timeout
+                accepted["timeout"] = str(timeout)
+        if "tsize" in options:
+            accepted["tsize"] = str(size)
+        stats.options = accepted
+        return accepted
+
+    def _handle(self, packet, client):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)    # 전송마다 새 포트(TID)
+        stats = None
+        try:
+            sock.bind((self.host, 0))
+            try:
+                opcode, filename, mode, options = parse_request(packet)
+            except ValueError:
+                sock.sendto(_error_packet(ERR_ILLEGAL_OP, "Illegal TFTP operation"), client)
+                return
+            if opcode != OP_RRQ:
+                msg = "Write not allowed" if opcode == OP_WRQ else "Illegal TFTP operation"
+                sock.sendto(_error_packet(ERR_ACCESS if opcode == OP_WRQ else ERR_ILLEGAL_OP, msg), client)
+                return
+            stats = TransferStats(client, filename, self.clock)
+            with self._cond:
+                self._active.add(stats)
+            try:
+                if mode not in ("octet", "netascii"):
+                    raise TransferError(ERR_ILLEGAL_OP, f"Unsupported mode {mode}")
+                path = self._resolve(filename)
+                with open(path, "rb") as f:
+                    data = f.read()
+                stats.size = len(data)
+                self._send_file(sock, client, data, self._negotiate(options, len(data), stats), stats)
+            except TransferError as e:
+                code, message = e.args
+                stats.error = message
+                if code is not None:
+                    sock.sendto(_error_packet(code, message), client)
+            except OSError as e:
+                stats.error = str(e)
+                sock.sendto(_error_packet(ERR_UNDEFINED, "Read error"), client)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+            if stats is not None:
+                self._finish(stats)
+
+    def _finish(self, stats):
+        stats.finished = self.clock()
+        with self._cond:
+            self._active.discard(stats)
+            self._history[stats.ip].append(stats)
+            self._cond.notify_all()
+        try:
+            self.on_transfer(stats)
+        except Exception:
+            pass
+
+    def _exchange(self, sock, client, packet, expect_block, stats, payload_len=0):
+        """packet을 보내고 expect_block에 대한 ACK를 기다림 (타임아웃마다 재전송)"""
+        sock.settimeout(stats.timeout or self.timeout)
+        attempts = 0
+        sock.sendto(packet, client)
+        while True:
+            try:
+                reply, addr = sock.recvfrom(512)
+            except socket.timeout:
+                stats.timeouts += 1
+                attempts += 1
+                if attempts > self.retries:
+                    raise TransferError(None, "timeout")
+                stats.retransmits += 1
+                stats.bytes_sent += payload_len
+                sock.sendto(packet, client)
+                continue
+            if addr != client:
+                sock.sendto(_error_packet(ERR_UNKNOWN_TID, "Unknown transfer ID"), addr)
+                continue
+            if len(reply) < 4:
+                continue
+            opcode, block = _HEADER.unpack_from(reply)
+            if opcode == OP_ERROR:
+                message = bytes(reply[4:]).split(b"\0", 1)[0].decode("ascii", "replace")
+                raise TransferError(None, f"client error {block}: {message}")
+            if opcode != OP_ACK:
+                raise TransferError(ERR_ILLEGAL_OP, "Illegal TFTP operation")
+            if block == expect_block:
+                return
+            # 이전 블록의 중복 ACK는 무시 (다시 보내면 Sorcerer's Apprentice 증상)
+            stats.dup_acks += 1
+
+    def _send_file(self, sock, client, data, accepted, stats):
+        if accepted:
+            oack = struct.pack('>H', OP_OACK) + b"".join(
+                k.encode() + b"\0" + v.encode() + b"\0" for k, v in accepted.items())
+            self._exchange(sock, client, oack, 0, stats)
+        blksize = stats.blksize
+        view = memoryview(data)
+        packet = bytearray(4 + blksize)     # 블록마다 재사용
+        packet_view = memoryview(packet)
+        block = 0
+        offset = 0
+        while True:
+            block += 1
+            chunk = view[offset:offset + blksize]
+            n = len(chunk)
+            _HEADER.pack_into(packet, 0, OP_DATA, block & 0xFFFF)   # 블록 번호는 65535 다음 0
+            packet_view[4:4 + n] = chunk
+            stats.bytes_sent += n
+            self._exchange(sock, client, packet_view[:4 + n], block & 0xFFFF, stats, n)
+            stats.blocks = block
+            offset += n
+            if n < blksize:     # 마지막 블록 (크기가 blksize 배수면 0바이트 블록으로 끝냄)
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="전송 통계를 남기는 읽기 전용 TFTP 서버")
+    parser.add_argument("root", help="TFTP 루트 디렉토리")
+    parser.add_argument("--host", default="")
+    parser.add_argument("--port", type=int, default=69)
+    parser.add_argument("--timeout", type=float, default=1.0, help="재전송 대기 시간 (초)")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--max-blksize", type=int, default=MAX_BLKSIZE)
+    args = parser.parse_args()
+    server = TftpServer(args.root, args.host, args.port, args.timeout, args.retries, args.max_blksize,
+                        on_transfer=lambda st: print(f"[TFTP] {st.summary()}", flush=True))
+    server.start()
+    print(f"TFTP 서버 시작: {server.address[0] or '*'}:{server.address[1]} -> {server.root}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
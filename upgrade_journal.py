@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+업그레이드 저널 (추가 전용, fsync 묶음 처리).
+
+롤아웃 도중 프로그램이 종료되어도 어떤 장비가 어디까지 진행했는지 남겨서,
+다시 실행했을 때 끝나지 않은 장비만 이어서 업그레이드할 수 있게 합니다.
+
+한 줄 = 한 번의 단계 전환 (탭 구분 텍스트, 수천 대도 빠르게 재생 가능):
+    시각  롤아웃ID  장비IP  단계  상세
+롤아웃 시작/종료는 장비 자리에 "*"를 쓰고 단계 begin/end로 기록합니다.
+
+쓰기는 OS 버퍼까지만 바로 하고, fsync는 flush_interval마다 백그라운드에서 한 번에 처리합니다.
+(반드시 디스크에 남아야 하는 시점에는 sync()를 호출)
+"""
+import atexit
+import hashlib
+import os
+import threading
+import time
+
+PHASES = ("staged", "mode-changed", "transfer", "verify", "done", "failed")
+TERMINAL = ("done", "failed")
+
+
+def rollout_id(image_names, devices):
+    """같은 이미지 묶음 + 같은 장비 목록이면 같은 롤아웃으로 봅니다."""
+    key = "|".join(sorted(image_names)) + "#" + ",".join(sorted(devices))
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
+
+
+class Rollout:
+    __slots__ = ("rid", "devices", "known", "ended", "phases")
+
+    def __init__(self, rid, devices):
+        self.rid = rid
+        self.devices = devices
+        self.known = set(devices)
+        self.ended = False
+        self.phases = {}        # key: 장비 IP, value: (단계, 시각, 상세)
+
+    def outstanding(self):
+        """아직 done이 아닌 장비 (실패한 장비 포함)"""
+        return [d for d in self.devices if self.phases.get(d, ("",))[0] != "done"]
+
+
+class UpgradeJournal:
+    def __init__(self, path, flush_interval=0.5, compact_ratio=4):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+        self.rollouts = {}
+        self._lines = self._replay()
+        # 마지막 상태에 비해 기록이 너무 많아지면 시작할 때 한 번 압축
+        if self._needs_compaction():
+            self._compact()
+        self._f = open(self.path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # --------------------- 재생 / 압축 --------------------- #
+    def _apply(self, ts, rid, device, phase, detail):
+        if device == "*":
+            if phase == "begin":
+                self.rollouts[rid] = Rollout(rid, [d for d in detail.split(",") if d])
+            elif phase == "end" and rid in self.rollouts:
+                self.rollouts[rid].ended = True
+            return
+        r = self.rollouts.get(rid)
+        if r is None:
+            r = self.rollouts[rid] = Rollout(rid, [])
+        if device not in r.known:
+            r.known.add(device)
+            r.devices.append(device)
+        r.phases[device] = (phase, ts, detail)
+
+    def _replay(self):
+        count = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 5:
+                        continue        # 비정상 종료로 잘린 마지막 줄
+                    try:
+                        ts = float(parts[0])
+                    except ValueError:
+                        continue
+                    self._apply(ts, *parts[1:])
+                    count += 1
+        except FileNotFoundError:
+            pass
+        return count
+
+    @staticmethod
+    def _format(ts, rid, device, phase, detail):
+        detail = str(detail).replace("\t", " ").replace("\n", " ")
+        return f"{ts:.3f}\t{rid}\t{device}\t{phase}\t{detail}\n"
+
+    def _needs_compaction(self):
+        live = sum(1 + len(r.phases) for r in self.rollouts.values())
+        return self._lines > max(1000, self.compact_ratio * live)
+
+    def _compact(self):
+        # 끝난 롤아웃은 버리고, 진행 중인 롤아웃은 시작 기록 + 장비별 마지막 단계만 남김
+        tmp = self.path + ".tmp"
+        lines = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for r in list(self.rollouts.values()):
+                if r.ended:
+                    del self.rollouts[r.rid]
+                    continue
+                f.write(self._format(time.time(), r.rid, "*", "begin", ",".join(r.devices)))
+                for device, (phase, ts, detail) in r.phases.items():
+                    f.write(self._format(ts, r.rid, device, phase, detail))
+                lines += 1 + len(r.phases)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._lines = lines
+
+    def maybe_compact(self):
+        """
+        실행 중 압축 (자동 모드처럼 며칠씩 도는 경우 파일과 메모리가 계속 늘지 않도록).
+        압축했으면 True
+        """
+        with self._lock:
+            if self._closed or not self._needs_compaction():
+                return False
+            self._f.flush()
+            self._f.close()
+            self._compact()
+            self._f = open(self.path, "a", encoding="utf-8")
+            return True
+
+    # --------------------- 기록 --------------------- #
+    def _write(self, rid, device, phase, detail=""):
+        ts = time.time()
+        with self._lock:
+            if self._closed:
+                return
+            self._apply(ts, rid, device, phase, str(detail))
+            self._f.write(self._format(ts, rid, device, phase, detail))
+            self._lines += 1
+            self._f.flush()     # OS 버퍼까지 (프로세스가 죽어도 남음), 디스크 반영은 묶어서
+        self._dirty.set()
+
+    def begin(self, rid, devices):
+        self._write(rid, "*", "begin", ",".join(devices))
+
+    def end(self, rid):
+        self._write(rid, "*", "end")
+
+    def record(self, rid, device, phase, detail=""):
+        if phase not in PHASES:
+            raise ValueError(f"Unknown upgrade phase: {phase}")
+        self._write(rid, device, phase, detail)
+
+    def sync(self):
+        with self._lock:
+            if not self._closed:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)     # 그 사이 들어온 기록을 한 번의 fsync로 묶음
+            self._dirty.clear()
+            try:
+                self.sync()
+            except (OSError, ValueError):
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._closed = True
+            self._f.close()
+        self._dirty.set()
+
+    # --------------------- 조회 --------------------- #
+    def resume_plan(self, rid, devices):
+        """
+        같은 롤아웃이 끝나지 않은 채 남아 있으면 남은 장비만, 아니면 전체 장비를 반환합니다.
+        반환: (대상 장비 목록, 이어서 하는 것인지)
+        """
+        with self._lock:
+            r = self.rollouts.get(rid)
+            if r is None or r.ended:
+                return list(devices), False
+            done = {d for d, (phase, _, _) in r.phases.items() if phase == "done"}
+        return [d for d in devices if d not in done], True
+
+    def unfinished(self):
+        """끝나지 않은 롤아웃: [(롤아웃ID, 남은 장비 목록), ...]"""
+        with self._lock:
+            return [(r.rid, r.outstanding()) for r in self.rollouts.values()
+                    if not r.ended and r.outstanding()]
+
+    def is_complete(self, rid):
+        with self._lock:
+            r = self.rollouts.get(rid)
+            return r is not None and not r.outstanding()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+업그레이드 후 검증.
+
+GDSClientLinux가 0을 반환했다는 것만으로는 장비가 원하는 펌웨어로 재부팅했는지 알 수 없습니다.
+여기서는 장비마다
+  1) 재부팅으로 Modbus 포트가 닫히는 것을 잠시 기다리고 (보이지 않으면 그냥 진행)
+  2) 다시 열릴 때까지 TCP 연결 시도를 지수 백오프로 반복한 뒤
+  3) 40022(펌웨어 버전) / 40023(업그레이드 상태)을 읽어, 다운로드/기록 중이면 끝날 때까지 기다린 뒤
+  4) 이미지 파일명(_V364 등)의 버전과 비교하고, 재부팅을 거쳐 끝났는데도 다르면 rollback()을 보냅니다.
+검증은 별도 스레드 풀에서 돌기 때문에 업그레이드 스레드는 바로 다음 장비로 넘어갈 수 있습니다.
+"""
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fw_image import version_from_filename
+from main1 import GDSClient
+
+# 40023(업그레이드 상태): 0 대기, 1 다운로드 중, 2 다운로드 완료(기록 후 재부팅 예정), 3 롤백됨,
+# 0x10 이상은 오류 (0x10 TFTP 실패, 0x20 이미지 검사 실패)
+STATUS_IDLE = 0
+STATUS_DOWNLOADING = 1
+STATUS_DOWNLOADED = 2
+STATUS_ROLLED_BACK = 3
+STATUS_ERROR = 0x10
+BUSY_STATUSES = (STATUS_DOWNLOADING, STATUS_DOWNLOADED)
+
+
+class VerifyResult:
+    def __init__(self, ip, ok, expected=None, actual=None, status=None, rolled_back=False,
+                 message="", elapsed=0.0):
+        self.ip = ip
+        self.ok = ok
+        self.expected = expected
+        self.actual = actual
+        self.status = status
+        self.rolled_back = rolled_back
+        self.message = message
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (f"VerifyResult({self.ip}, ok={self.ok}, expected={self.expected}, "
+                f"actual={self.actual}, rolled_back={self.rolled_back}, {self.message!r})")
+
+
+def version_matches(actual, expected):
+    """장비가 버전을 10진(364) 또는 BCD(0x0364)로 보고하는 경우를 모두 허용"""
+    if expected is None or actual is None:
+        return False
+    return actual == expected or actual == int(str(expected), 16)
+
+
+def probe(ip, port=502, timeout=1.0):
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_down(ip, port=502, limit=15.0, interval=0.5, should_stop=None):
+    """재부팅으로 포트가 닫히면 True, limit초 안에 닫히지 않으면 False"""
+    deadline = time.monotonic() + limit
+    while time.monotonic() < deadline:
+        if should_stop and should_stop():
+            return False
+        if not probe(ip, port, timeout=interval):
+            return True
+        time.sleep(interval)
+    return False
+
+
+def wait_for_up(ip, port=502, limit=180.0, initial=1.0, max_delay=10.0, should_stop=None):
+    """포트가 다시 열릴 때까지 지수 백오프로 연결 시도. 열리면 True"""
+    deadline = time.monotonic() + limit
+    delay = initial
+    while time.monotonic() < deadline:
+        if should_stop and should_stop():
+            return False
+        if probe(ip, port, timeout=min(delay, 3.0)):
+            return True
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(max_delay, delay * 2)
+    return False
+
+
+def verify_device(ip, image_path, port=502, unit_id=1, down_limit=15.0, up_limit=180.0,
+                  settle=2.0, auto_rollback=True, should_stop=None, poll_interval=1.0):
+    """
+    한 장비의 업그레이드 결과를 확인합니다. VerifyResult를 반환합니다.
+    - 40023이 다운로드/기록 중이면 끝날 때까지 기다립니다 (그 사이 재부팅하면 다시 올라올 때까지 대기).
+    - 재부팅(포트 닫힘)을 아직 보지 못했는데 버전이 다르면 적용 전으로 보고 계속 기다립니다.
+    - 롤백은 재부팅 후 상태가 대기인데 버전이 다른, 확정된 실패에서만 보냅니다.
+    up_limit: 검증 전체의 제한 시간
+    """
+    started = time.monotonic()
+    deadline = started + up_limit
+    expected = version_from_filename(image_path)
+    actual = status = None
+
+    def result(ok, message, **kw):
+        return VerifyResult(ip, ok, expected=expected, actual=actual, status=status, message=message,
+                            elapsed=time.monotonic() - started, **kw)
+
+    rebooted = wait_for_down(ip, port, down_limit, should_stop=should_stop)
+    while True:
+        if not wait_for_up(ip, port, max(0.0, deadline - time.monotonic()), should_stop=should_stop):
+            return result(False, f"{up_limit:.0f}초 안에 장비가 응답하지 않음")
+        time.sleep(settle)      # 포트가 열린 직후에는 레지스터가 아직 준비되지 않을 수 있음
+        try:
+            client = GDSClient(ip, port=port, unit_id=unit_id, shared=True)
+        except ConnectionError as e:
+            if probe(ip, port):
+                return result(False, f"연결 실패: {e}")
+            rebooted = True     # 다시 닫힘 (재부팅 중)
+            continue
+        try:
+            while True:
+                st = client.read_status()
+                actual, status = st["version"], st["status"]
+                if status >= STATUS_ERROR:
+                    return result(False, f"장비가 업그레이드 오류를 보고함 (상태 0x{status:02x})")
+                if status not in BUSY_STATUSES:
+                    if expected is None:
+                        return result(True, "파일명에 버전 정보가 없어 버전 비교 생략")
+                    if version_matches(actual, expected):
+                        return result(True, "버전 일치")
+                    if rebooted:
+                        rolled_back = False
+                        if auto_rollback:
+                            client.rollback()
+                            rolled_back = True
+                        return result(False, "버전 불일치", rolled_back=rolled_back)
+                if time.monotonic() >= deadline or (should_stop and should_stop()):
+                    if status in BUSY_STATUSES:
+                        return result(False, "제한 시간 안에 업그레이드가 끝나지 않음")
+                    return result(False, "제한 시간 안에 재부팅이 확인되지 않음 (버전 비교 보류)")
+                time.sleep(poll_interval)
+        except (IOError, OSError) as e:
+            if probe(ip, port):
+                return result(False, f"버전 읽기 실패: {e}")
+            rebooted = True     # 읽는 도중 재부팅
+        finally:
+            client.close()
+
+
+class VerificationPipeline:
+    """
+    업그레이드가 끝난 장비의 검증을 스레드 풀에서 동시에 진행합니다.
+    submit()은 바로 반환되고, 결과는 Future 또는 on_result 콜백으로 받습니다.
+    """
+
+    def __init__(self, max_workers=32, **verify_kwargs):
+        self.verify_kwargs = verify_kwargs
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify")
+
+    def submit(self, ip, image_path, on_result=None):
+        def run():
+            try:
+                res = verify_device(ip, image_path, **self.verify_kwargs)
+            except Exception as e:
+                res = VerifyResult(ip, False, message=f"검증 중 예외: {e}")
+            if on_result is not None:
+                on_result(res)
+            return res
+        return self._pool.submit(run)
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait)